@@ -1,17 +1,52 @@
-from dash import Dash, dcc, html, Input, Output, dash_table, State, callback_context
+from dash import ALL, Dash, dcc, html, Input, Output, dash_table, State, Patch, callback_context, no_update
 from dash_bootstrap_components import Tooltip
 import dash_bootstrap_components as dbc
 import pandas as pd
 import plotly.express as px
-import ast
-import numpy as np
 import plotly.graph_objects as go
 import requests
-
-
-
-dishes = pd.read_csv("data/all_dishes.csv")
-places = pd.read_csv("data/all_places.csv")
+import os
+import threading
+import time
+import json
+import math
+from functools import lru_cache
+from typing import NamedTuple
+from plotly.io.json import to_json_plotly
+from caching import LRUCache, deep_sizeof
+from metrics import CallbackMetrics, CallbackRecorder
+from dataset import DIETARY_BITS, DIETARY_COLUMNS, NUTRIENT_COLUMNS, as_float64
+from datastore import DatasetStore, load_dataset
+from filters import rank_within, restrict_to
+from geo import distances_km, format_distances
+from ingredients import parse_ingredients
+from search import fold
+
+
+
+DATA_DIR = os.environ.get("KYODO_DATA_DIR", "data")
+DISHES_CSV = os.path.join(DATA_DIR, "all_dishes.csv")
+PLACES_CSV = os.path.join(DATA_DIR, "all_places.csv")
+
+SNAPSHOT_DIR = os.environ.get("KYODO_SNAPSHOT_DIR", os.path.join(DATA_DIR, "snapshot"))
+
+# With KYODO_CLIENTSIDE_FILTERING=1 the browser filters the map for datasets of at
+# most CLIENTSIDE_MAX_DISHES dishes. Each Dataset decides for itself, so a reload
+# can move the app either way across the threshold.
+CLIENTSIDE_FILTERING = os.environ.get("KYODO_CLIENTSIDE_FILTERING", "0") == "1"
+CLIENTSIDE_MAX_DISHES = int(os.environ.get("KYODO_CLIENTSIDE_MAX_DISHES", 20000))
+
+# KYODO_BUILD_SNAPSHOT is set by gunicorn.conf.py: the preloading master compiles the
+# snapshot once and every worker maps it.
+data_store = DatasetStore(
+    lambda previous: load_dataset(
+        DISHES_CSV, PLACES_CSV, SNAPSHOT_DIR, build_snapshot=os.environ.get("KYODO_BUILD_SNAPSHOT") == "1",
+        previous=previous, clientside_max_dishes=CLIENTSIDE_MAX_DISHES if CLIENTSIDE_FILTERING else None
+    ),
+    [DISHES_CSV, PLACES_CSV],
+    poll_interval=float(os.environ.get("KYODO_RELOAD_INTERVAL", 5)),
+)
+current_dataset = data_store.current
 
 REGION_COLORS = {
     "Hokkaido": {"background": "#C9EDE1", "text": "#2D5A47"}, # Hokkaido region
@@ -80,22 +115,10 @@ app = Dash(
     suppress_callback_exceptions=True
 )
 server = app.server
-
-def haversine(lat1, lon1, lat2, lon2):
-    if any(pd.isna([lat1, lon1, lat2, lon2])):
-        return np.nan
-
-    R = 6371
-
-    lat1, lon1, lat2, lon2 = map(np.radians, [lat1, lon1, lat2, lon2])
-
-    dlon = lon2 - lon1
-    dlat = lat2 - lat1
-
-    a = np.sin(dlat / 2.0)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2.0)**2
-    c = 2 * np.arcsin(np.sqrt(a))
-    km = R * c
-    return km
+data_store.install(app, admin_token=os.environ.get("KYODO_ADMIN_TOKEN"))
+callback_metrics = CallbackMetrics(directory=os.environ.get("KYODO_METRICS_DIR")).install(app)
+if os.environ.get("KYODO_RECORD_CALLBACKS"):
+    CallbackRecorder(os.environ["KYODO_RECORD_CALLBACKS"]).install(app)
 
 def get_season_icon(season):
     m = {
@@ -108,137 +131,68 @@ def get_season_icon(season):
     }
     return m.get(str(season).lower(), "seasonal.svg")
 
-def generate_radar_chart_elements(dish_name, standardize_scale=False, is_dark_mode=False):
-    
-    if is_dark_mode:
-        grid_color = "rgba(255, 255, 255, 0.2)"
-        tick_color = "#E0E0E0"
-        subtle_tick_color = "rgba(255,255,255,0.6)"
-    else:
-        grid_color = "rgba(0, 0, 0, 0.3)"
-        tick_color = "black"
-        subtle_tick_color = "rgba(0,0,0,0.8)"
-    
-    plot_paper_bg = "rgba(0,0,0,0)"
-    
-    if dish_name is None:
-        row = pd.DataFrame()
-    else:
-        row = dishes[dishes["dish_name"] == dish_name]
-        
-    nutrients = ["Calories      ", "Protein", "Carbohydrates", "Fat", "Sodium"]
-    DAILY_TARGETS = {"calories": 2000, "protein": 50, "carbohydrates": 275, "fat": 70, "sodium": 2300}
-
-    if not row.empty:
-        values = [
-            round(row.iloc[0].get("calories", 0)       / DAILY_TARGETS["calories"]    * 100, 1),
-            round(row.iloc[0].get("protein", 0)       / DAILY_TARGETS["protein"]     * 100, 1),
-            round(row.iloc[0].get("carbohydrates", 0) / DAILY_TARGETS["carbohydrates"] * 100, 1),
-            round(row.iloc[0].get("fat", 0)           / DAILY_TARGETS["fat"]         * 100, 1),
-            round(row.iloc[0].get("sodium", 0)        / DAILY_TARGETS["sodium"]      * 100, 1)
-        ]
-    else:
-        values = [0, 0, 0, 0, 0]
+RADAR_NUTRIENTS = ["Calories      ", "Protein", "Carbohydrates", "Fat", "Sodium"]
+RADAR_LABELS = ["Calories", "Protein", "Carbohydrates", "Fat", "Sodium"]
+RADAR_UNITS = ["kcal", "g", "g", "g", "mg"]
+MICRO_CHART_THRESHOLD = 30
+SMALL_CHART_THRESHOLD = 45
+
+RADAR_BANDS = {
+    "micro": {
+        "range_max": 32, "spoke_length": 32,
+        "grid_levels": [5, 10, 15, 20, 25, 30], "tick_vals": [0, 5, 10, 15, 20, 25, 30],
+        "fill_color": ("rgba(255, 106, 0, 0.35)", "rgba(255, 106, 0, 0.25)"),
+        "line_color": "rgba(255, 106, 0, 1)",
+        "subtitle_text": "Micro-Zoomed Version (0-30%)",
+        "subtitle_color": ("#FF8A3D", "#FF6A00"),
+    },
+    "small": {
+        "range_max": 52, "spoke_length": 52,
+        "grid_levels": [10, 20, 30, 40, 50], "tick_vals": [0, 10, 20, 30, 40, 50],
+        "fill_color": ("rgba(14, 159, 110, 0.35)", "rgba(14, 159, 110, 0.25)"),
+        "line_color": "rgba(14, 159, 110, 1)",
+        "subtitle_text": "Zoomed Version (0-50%)",
+        "subtitle_color": ("#10C792", "#0E9F6E"),
+    },
+    "normal": {
+        "range_max": 105, "spoke_length": 105,
+        "grid_levels": [20, 40, 60, 80, 100], "tick_vals": [0, 20, 40, 60, 80, 100],
+        "fill_color": ("rgba(0, 123, 255, 0.35)", "rgba(0, 123, 255, 0.25)"),
+        "line_color": "rgba(0, 123, 255, 1)",
+        "subtitle_text": "Normal Version (0-100%)",
+        "subtitle_color": ("#3D9FFF", "#007BFF"),
+    },
+}
 
-    max_val = max(values) if values else 0
-    capped_annotations = []
-    
-    if standardize_scale:
-        max_val = 999
 
-    MICRO_CHART_THRESHOLD = 30
-    SMALL_CHART_THRESHOLD = 45
-    
-    if max_val <= MICRO_CHART_THRESHOLD:
-        dynamic_range_max = 32
-        dynamic_spoke_length = 32
-        dynamic_grid_levels = [5, 10, 15, 20, 25, 30]
-        dynamic_tick_vals = [0, 5, 10, 15, 20, 25, 30]
-        dynamic_fill_color = "rgba(255, 106, 0, 0.35)" if is_dark_mode else "rgba(255, 106, 0, 0.25)"
-        dynamic_line_color = "rgba(255, 106, 0, 1)"
-        dynamic_subtitle_text = "Micro-Zoomed Version (0-30%)"
-        dynamic_subtitle_color = "#FF8A3D" if is_dark_mode else "#FF6A00"
-        dynamic_subtitle_weight = "700"
-        is_normal_scale = False
-    elif max_val <= SMALL_CHART_THRESHOLD:
-        dynamic_range_max = 52
-        dynamic_spoke_length = 52
-        dynamic_grid_levels = [10, 20, 30, 40, 50]
-        dynamic_tick_vals = [0, 10, 20, 30, 40, 50]
-        dynamic_fill_color = "rgba(14, 159, 110, 0.35)" if is_dark_mode else "rgba(14, 159, 110, 0.25)"
-        dynamic_line_color = "rgba(14, 159, 110, 1)"
-        dynamic_subtitle_text = "Zoomed Version (0-50%)"
-        dynamic_subtitle_color = "#10C792" if is_dark_mode else "#0E9F6E"
-        dynamic_subtitle_weight = "700"
-        is_normal_scale = False
-    else:
-        dynamic_range_max = 105
-        dynamic_spoke_length = 105
-        dynamic_grid_levels = [20, 40, 60, 80, 100]
-        dynamic_tick_vals = [0, 20, 40, 60, 80, 100]
-        dynamic_fill_color = "rgba(0, 123, 255, 0.35)" if is_dark_mode else "rgba(0, 123, 255, 0.25)"
-        dynamic_line_color = "rgba(0, 123, 255, 1)"
-        dynamic_subtitle_text = "Normal Version (0-100%)"
-        dynamic_subtitle_color = "#3D9FFF" if is_dark_mode else "#007BFF"
-        dynamic_subtitle_weight = "700"
-        is_normal_scale = True
-        for i in range(len(values)):
-            if values[i] > 100:
-                capped_annotations.append((["Calories", "Protein", "Carbohydrates", "Fat", "Sodium"][i], values[i]))
-        
-    
-    dynamic_tick_text = [f"{t}%" for t in dynamic_tick_vals]
-            
-    abs_vals = [
-        row.iloc[0].get("calories", 0) if not row.empty else 0,
-        row.iloc[0].get("protein", 0) if not row.empty else 0,
-        row.iloc[0].get("carbohydrates", 0) if not row.empty else 0,
-        row.iloc[0].get("fat", 0) if not row.empty else 0,
-        row.iloc[0].get("sodium", 0) if not row.empty else 0,
-    ]
-    units = ["kcal", "g", "g", "g", "mg"]
-    hover_texts = [
-        f"{['Calories', 'Protein', 'Carbohydrates', 'Fat', 'Sodium'][i]}: {abs_vals[i]} {units[i]}<br>({values[i]} %)"
-        for i in range(len(nutrients))
-    ]
+def radar_theme_colors(is_dark_mode):
+    if is_dark_mode:
+        return "rgba(255, 255, 255, 0.2)", "#E0E0E0", "rgba(255,255,255,0.6)"
+    return "rgba(0, 0, 0, 0.3)", "black", "rgba(0,0,0,0.8)"
 
-    r_values = values
-    if max_val > SMALL_CHART_THRESHOLD:
-        r_values = [min(v, 100) for v in values]
+
+@lru_cache(maxsize=None)
+def radar_scaffold(band, is_dark_mode):
+    grid_color, tick_color, subtle_tick_color = radar_theme_colors(is_dark_mode)
+    plot_paper_bg = "rgba(0,0,0,0)"
+    config = RADAR_BANDS[band]
 
     fig = go.Figure()
-    grid_theta = nutrients + [nutrients[0]]
+    grid_theta = RADAR_NUTRIENTS + [RADAR_NUTRIENTS[0]]
 
-    for level in dynamic_grid_levels:
+    for level in config["grid_levels"]:
         fig.add_trace(go.Scatterpolar(
             r=[level] * 6, theta=grid_theta, mode="lines",
             line=dict(color=grid_color, width=0.8, dash="dash"),
             hoverinfo="none", showlegend=False
         ))
 
-    for nutrient_label in nutrients:
+    for nutrient_label in RADAR_NUTRIENTS:
         fig.add_trace(go.Scatterpolar(
-            r=[0, dynamic_spoke_length], theta=[nutrient_label, nutrient_label],
+            r=[0, config["spoke_length"]], theta=[nutrient_label, nutrient_label],
             mode="lines", line=dict(color=grid_color, width=0.8, dash="dash"),
             hoverinfo="none", showlegend=False
         ))
-        
-    fig.add_trace(go.Scatterpolar(
-        r=r_values + [r_values[0]], theta=nutrients + [nutrients[0]],
-        fill="toself", fillcolor=dynamic_fill_color, mode="none",
-        hoverinfo="none",
-        showlegend=False
-    ))
-
-    fig.add_trace(go.Scatterpolar(
-        r=r_values + [r_values[0]], theta=nutrients + [nutrients[0]],
-        fill="none", mode="lines+markers",
-        line_color=dynamic_line_color, line_width=1.5,
-        marker=dict(size=5, color=dynamic_line_color),
-        hovertext=hover_texts + [hover_texts[0]],
-        hoverinfo="text",
-        showlegend=False
-    ))
 
     fig.update_layout(
         showlegend=False, dragmode=False,
@@ -251,8 +205,8 @@ def generate_radar_chart_elements(dish_name, standardize_scale=False, is_dark_mo
                 gridcolor="rgba(0,0,0,0)", linecolor="rgba(0,0,0,0)"
             ),
             radialaxis=dict(
-                visible=True, range=[0, dynamic_range_max],
-                tickvals=dynamic_tick_vals, ticktext=dynamic_tick_text,
+                visible=True, range=[0, config["range_max"]],
+                tickvals=config["tick_vals"], ticktext=[f"{t}%" for t in config["tick_vals"]],
                 tickfont=dict(size=8, color=subtle_tick_color),
                 angle=90,tickangle=90, gridcolor="rgba(0,0,0,0)",
                 showline=False, ticks=""
@@ -262,6 +216,86 @@ def generate_radar_chart_elements(dish_name, standardize_scale=False, is_dark_mo
         margin=dict(l=30, r=30, t=15, b=5),
         height=230
     )
+    scaffold = fig.to_plotly_json()
+    return tuple(scaffold["data"]), scaffold["layout"]
+
+
+radar_cache = LRUCache("radar", maxsize=int(os.environ.get("KYODO_RADAR_CACHE_SIZE", 1024)))
+
+
+def generate_radar_chart_elements(dish_id, standardize_scale=False, is_dark_mode=False):
+    data = current_dataset()
+    record = data.dish_index.get(dish_id)
+    key = (data.version, record.dish_id if record is not None else None, bool(standardize_scale), bool(is_dark_mode))
+    return radar_cache.get_or_compute(
+        key, lambda: build_radar_chart_elements(key[1], standardize_scale, is_dark_mode)
+    )
+
+
+def build_radar_chart_elements(dish_id, standardize_scale=False, is_dark_mode=False):
+    theme_index = 0 if is_dark_mode else 1
+
+    if dish_id is not None:
+        nutrients = current_dataset().nutrients
+        values = [round(float(v), 1) for v in nutrients.percent[dish_id]]
+        abs_vals = [round(float(v), 2) for v in nutrients.absolute[dish_id]]
+    else:
+        values = [0, 0, 0, 0, 0]
+        abs_vals = [0, 0, 0, 0, 0]
+
+    max_val = max(values) if values else 0
+    capped_annotations = []
+    
+    if standardize_scale:
+        max_val = 999
+
+    if max_val <= MICRO_CHART_THRESHOLD:
+        band = "micro"
+    elif max_val <= SMALL_CHART_THRESHOLD:
+        band = "small"
+    else:
+        band = "normal"
+        for i in range(len(values)):
+            if values[i] > 100:
+                capped_annotations.append((RADAR_LABELS[i], values[i]))
+    is_normal_scale = band == "normal"
+    config = RADAR_BANDS[band]
+    dynamic_fill_color = config["fill_color"][theme_index]
+    dynamic_line_color = config["line_color"]
+
+    hover_texts = [
+        f"{RADAR_LABELS[i]}: {abs_vals[i]} {RADAR_UNITS[i]}<br>({values[i]} %)"
+        for i in range(len(RADAR_NUTRIENTS))
+    ]
+
+    r_values = values
+    if max_val > SMALL_CHART_THRESHOLD:
+        r_values = [min(v, 100) for v in values]
+
+    scaffold_traces, layout = radar_scaffold(band, bool(is_dark_mode))
+    closed_theta = RADAR_NUTRIENTS + [RADAR_NUTRIENTS[0]]
+    fig = {
+        "data": list(scaffold_traces) + [
+            {
+                "type": "scatterpolar",
+                "r": r_values + [r_values[0]], "theta": closed_theta,
+                "fill": "toself", "fillcolor": dynamic_fill_color, "mode": "none",
+                "hoverinfo": "none",
+                "showlegend": False
+            },
+            {
+                "type": "scatterpolar",
+                "r": r_values + [r_values[0]], "theta": closed_theta,
+                "fill": "none", "mode": "lines+markers",
+                "line": {"color": dynamic_line_color, "width": 1.5},
+                "marker": {"size": 5, "color": dynamic_line_color},
+                "hovertext": hover_texts + [hover_texts[0]],
+                "hoverinfo": "text",
+                "showlegend": False
+            }
+        ],
+        "layout": layout
+    }
 
     if capped_annotations:
         badge_elements = [
@@ -283,7 +317,7 @@ def generate_radar_chart_elements(dish_name, standardize_scale=False, is_dark_mo
                         style={
                             "fontWeight": "600", "fontSize": "13px",
                             "marginRight": "10px", "flexShrink": 0,
-                            "color": "#E0E0E0" if is_dark_mode else "black"
+                            "color": "var(--text-color)"
                         }
                     ),
                 ] + badge_elements,
@@ -295,20 +329,12 @@ def generate_radar_chart_elements(dish_name, standardize_scale=False, is_dark_mo
             )
         ]
         
-        if is_dark_mode:
-             annotation_box_style = {
-                "backgroundColor": "#3d1f1f", "border": "1px solid #5a2d2d",
-                "borderRadius": "8px", "padding": "8px 12px",
-                "marginTop": "8px", "display": "flex",
-                "alignItems": "flex-start",
-             }
-        else:
-            annotation_box_style = {
-                "backgroundColor": "#fdf3f4", "border": "1px solid #f5c6cb",
-                "borderRadius": "8px", "padding": "8px 12px",
-                "marginTop": "8px", "display": "flex",
-                "alignItems": "flex-start",
-            }
+        annotation_box_style = {
+            "backgroundColor": "var(--warning-box-bg)", "border": "var(--warning-box-border)",
+            "borderRadius": "8px", "padding": "8px 12px",
+            "marginTop": "8px", "display": "flex",
+            "alignItems": "flex-start",
+        }
     else:
         annotation_box_children = []
         annotation_box_style = {"display": "none"}
@@ -316,12 +342,13 @@ def generate_radar_chart_elements(dish_name, standardize_scale=False, is_dark_mo
     subtitle_children = [
         html.Span("Nutritional Values ", style={
             "fontWeight": "700", "fontSize": "16px",
-            "color": tick_color, "marginRight": "6px"
+            "color": "var(--text-color)", "marginRight": "6px"
         }),
-        html.Span(dynamic_subtitle_text, style={
-            "fontWeight": dynamic_subtitle_weight,
+        html.Span(config["subtitle_text"], className="accent-text", style={
+            "fontWeight": "700",
             "fontSize": "13px",
-            "color": dynamic_subtitle_color,
+            "--accent-dark": config["subtitle_color"][0],
+            "--accent-light": config["subtitle_color"][1],
             "transition": "color 0.3s ease, font-weight 0.3s ease"
         })
     ]
@@ -329,67 +356,130 @@ def generate_radar_chart_elements(dish_name, standardize_scale=False, is_dark_mo
     return fig, subtitle_children, annotation_box_children, annotation_box_style, is_normal_scale
 
 
-def create_right_panel(main_ingredients="", history="", dish_name=None, image_url=None, user_location=None, is_dark_mode=False):
+PLACES_TABLE_COLUMNS = ["Place Name", "Distance", "Rating", "Price", "Link"]
 
-    if is_dark_mode:
-        card_style = {
-            "border": "1px solid #3a3a3a",
-            "box-shadow": "0 2px 6px rgba(0, 0, 0, 0.3)",
-            "border-radius": "10px",
-            "padding": "20px",
-            "box-sizing": "border-box",
-            "display": "flex",
-            "flexDirection": "column",
-            "backgroundColor": "#2b2b2b"
-        }
-        text_color = "#E0E0E0"
-        history_text_color = "#E0E0E0"
-        pill_bg = "#3a3a3a"
-        pill_shadow = "0 2px 8px rgba(0,0,0,0.5)"
-        placeholder_color = "#999999"
-        table_bg = "#2b2b2b"
-        table_color = "#E0E0E0"
-        table_header_bg = "#1a1a1a"
-        table_header_color = "#E0E0E0"
-        table_border = "1px solid #3a3a3a"
-        checkbox_bg = "rgba(43,43,43,0.9)"
-        italic_color = "#888"
-        main_ingr_bg = "#2b2b2b"
-        main_ingr_border = "1px solid #3a3a3a"
-        main_ingr_shadow = "0 2px 6px rgba(0, 0, 0, 0.3)"
-        main_ingr_span_color = "#B0B0B0"
-        rating_colors = ['#4CAF50', '#FFA726', '#EF5350']
+
+def format_distance_icon(dist_value):
+    if dist_value == "?":
+
+        return f'<div style="text-align: center;"><i class="fa fa-question-circle" style="font-size: 20px; color: #888; vertical-align: middle;"></i></div>'
+    return f'<div style="text-align: center;">{dist_value}</div>'
+
+
+def places_table_data(place_positions, user_location=None):
+    TYPE_ICON_PATH = "assets/icons/"
+    data = current_dataset()
+    place_rows = data.places.iloc[place_positions].copy()
+    place_rows["rating"] = place_rows["rating"].apply(lambda x: x if pd.notna(x) else "?")
+    
+    user_lat = user_location.get('lat') if user_location else None
+    user_lon = user_location.get('lon') if user_location else None
+    if user_lat is not None and user_lon is not None:
+        place_rows['distance'] = format_distances(
+            distances_km(user_lat, user_lon, data.place_coords, place_positions)
+        )
     else:
-        card_style = {
-            "border": "none",
-            "box-shadow": "0 2px 6px rgba(0, 0, 0, 0.05)",
-            "border-radius": "10px",
-            "padding": "20px",
-            "box-sizing": "border-box",
-            "display": "flex",
-            "flexDirection": "column",
-            "backgroundColor": "white"
-        }
-        text_color = "black"
-        history_text_color = "black"
-        pill_bg = "#FFFFFF"
-        pill_shadow = "0 2px 8px rgba(0,0,0,0.32)"
-        placeholder_color = "#6c757d"
-        table_bg = "white"
-        table_color = "black"
-        table_header_bg = "white"
-        table_header_color = "black"
-        table_border = "1px solid #dee2e6"
-        checkbox_bg = "rgba(255,255,255,0.7)"
-        italic_color = "#555"
-        main_ingr_bg = "white"
-        main_ingr_border = "none"
-        main_ingr_shadow = "0 2px 6px rgba(0, 0, 0, 0.1)"
-        main_ingr_span_color = "black"
-        rating_colors = ['green', 'orange', 'red']
+        place_rows["distance"] = "?"
+    
+    table_df = place_rows[["name", "distance", "rating", "price_level", "googleMapsUri"]].copy()
 
+    table_df.columns = ["Place Name", "Distance", "Rating", "Price", "googleMapsUri"]
     
-    if dish_name is None:
+    price_mapping = {
+        'PRICE_LEVEL_INEXPENSIVE': '¥',
+        'PRICE_LEVEL_MODERATE': '¥¥',
+        'PRICE_LEVEL_EXPENSIVE': '¥¥¥'
+    }
+    table_df["Price"] = table_df["Price"].astype(object).map(price_mapping).fillna("–")
+    table_df["Link"] = table_df["googleMapsUri"].apply(
+        lambda x: f'<div style="text-align: center;"><a href="{x}" target="_blank"><img src="{TYPE_ICON_PATH}location.svg" alt="Map" style="height: 24px; vertical-align: middle;"></a></div>' if pd.notna(x) else ""
+    )
+    table_df = table_df[PLACES_TABLE_COLUMNS]
+    
+    tooltip_data = []
+    for _, row in table_df.iterrows():
+        row_tooltip = {}
+        if row["Distance"] == "?":
+            row_tooltip["Distance"] = "Please enable location to see distance"
+        tooltip_data.append(row_tooltip)
+
+    table_df["Distance"] = table_df["Distance"].apply(format_distance_icon)
+
+    return table_df.to_dict("records"), tooltip_data
+
+
+def similar_dishes_strip(dish_id):
+    # Read straight from the neighbour table computed at load.
+    data = current_dataset()
+    neighbour_ids, scores = data.similar_dishes.row(dish_id)
+    if not len(neighbour_ids):
+        return None
+
+    cards = []
+    for neighbour_id, score in zip(neighbour_ids.tolist(), scores.tolist()):
+        record = data.dish_index.get(neighbour_id)
+        cards.append(html.Button(
+            [
+                html.Div(record.dish_name, style={
+                    "fontSize": "14px", "fontWeight": "600", "whiteSpace": "nowrap",
+                    "overflow": "hidden", "textOverflow": "ellipsis"
+                }),
+                html.Div(f"{record.prefecture} · {score:.0%} match", style={"fontSize": "12px", "color": "var(--muted-color)"})
+            ],
+            # Keyed by name: a click on a panel rendered before a reload still finds the dish.
+            id={"type": "similar-dish", "index": record.dish_name},
+            n_clicks=0,
+            title=record.dish_name,
+            style={
+                "flex": "0 0 auto", "maxWidth": "220px", "textAlign": "left",
+                "padding": "6px 12px", "borderRadius": "14px",
+                "border": "var(--ingr-border)", "boxShadow": "var(--pill-shadow)",
+                "backgroundColor": "var(--pill-bg)", "color": "var(--text-color)"
+            }
+        ))
+    return html.Div(
+        [
+            html.Strong("Similar dishes", style={"color": "var(--text-color)"}),
+            html.Div(cards, style={"display": "flex", "gap": "10px", "overflowX": "auto", "padding": "6px 2px 8px"})
+        ],
+        style={"paddingBottom": "15px"}
+    )
+
+
+def create_right_panel(dish_id=None, user_location=None, is_dark_mode=False):
+
+    card_style = {
+        "border": "var(--card-border)",
+        "box-shadow": "var(--card-shadow)",
+        "border-radius": "10px",
+        "padding": "20px",
+        "box-sizing": "border-box",
+        "display": "flex",
+        "flexDirection": "column",
+        "backgroundColor": "var(--card-bg)"
+    }
+    text_color = "var(--text-color)"
+    history_text_color = "var(--text-color)"
+    pill_bg = "var(--pill-bg)"
+    pill_shadow = "var(--pill-shadow)"
+    placeholder_color = "var(--placeholder-color)"
+    table_bg = "var(--table-bg)"
+    table_color = "var(--table-color)"
+    table_header_bg = "var(--table-header-bg)"
+    table_header_color = "var(--table-header-color)"
+    table_border = "var(--table-border)"
+    checkbox_bg = "var(--checkbox-bg)"
+    italic_color = "var(--muted-color)"
+    main_ingr_bg = "var(--ingr-bg)"
+    main_ingr_border = "var(--ingr-border)"
+    main_ingr_shadow = "var(--ingr-shadow)"
+    main_ingr_span_color = "var(--ingr-text)"
+    rating_colors = ["var(--rating-good)", "var(--rating-ok)", "var(--rating-bad)"]
+
+    data = current_dataset()
+    record = data.dish_index.get(dish_id)
+
+    if record is None:
         placeholder_div = html.Div(
             html.P(
                 "Please select a dish on the map",
@@ -431,8 +521,8 @@ def create_right_panel(main_ingredients="", history="", dish_name=None, image_ur
         ], style={"display": "flex", "flexDirection": "column", "height": "100%"})
 
     fig, subtitle_children, annotation_box_children, annotation_box_style, is_normal_scale = \
-        generate_radar_chart_elements(dish_name, standardize_scale=False, is_dark_mode=is_dark_mode)
-    row = dishes[dishes["dish_name"] == dish_name]
+        generate_radar_chart_elements(record.dish_id, standardize_scale=False, is_dark_mode=is_dark_mode)
+    image_url = record.image_url
         
     left_box = html.Div(
         [
@@ -441,7 +531,7 @@ def create_right_panel(main_ingredients="", history="", dish_name=None, image_ur
                     src=image_url,
                     style={"width": "100%", "marginBottom": "10px", "border-radius": "5px"}
                 ) if image_url else None,
-                html.Div(history, style={
+                html.Div(record.history, style={
                     "overflowY": "auto", "maxHeight": "250px", "minHeight": "50px",
                     "color": history_text_color
                 })
@@ -463,7 +553,7 @@ def create_right_panel(main_ingredients="", history="", dish_name=None, image_ur
         "fish": "Fish.svg", "rice": "Rice.svg", "pickles": "Pickles.svg",
         "vegetable": "Vegetable.svg", "sweet": "Sweet.svg", "other": "cutlery.svg"
     }
-    area_name = row.iloc[0]['area_name'] if not row.empty else ""
+    area_name = record.area_name or ""
     area_icon_file = "placeholder.svg"
     
     area_icon = html.Img(
@@ -475,7 +565,7 @@ def create_right_panel(main_ingredients="", history="", dish_name=None, image_ur
         [area_icon, html.Span(area_name, style={"color": text_color})],
         style={**PILL_BASE, "backgroundColor": pill_bg, "color": text_color}
     )
-    season_name = row.iloc[0]['seasonality'] if not row.empty else "all season"
+    season_name = record.seasonality or "all season"
     season_icon_file = get_season_icon(season_name)
     
     season_icon = html.Img(
@@ -487,7 +577,7 @@ def create_right_panel(main_ingredients="", history="", dish_name=None, image_ur
         [season_icon, html.Span(season_name.title(), style={"color": text_color})],
         style={**PILL_BASE, "backgroundColor": pill_bg, "color": text_color}
     )
-    dish_type = row.iloc[0]['type'].lower() if not row.empty else ""
+    dish_type = (record.type or "").lower()
     type_icon_file = None
     for key, svg_file in type_icon_map.items():
         if key in dish_type:
@@ -497,7 +587,7 @@ def create_right_panel(main_ingredients="", history="", dish_name=None, image_ur
         type_icon = html.Img(src=f"{TYPE_ICON_PATH}{type_icon_file}", style={"height": "22px", "width": "22px", "marginRight": "6px"})
     else:
         type_icon = html.I(className="fa fa-cutlery", style={"fontSize": "16px", "marginRight": "6px"})
-    type_pill = html.Span([type_icon, html.Span(row.iloc[0]['type'].title() if not row.empty else "", style={"color": text_color})],
+    type_pill = html.Span([type_icon, html.Span((record.type or "").title(), style={"color": text_color})],
                                      style={**PILL_BASE, "backgroundColor": pill_bg, "color": text_color})
     
     ICON_PATH = "assets/icons/"
@@ -508,13 +598,13 @@ def create_right_panel(main_ingredients="", history="", dish_name=None, image_ur
 
     style_icon_active = {
         "height": "28px", "width": "28px", "marginRight": "6px",
-        "filter": "drop-shadow(0 1px 2px rgba(255,255,255,0.2))" if is_dark_mode else "drop-shadow(0 1px 2px rgba(0,0,0,0.15))",
+        "filter": "var(--diet-active-filter)",
         "opacity": 1,
         "transition": "opacity 0.3s, filter 0.3s"
     }
     style_icon_inactive = {
         "height": "28px", "width": "28px", "marginRight": "6px",
-        "filter": "grayscale(100%) brightness(0.5)" if is_dark_mode else "grayscale(100%)",
+        "filter": "var(--diet-inactive-filter)",
         "opacity": 0.3,
         "transition": "opacity 0.3s, filter 0.3s"
     }
@@ -532,10 +622,8 @@ def create_right_panel(main_ingredients="", history="", dish_name=None, image_ur
     diet_icons = []
     
     for col, icon_file in diet_map.items():
-        icon_id = f"icon-{col}-{dish_name}"
-        is_active = False
-        if not row.empty:
-            is_active = col in row.columns and row.iloc[0].get(col) == True
+        icon_id = f"icon-{col}-{record.dish_id}"
+        is_active = getattr(record, col)
         current_style = style_icon_active if is_active else style_icon_inactive
         label_text = col.replace("_", " ").title()
         tooltip_texts = tooltip_text_map.get(col, (label_text, f"Not {label_text}"))
@@ -556,7 +644,7 @@ def create_right_panel(main_ingredients="", history="", dish_name=None, image_ur
     
     main_ingr_box = html.Div([
         html.Strong("Main ingredients: ", style={"marginRight": "6px", "color": text_color}),
-        html.Span(main_ingredients, style={"fontSize": "14px", "color": main_ingr_span_color})
+        html.Span(record.main_ingredients, style={"fontSize": "14px", "color": main_ingr_span_color})
     ],
         style={
             "border": main_ingr_border, "box-shadow": main_ingr_shadow, "borderRadius": "14px",
@@ -643,125 +731,72 @@ def create_right_panel(main_ingredients="", history="", dish_name=None, image_ur
     
     bottom_box = message_box
     
-    if not row.empty and "places" in row.columns:
-        places_str = row.iloc[0]["places"]
-        try:
-            place_ids = ast.literal_eval(places_str) if places_str else []
-        except Exception:
-            place_ids = []
-
-        if place_ids:
-            place_rows = places[places["id"].isin(place_ids)].copy()
-            place_rows["rating"] = place_rows["rating"].apply(lambda x: x if pd.notna(x) else "?")
-            
-            user_lat = user_location.get('lat') if user_location else None
-            user_lon = user_location.get('lon') if user_location else None
-            if user_lat is not None and user_lon is not None:
-                place_rows['distance'] = place_rows.apply(
-                    lambda row: haversine(user_lat, user_lon, row['latitude'], row['longitude']),
-                    axis=1
-                )
-                place_rows['distance'] = place_rows['distance'].apply(lambda x: f"{x:.1f} km" if pd.notna(x) else "?")
-            else:
-                place_rows["distance"] = "?"
-            
-            table_df = place_rows[["name", "distance", "rating", "price_level", "googleMapsUri"]].copy()
-
-            table_df.columns = ["Place Name", "Distance", "Rating", "Price", "googleMapsUri"]
-            
-            price_mapping = {
-                'PRICE_LEVEL_INEXPENSIVE': '¥',
-                'PRICE_LEVEL_MODERATE': '¥¥',
-                'PRICE_LEVEL_EXPENSIVE': '¥¥¥'
+    place_positions = data.place_adjacency.row(record.dish_id)
+    if len(place_positions):
+        table_records, tooltip_data = places_table_data(place_positions, user_location)
+        final_columns = PLACES_TABLE_COLUMNS
+        
+        rating_style_rules = [
+            {'if': {'column_id': 'Rating', 'filter_query': '{Rating} >= 4 && {Rating} is num'}, 'color': rating_colors[0], 'fontWeight': 'bold'},
+            {'if': {'column_id': 'Rating', 'filter_query': '{Rating} >= 3 && {Rating} < 4 && {Rating} is num'}, 'color': rating_colors[1], 'fontWeight': 'bold'},
+            {'if': {'column_id': 'Rating', 'filter_query': '{Rating} < 3 && {Rating} is num'}, 'color': rating_colors[2], 'fontWeight': 'bold'},
+        ]
+        
+        alignment_rules = [
+            {'if': {'column_id': ['Rating', 'Price']}, 'textAlign': 'center' },
+            {'if': {'column_id': ['Place Name', 'Distance']}, 'textAlign': 'center' },
+            {'if': {'column_id': 'Link'},
+                'display': 'flex',
+                'alignItems': 'center',
+                'justifyContent': 'center'
             }
-            table_df["Price"] = table_df["Price"].map(price_mapping).fillna("–")
-            table_df["Link"] = table_df["googleMapsUri"].apply(
-                lambda x: f'<div style="text-align: center;"><a href="{x}" target="_blank"><img src="{TYPE_ICON_PATH}location.svg" alt="Map" style="height: 24px; vertical-align: middle;"></a></div>' if pd.notna(x) else ""
-            )
-            final_columns = ["Place Name", "Distance", "Rating", "Price", "Link"]
-            table_df = table_df[final_columns]
-            
-            rating_style_rules = [
-                {'if': {'column_id': 'Rating', 'filter_query': '{Rating} >= 4 && {Rating} is num'}, 'color': rating_colors[0], 'fontWeight': 'bold'},
-                {'if': {'column_id': 'Rating', 'filter_query': '{Rating} >= 3 && {Rating} < 4 && {Rating} is num'}, 'color': rating_colors[1], 'fontWeight': 'bold'},
-                {'if': {'column_id': 'Rating', 'filter_query': '{Rating} < 3 && {Rating} is num'}, 'color': rating_colors[2], 'fontWeight': 'bold'},
-            ]
-            
-            alignment_rules = [
-                {'if': {'column_id': ['Rating', 'Price']}, 'textAlign': 'center' },
-                {'if': {'column_id': ['Place Name', 'Distance']}, 'textAlign': 'center' },
-                {'if': {'column_id': 'Link'},
-                    'display': 'flex',
-                    'alignItems': 'center',
-                    'justifyContent': 'center'
-                }
+        ]
+        columns_config = []
+        for col_name in final_columns:
+            if col_name == "Link":
+                columns_config.append({"name": "Map", "id": col_name, "presentation": "markdown"})
+            elif col_name == "Distance":
+                columns_config.append({"name": col_name, "id": col_name, "presentation": "markdown"})
+            else:
+                columns_config.append({"name": col_name, "id": col_name})
+        
+        bottom_box = dash_table.DataTable(
+            columns=columns_config,
+            data=table_records,
+            style_table={
+                "overflowY": "auto",
+                "maxHeight": "210px",
+                "border-radius": "10px",
+                "box-shadow": main_ingr_shadow,
+                "background-color": table_bg,
+            },
+            style_cell={
+                "padding": "5px", "font-family": "Helvetica, Arial, sans-serif",
+                "font-size": "16px", "color": table_color,
+                "backgroundColor": table_bg,
+                "border": table_border
+            },
+            style_header={
+                "fontWeight": "bold", "font-family": "Helvetica, Arial, sans-serif",
+                "font-size": "18px", "color": table_header_color,
+                "backgroundColor": table_header_bg,
+                "border": table_border
+            },
+            style_data={
+                "font-family": "Helvetica, Arial, sans-serif", "font-size": "16px",
+                "backgroundColor": table_bg,
+                "color": table_color
+            },
+            markdown_options={"link_target": "_blank", "html": True},
+            sort_action="native",
+            tooltip_data=tooltip_data,
+            style_data_conditional=rating_style_rules,
+            style_cell_conditional=alignment_rules,
+            style_header_conditional=[
+                {'if': {'column_id': ['Rating', 'Price', 'Link']}, 'textAlign': 'center'},
+                {'if': {'column_id': ['Place Name', 'Distance']}, 'textAlign': 'center'}
             ]
-            columns_config = []
-            for col_name in final_columns:
-                if col_name == "Link":
-                    columns_config.append({"name": "Map", "id": col_name, "presentation": "markdown"})
-                elif col_name == "Distance":
-                    columns_config.append({"name": col_name, "id": col_name, "presentation": "markdown"})
-                else:
-                    columns_config.append({"name": col_name, "id": col_name})
-            
-            tooltip_data = []
-            for _, row in table_df.iterrows():
-                row_tooltip = {}
-                if row["Distance"] == "?":
-                    row_tooltip["Distance"] = "Please enable location to see distance"
-                tooltip_data.append(row_tooltip)
-
-
-            def format_distance_icon(dist_value):
-                if dist_value == "?":
-
-                    return f'<div style="text-align: center;"><i class="fa fa-question-circle" style="font-size: 20px; color: #888; vertical-align: middle;"></i></div>'
-                return f'<div style="text-align: center;">{dist_value}</div>'
-            
-
-            table_df["Distance"] = table_df["Distance"].apply(format_distance_icon)
-
-            
-            
-            
-            bottom_box = dash_table.DataTable(
-                columns=columns_config,
-                data=table_df.to_dict("records"),
-                style_table={
-                    "overflowY": "auto",
-                    "maxHeight": "210px",
-                    "border-radius": "10px",
-                    "box-shadow": main_ingr_shadow,
-                    "background-color": table_bg,
-                },
-                style_cell={
-                    "padding": "5px", "font-family": "Helvetica, Arial, sans-serif",
-                    "font-size": "16px", "color": table_color,
-                    "backgroundColor": table_bg,
-                    "border": table_border
-                },
-                style_header={
-                    "fontWeight": "bold", "font-family": "Helvetica, Arial, sans-serif",
-                    "font-size": "18px", "color": table_header_color,
-                    "backgroundColor": table_header_bg,
-                    "border": table_border
-                },
-                style_data={
-                    "font-family": "Helvetica, Arial, sans-serif", "font-size": "16px",
-                    "backgroundColor": table_bg,
-                    "color": table_color
-                },
-                markdown_options={"link_target": "_blank", "html": True},
-                sort_action="native",
-                tooltip_data=tooltip_data,
-                style_data_conditional=rating_style_rules,
-                style_cell_conditional=alignment_rules,
-                style_header_conditional=[
-                    {'if': {'column_id': ['Rating', 'Price', 'Link']}, 'textAlign': 'center'},
-                    {'if': {'column_id': ['Place Name', 'Distance']}, 'textAlign': 'center'}
-                ]
-            )
+        )
 
     top_row_style = {"paddingBottom": "20px"}
     bottom_row_style = {"flex": "0 1 auto", "display": "flex", "flexDirection": "column"}
@@ -780,303 +815,881 @@ def create_right_panel(main_ingredients="", history="", dish_name=None, image_ur
         style=bottom_row_style
     )
     
+    similar_row = similar_dishes_strip(record.dish_id)
+
     return html.Div(
-        [
-            top_row,
-            bottom_row
-        ],
+        [top_row, similar_row, bottom_row] if similar_row is not None else [top_row, bottom_row],
         style={"display": "flex", "flexDirection": "column", "flex": 1, "minHeight": 0}
     )
 
-prefecture_options = [{"label": p, "value": p} for p in pd.unique(dishes["prefecture"].dropna())]
+class CachedPanel(NamedTuple):
+    tree: dict
+    table_path: tuple
+    nbytes: int
+
+
+right_panel_cache = LRUCache(
+    "right_panel", maxsize=None,
+    max_bytes=int(os.environ.get("KYODO_PANEL_CACHE_BYTES", 64 * 1024 * 1024)),
+    sizeof=lambda panel: panel.nbytes
+)
+
+
+def has_location(user_location):
+    return bool(user_location) and user_location.get("lat") is not None and user_location.get("lon") is not None
+
+
+def find_component(tree, component_type, path=()):
+    if isinstance(tree, dict):
+        if tree.get("type") == component_type and "props" in tree:
+            return path
+        children = tree.items()
+    elif isinstance(tree, list):
+        children = enumerate(tree)
+    else:
+        return None
+    for key, child in children:
+        found = find_component(child, component_type, path + (key,))
+        if found is not None:
+            return found
+    return None
+
+
+def replace_props(tree, path, updates):
+    if not path:
+        return {**tree, "props": {**tree["props"], **updates}}
+    copy = list(tree) if isinstance(tree, list) else dict(tree)
+    copy[path[0]] = replace_props(tree[path[0]], path[1:], updates)
+    return copy
+
+
+def right_panel(dish_id, user_location=None, is_dark_mode=False):
+    data = current_dataset()
+    record = data.dish_index.get(dish_id)
+    if record is None:
+        return create_right_panel(dish_id=None, is_dark_mode=is_dark_mode)
+
+    # Only the places table's distances depend on where the user is, so the cached
+    # panel is location-independent: whether a location is known only decides the
+    # "?" labels and their tooltips, and the distances are recomputed on every hit.
+    key = (data.version, record.dish_id, bool(is_dark_mode), has_location(user_location))
+    cached = right_panel_cache.get(key)
+    if cached is None:
+        tree = json.loads(to_json_plotly(create_right_panel(record.dish_id, user_location, is_dark_mode)))
+        # Sized as the parsed tree the cache holds, several times its JSON text.
+        right_panel_cache.put(key, CachedPanel(tree, find_component(tree, "DataTable"), deep_sizeof(tree)))
+        return tree
+
+    if cached.table_path is None or not key[3]:
+        return cached.tree
+    table = cached.tree
+    for step in cached.table_path:
+        table = table[step]
+    place_positions = data.place_adjacency.row(record.dish_id)
+    labels = format_distances(distances_km(user_location["lat"], user_location["lon"], data.place_coords, place_positions))
+    records = [{**row, "Distance": format_distance_icon(label)} for row, label in zip(table["props"]["data"], labels)]
+    return replace_props(cached.tree, cached.table_path, {"data": records})
+
+
+def warm_right_panel_cache(data):
+    with data_store.pinned(data):
+        for is_dark in (False, True):
+            for record in data.dish_index.records:
+                if right_panel_cache.current_bytes >= 0.9 * right_panel_cache.max_bytes or cache_warmers_stop.is_set():
+                    return
+                right_panel(record.dish_id, None, is_dark)
+
+
+def create_near_me_results(user_location=None, mode="k10"):
+    text_color = "var(--text-color)"
+    muted_color = "var(--muted-color)"
+
+    user_lat = user_location.get("lat") if user_location else None
+    user_lon = user_location.get("lon") if user_location else None
+    if user_lat is None or user_lon is None:
+        return html.P(
+            [
+                html.I(className="fa fa-map-marker", style={"marginRight": "8px"}),
+                "Enable location with the map marker button to see restaurants near you."
+            ],
+            style={"color": muted_color, "fontSize": "15px", "margin": "10px 0"}
+        )
+
+    data = current_dataset()
+    kind, amount = NEAR_ME_MODES.get(mode, NEAR_ME_MODES["k10"])
+    if kind == "nearest":
+        positions, km = data.place_grid.nearest(user_lat, user_lon, amount)
+        summary = f"The {len(positions)} restaurants closest to you"
+        # Only empty when no restaurant has coordinates at all.
+        empty_message = "No restaurants with a known location to show."
+    else:
+        positions, km = data.place_grid.within(user_lat, user_lon, amount)
+        summary = f"{len(positions)} restaurants within {amount} km"
+        empty_message = f"No restaurants within {amount} km of your location."
+        if len(positions) > NEAR_ME_MAX_ROWS:
+            positions, km = positions[:NEAR_ME_MAX_ROWS], km[:NEAR_ME_MAX_ROWS]
+            summary += f" (showing the nearest {NEAR_ME_MAX_ROWS})"
+
+    if not len(positions):
+        return html.P(
+            empty_message,
+            style={"color": muted_color, "fontSize": "15px", "margin": "10px 0"}
+        )
+
+    price_mapping = {
+        'PRICE_LEVEL_INEXPENSIVE': '¥',
+        'PRICE_LEVEL_MODERATE': '¥¥',
+        'PRICE_LEVEL_EXPENSIVE': '¥¥¥'
+    }
+    place_rows = data.places.iloc[positions]
+    body_rows = []
+    for position, distance, place in zip(positions, format_distances(km), place_rows.itertuples(index=False)):
+        served = ", ".join(data.dish_index.get(dish_id).dish_name for dish_id in data.dishes_by_place.row(position))
+        body_rows.append(html.Tr([
+            html.Td(html.A(place.name, href=place.googleMapsUri, target="_blank") if pd.notna(place.googleMapsUri) else place.name),
+            html.Td(distance, style={"whiteSpace": "nowrap"}),
+            html.Td(place.rating if pd.notna(place.rating) else "?", style={"textAlign": "center"}),
+            html.Td(price_mapping.get(place.price_level, "–"), style={"textAlign": "center"}),
+            html.Td(served, style={"fontSize": "13px"})
+        ]))
+
+    return html.Div([
+        html.P(summary, style={"color": text_color, "fontWeight": "500", "marginBottom": "8px"}),
+        dbc.Table(
+            [
+                html.Thead(html.Tr([html.Th(h) for h in ["Place Name", "Distance", "Rating", "Price", "Dishes"]])),
+                html.Tbody(body_rows)
+            ],
+            hover=True, size="sm", responsive=True
+        )
+    ])
+
+MAP_USER_TRACE = 1
+MAP_SELECTED_TRACE = 2
+
+
+def user_location_marker(user_location):
+    if user_location and user_location.get("lat") and user_location.get("lon"):
+        return [user_location["lat"]], [user_location["lon"]]
+    return [], []
+
+
+def selected_dish_marker(dish_id):
+    selected_record = current_dataset().dish_index.get(dish_id)
+    if selected_record is None:
+        return [], [], [], []
+    return (
+        [selected_record.area_lat], [selected_record.area_lon], [[selected_record.dish_id]], [selected_record.dish_name]
+    )
+
+
+def map_overlay_patch(user_location, clicked_dish, changed):
+    patch = Patch()
+    if "user-location" in changed:
+        lat, lon = user_location_marker(user_location)
+        patch["data"][MAP_USER_TRACE]["lat"] = lat
+        patch["data"][MAP_USER_TRACE]["lon"] = lon
+    if "clicked-dish" in changed:
+        lat, lon, customdata, hovertext = selected_dish_marker(clicked_dish)
+        patch["data"][MAP_SELECTED_TRACE]["lat"] = lat
+        patch["data"][MAP_SELECTED_TRACE]["lon"] = lon
+        patch["data"][MAP_SELECTED_TRACE]["customdata"] = customdata
+        patch["data"][MAP_SELECTED_TRACE]["hovertext"] = hovertext
+    return patch
+
+
+MAP_COLUMNS = ["dish_id", "dish_name", "area_lat", "area_lon"]
+base_map_cache = LRUCache("base_map", maxsize=int(os.environ.get("KYODO_MAP_CACHE_SIZE", 256)))
+
+
+def build_base_map(filter_key, selected_dish, search_key, is_dark):
+    map_center = {"lat": 36, "lon": 138}
+    map_zoom = 4
+
+    data = current_dataset()
+    row_ids = data.facet_filter.query_key(filter_key)
+    if selected_dish:
+        row_ids = restrict_to(row_ids, data.dish_index.id_for_name(selected_dish))
+    ranked = data.search_index.ranked(search_key)
+    if ranked is not None:
+        row_ids = rank_within(ranked, row_ids, len(data.dishes))
+        
+    fig = px.scatter_map(
+        data.dishes[MAP_COLUMNS].iloc[row_ids],
+        lat="area_lat",
+        lon="area_lon",
+        hover_name="dish_name",
+        custom_data=["dish_id"],
+        zoom=map_zoom,
+        center=map_center,
+        color_discrete_sequence=["#FFFA00"],
+        size_max=20,
+    )
+
+    fig.update_traces(
+        hovertemplate="%{hovertext}<extra></extra>"
+    )
+    fig.update_traces(marker=dict(size=20))
+    
+    if not selected_dish:
+        fig.update_traces(cluster=dict(enabled=True))
+
+    fig.add_scattermap(
+        lat=[],
+        lon=[],
+        mode="markers",
+        marker=dict(size=15, color="#079DFF", symbol="circle"),
+        hoverinfo="text",
+        hovertext=["Current Location"],
+        name="User Location",
+        showlegend=False
+    )
+
+    fig.add_scattermap(
+        lat=[],
+        lon=[],
+        customdata=[],
+        hovertext=[],
+        mode="markers",
+        marker=dict(size=20, color="#FF6000", symbol="circle"),
+        name="Selected Dish",
+        showlegend=False,
+        hoverinfo="none"
+    )
+
+    map_style = "dark" if is_dark else "light"
+
+    fig.update_layout(map_style=map_style, margin={"r":0,"t":0,"l":0,"b":0})
+    fig.update_layout(uirevision="keep-zoom")
+
+    return fig.to_plotly_json()
+
+
+def base_map_figure(selected_prefectures, selected_seasons, selected_types, selected_dietary, included_ingredients,
+                    excluded_ingredients, nutrient_ranges, selected_dish, search_text, is_dark):
+    data = current_dataset()
+    filter_key = data.facet_filter.canonical(
+        selected_prefectures, selected_seasons, selected_types, selected_dietary, included_ingredients, excluded_ingredients,
+        dict(zip(data.facet_filter.range_indexes, nutrient_ranges or []))
+    )
+    search_key = data.search_index.canonical(search_text)
+    key = (data.version, filter_key, selected_dish or None, search_key, bool(is_dark))
+    return base_map_cache.get_or_compute(key, lambda: build_base_map(filter_key, selected_dish, search_key, is_dark))
+
+
+def with_overlays(figure, user_location, clicked_dish):
+    data = list(figure["data"])
+    user_lat, user_lon = user_location_marker(user_location)
+    data[MAP_USER_TRACE] = {**data[MAP_USER_TRACE], "lat": user_lat, "lon": user_lon}
+    selected_lat, selected_lon, selected_customdata, selected_hovertext = selected_dish_marker(clicked_dish)
+    data[MAP_SELECTED_TRACE] = {
+        **data[MAP_SELECTED_TRACE], "lat": selected_lat, "lon": selected_lon,
+        "customdata": selected_customdata, "hovertext": selected_hovertext
+    }
+    return {**figure, "data": data}
+
+
+def warm_base_map_cache(data):
+    prefectures = data.dishes["prefecture"].dropna().unique()
+    with data_store.pinned(data):
+        for is_dark in (False, True):
+            base_map_figure(None, None, None, None, None, None, None, None, None, is_dark)
+            for prefecture in prefectures:
+                if cache_warmers_stop.is_set():
+                    return
+                base_map_figure([prefecture], None, None, None, None, None, None, None, None, is_dark)
+
+
+cache_warmers = []
+# Set to make the warmers return before their next entry.
+cache_warmers_stop = threading.Event()
+
+
+def stop_cache_warmers():
+    """Stop the running warmers and wait for them to return."""
+    cache_warmers_stop.set()
+    for thread in cache_warmers:
+        thread.join()
+
+
+def finish_cache_warmers(timeout):
+    """Give the warmers up to ``timeout`` seconds, then stop them; True if they were cut short.
+
+    No warmer is running when this returns, so a fork right after it copies no
+    half-done warm-up and no held cache lock.
+    """
+    deadline = time.monotonic() + timeout
+    for thread in cache_warmers:
+        thread.join(max(0.0, deadline - time.monotonic()))
+    cut_short = any(thread.is_alive() for thread in cache_warmers)
+    stop_cache_warmers()
+    return cut_short
+
+
+def start_cache_warmers(data):
+    stop_cache_warmers()
+    cache_warmers_stop.clear()
+    warmers = []
+    if os.environ.get("KYODO_WARM_PANEL_CACHE", "1") == "1":
+        warmers.append(threading.Thread(target=warm_right_panel_cache, args=(data,), name="warm-right-panel-cache", daemon=True))
+    if os.environ.get("KYODO_WARM_MAP_CACHE", "1") == "1" and not data.clientside_filtering:
+        warmers.append(threading.Thread(target=warm_base_map_cache, args=(data,), name="warm-base-map-cache", daemon=True))
+    for thread in warmers:
+        thread.start()
+    cache_warmers[:] = warmers
+
+
+@data_store.on_swap
+def invalidate_previous_version(data):
+    # Rendered panels, maps and radars are keyed by data version: stop the old
+    # version's warmers so none refills what is dropped here, drop the other
+    # versions' entries, then warm the new one.
+    stop_cache_warmers()
+    for cache in (base_map_cache, right_panel_cache, radar_cache, dish_search_cache):
+        cache.discard(lambda key: key[0] != data.version)
+    start_cache_warmers(data)
+
+
+start_cache_warmers(current_dataset())
+
+
+def clientside_dish_columns(data):
+    dishes = data.dishes
+    columns = {
+        "id": dishes["dish_id"].tolist(),
+        "name": dishes["dish_name"].tolist(),
+        "lat": as_float64(dishes["area_lat"]).tolist(),
+        "lon": as_float64(dishes["area_lon"]).tolist(),
+        "categories": {},
+        "codes": {},
+        "dietary_columns": dietary_columns,
+        "dietary": dishes[DIETARY_BITS].tolist(),
+    }
+    codes, lists = pd.factorize(dishes["main_ingredients"], use_na_sentinel=False)
+    columns["ingredients"] = codes.tolist()
+    columns["ingredient_lists"] = [parse_ingredients(text) for text in lists]
+    columns["nutrients"] = [as_float64(dishes[column]).tolist() for column in data.facet_filter.range_indexes]
+    columns["nutrient_bounds"] = [[index.min, index.max] for index in data.facet_filter.range_indexes.values()]
+    for column in ("prefecture", "seasonality", "type"):
+        categorical = pd.Categorical(dishes[column])
+        columns["categories"][column] = categorical.categories.tolist()
+        columns["codes"][column] = categorical.codes.tolist()
+
+    skeleton = build_base_map(data.facet_filter.canonical(), None, (), False)
+    points = {**skeleton["data"][0], "lat": [], "lon": [], "hovertext": [], "customdata": []}
+    columns["figure"] = {**skeleton, "data": [points] + list(skeleton["data"][1:])}
+    return columns
+
+
 season_order = ["all season", "spring", "summer", "fall", "winter"]
-season_options = [{"label": s.title(), "value": s} for s in season_order if s in dishes["seasonality"].dropna().unique()]
-type_options = [{"label": t.title(), "value": t} for t in sorted(pd.unique(dishes["type"].dropna()))]
-dietary_columns = ["vegan","vegetarian","no_gluten","no_seafood","no_pork","no_dairy","no_nuts"]
+
+
+def facet_options(data):
+    dishes = data.dishes
+    prefecture_options = [{"label": p, "value": p} for p in pd.unique(dishes["prefecture"].dropna())]
+    season_options = [{"label": s.title(), "value": s} for s in season_order if s in dishes["seasonality"].dropna().unique()]
+    type_options = [{"label": t.title(), "value": t} for t in sorted(pd.unique(dishes["type"].dropna()))]
+    return prefecture_options, season_options, type_options
+
+
+# Like the dish names, the ingredient vocabulary is not shipped with the layout:
+# the checklists show the most common matches for what has been typed.
+INGREDIENT_OPTION_LIMIT = 20
+INGREDIENT_MORE = "__more__"
+
+
+def ingredient_options(query, selected):
+    index = current_dataset().ingredient_index
+    names, total = index.complete(query, INGREDIENT_OPTION_LIMIT)
+    # Ticked ingredients stay listed, or the checklist would drop them from view.
+    shown = list(dict.fromkeys([*(selected or []), *names]))
+    options = [{"label": f"{name.capitalize()} ({index.counts.get(name, 0):,})", "value": name} for name in shown]
+    if total > len(names):
+        options.append({
+            "label": f"{total - len(names):,} more, keep typing", "value": INGREDIENT_MORE, "disabled": True
+        })
+    return options
+
+
+NUTRIENT_SLIDER_LABELS = {
+    column: f"{label} ({unit})" for column, label, unit in zip(NUTRIENT_COLUMNS, RADAR_LABELS, RADAR_UNITS)
+}
+
+
+def nutrient_sliders(data):
+    # One slider per range index, in index order: the callbacks pair the values
+    # with the columns by position.
+    sliders = []
+    for column, index in data.facet_filter.range_indexes.items():
+        # About a hundred steps, on a power of ten.
+        exponent = math.floor(math.log10(max(index.max - index.min, 1e-6) / 100))
+        step, digits = 10 ** exponent, max(0, -exponent)
+        low = round(math.floor(index.min / step) * step, digits)
+        high = round(math.ceil(index.max / step) * step, digits)
+        sliders.append(html.Div(
+            [
+                html.Div(NUTRIENT_SLIDER_LABELS.get(column, column.title()), style={"fontSize": "13px", "fontWeight": "500"}),
+                dcc.RangeSlider(
+                    id={"type": "nutrient-range", "index": column},
+                    min=low, max=high, step=step, value=[low, high],
+                    marks=None, allowCross=False,
+                    tooltip={"placement": "bottom", "always_visible": False}
+                )
+            ],
+            style={"padding": "4px 0"}
+        ))
+    return sliders
+
+
+# Same order as the bits of the packed dietary column.
+dietary_columns = list(DIETARY_COLUMNS)
 dietary_labels = {
     "vegan": "Vegan", "vegetarian": "Vegetarian", "no_gluten": "No Gluten",
     "no_seafood": "No Seafood", "no_pork": "No Pork", "no_dairy": "No Dairy", "no_nuts": "No Nuts"
 }
 dietary_options = [{"label": dietary_labels[col], "value": col} for col in dietary_columns]
-dish_search_options = [{"label": name, "value": name} for name in dishes["dish_name"]]
-
-dish_search_dropdown = dcc.Dropdown(
-    id="dish-search",
-    options=dish_search_options,
-    placeholder="Search",
-    style={"width": "100%"},
-    className="search-dropdown-style",
-    optionHeight=120
-)
+
+NEAR_ME_MODES = {
+    "k10": ("nearest", 10), "r5": ("radius", 5), "r20": ("radius", 20), "r50": ("radius", 50)
+}
+NEAR_ME_MAX_ROWS = 50
+near_me_options = [
+    {"label": "10 Nearest", "value": "k10"},
+    {"label": "Within 5 km", "value": "r5"},
+    {"label": "Within 20 km", "value": "r20"},
+    {"label": "Within 50 km", "value": "r50"}
+]
+
+# Dish names are not shipped with the layout: the options are completed on the
+# server from what has been typed, a page at a time.
+DISH_SEARCH_LIMIT = 20
+DISH_SEARCH_DEBOUNCE_MS = int(os.environ.get("KYODO_DISH_SEARCH_DEBOUNCE_MS", 200))
+DISH_SEARCH_MORE = "__more__"
+dish_search_cache = LRUCache("dish_search", maxsize=int(os.environ.get("KYODO_DISH_SEARCH_CACHE_SIZE", 1024)))
+
+
+def dish_search_options(query, selected_dish):
+    data = current_dataset()
+    prefix = data.name_index.canonical(query)
+    names, total = dish_search_cache.get_or_compute(
+        (data.version, prefix), lambda: data.name_index.complete(prefix, DISH_SEARCH_LIMIT)
+    )
+    options = []
+    for name in names:
+        option = {"label": name, "value": name}
+        if fold(name) != name.lower():
+            # The dropdown filters options against the typed text too; let "ryori" match "Ryōri".
+            option["search"] = f"{name} {fold(name)}"
+        options.append(option)
+    if total > len(names):
+        options.append({
+            "label": f"{total - len(names):,} more, keep typing", "value": DISH_SEARCH_MORE,
+            "disabled": True, "search": query
+        })
+    if selected_dish and selected_dish not in names:
+        options.insert(0, {"label": selected_dish, "value": selected_dish})
+    return options
+
+
+def dish_search_dropdown():
+    return dcc.Dropdown(
+        id="dish-search",
+        options=[],
+        placeholder="Search",
+        style={"width": "100%"},
+        className="search-dropdown-style",
+        optionHeight=120
+    )
+
 
 filter_toggle_style = {
     "width": "100%", "display": "flex", "justifyContent": "space-between", "alignItems": "center",
     "fontSize": "14px", "fontWeight": "500", "padding": "0 12px", "height": "38px",
     "whiteSpace": "nowrap", "overflow": "hidden", "textOverflow": "ellipsis"
 }
-app.layout = dbc.Container([
-    
-    dcc.Store(id="dark-mode", storage_type="session", data=False),
-    
-    dcc.Store(id="clicked-dish", storage_type="session"),
-    dcc.Store(id="user-location", storage_type="session"),
-
-    html.Div(
-        [
-            html.H1("Japanese Regional Cuisine", id="main-title", style={"margin": "0"}),
-            html.Div(
-                [
-                    html.A(
-                        html.I(className="fa fa-moon-o", id="theme-icon"),
-                        id="theme-toggle-btn",
-                        n_clicks=0,
-                        style={
-                            "textDecoration": "none", "color": "#A0A0A0",
-                            "fontSize": "26px", "cursor": "pointer"
-                        }
-                    ),
-                    html.A(
-                        html.I(className="fa fa-share-alt"),
-                        id="share-friend-icon",
-                        href="mailto:?subject=Check out this Japanese Cuisine Dashboard&body=I found this cool dashboard, here is the link: [Paste Link Here]",
-                        target="_blank",
-                        style={
-                            "textDecoration": "none", "color": "#A0A0A0",
-                            "fontSize": "26px", "marginLeft": "20px"
-                        }
-                    ),
-                    html.A(
-                        html.I(className="fa fa-bug"),
-                        id="bug-report-icon",
-                        href="mailto:your-email@example.com?subject=Bug Report: Japanese Cuisine Dashboard",
-                        target="_blank",
-                        style={
-                            "textDecoration": "none", "color": "#A0A0A0",
-                            "fontSize": "26px", "marginLeft": "20px"
-                        }
-                    ),
-                    html.A(
-                        html.I(className="fa fa-envelope-o"),
-                        id="open-contact-modal-btn",
-                        n_clicks=0,
-                        style={
-                            "textDecoration": "none", "color": "#A0A0A0",
-                            "fontSize": "26px", "marginLeft": "20px", "cursor": "pointer"
-                        }
-                    )
-                ],
-                style={"display": "flex", "alignItems": "center", "margin-left": "auto", "flex-shrink": 0}
-            )
-        ],
-        id="top-bar",
-        style={
-            "display": "flex", "alignItems": "center",
-            "padding": "10px 20px 0px 10px"
-        }
-    ),
+def build_layout(data):
+    prefecture_options, season_options, type_options = facet_options(data)
+    nutrient_range_sliders = nutrient_sliders(data)
+    return dbc.Container([
+
+        dcc.Store(id="dark-mode", storage_type="session", data=False),
+
+        dcc.Store(id="clicked-dish", storage_type="session"),
+        dcc.Store(id="user-location", storage_type="session"),
+        dcc.Store(id="dish-columns", data=clientside_dish_columns(data) if data.clientside_filtering else None),
+        # Which side filters this page's map; fixed by the data version the page was built from.
+        dcc.Store(id="map-filtering", data="client" if data.clientside_filtering else "server"),
+        dcc.Store(id="search-rows"),
+        dcc.Store(id="dish-search-query"),
+
+        html.Div(
+            [
+                html.H1("Japanese Regional Cuisine", id="main-title", style={"margin": "0", "color": "var(--title-color)"}),
+                html.Div(
+                    [
+                        html.A(
+                            html.I(className="fa fa-moon-o", id="theme-icon"),
+                            id="theme-toggle-btn",
+                            n_clicks=0,
+                            style={
+                                "textDecoration": "none", "color": "var(--icon-color)",
+                                "fontSize": "26px", "cursor": "pointer"
+                            }
+                        ),
+                        html.A(
+                            html.I(className="fa fa-share-alt"),
+                            id="share-friend-icon",
+                            href="mailto:?subject=Check out this Japanese Cuisine Dashboard&body=I found this cool dashboard, here is the link: [Paste Link Here]",
+                            target="_blank",
+                            style={
+                                "textDecoration": "none", "color": "var(--icon-color)",
+                                "fontSize": "26px", "marginLeft": "20px"
+                            }
+                        ),
+                        html.A(
+                            html.I(className="fa fa-bug"),
+                            id="bug-report-icon",
+                            href="mailto:your-email@example.com?subject=Bug Report: Japanese Cuisine Dashboard",
+                            target="_blank",
+                            style={
+                                "textDecoration": "none", "color": "var(--icon-color)",
+                                "fontSize": "26px", "marginLeft": "20px"
+                            }
+                        ),
+                        html.A(
+                            html.I(className="fa fa-envelope-o"),
+                            id="open-contact-modal-btn",
+                            n_clicks=0,
+                            style={
+                                "textDecoration": "none", "color": "var(--icon-color)",
+                                "fontSize": "26px", "marginLeft": "20px", "cursor": "pointer"
+                            }
+                        )
+                    ],
+                    style={"display": "flex", "alignItems": "center", "margin-left": "auto", "flex-shrink": 0}
+                )
+            ],
+            id="top-bar",
+            style={
+                "display": "flex", "alignItems": "center",
+                "padding": "10px 20px 0px 10px"
+            }
+        ),
 
-    dbc.Modal(
-        [
-            dbc.ModalHeader(dbc.ModalTitle("Contact Us"), id="modal-header"),
-            dbc.ModalBody([
-                html.P("Have an enquiry or suggestion? Fill out the form below.", id="modal-p"),
-                html.Div(id="contact-status", style={"marginBottom": "10px"}),
-                dbc.Row([
-                    dbc.Col(dbc.Label("Your Email:", id="modal-label-1"), width=12),
-                    dbc.Col(dbc.Input(type="email", id="contact-email", placeholder="your.email@example.com"), width=12),
-                ], style={"marginBottom": "10px"}),
-                dbc.Row([
-                    dbc.Col(dbc.Label("Your Message:", id="modal-label-2"), width=12),
-                    dbc.Col(dbc.Textarea(id="contact-message", placeholder="Your message here...", style={"height": "120px"}), width=12),
-                ]),
-            ], id="modal-body"),
-            dbc.ModalFooter([
-                dbc.Button("Close", id="close-contact-modal-btn", color="secondary"),
-                dbc.Button("Send", id="send-contact-btn", color="primary", n_clicks=0),
-            ], id="modal-footer"),
-        ],
-        id="contact-modal",
-        is_open=False,
-    ),
+        dbc.Modal(
+            [
+                dbc.ModalHeader(dbc.ModalTitle("Contact Us"), id="modal-header"),
+                dbc.ModalBody([
+                    html.P("Have an enquiry or suggestion? Fill out the form below.", id="modal-p"),
+                    html.Div(id="contact-status", style={"marginBottom": "10px"}),
+                    dbc.Row([
+                        dbc.Col(dbc.Label("Your Email:", id="modal-label-1"), width=12),
+                        dbc.Col(dbc.Input(type="email", id="contact-email", placeholder="your.email@example.com"), width=12),
+                    ], style={"marginBottom": "10px"}),
+                    dbc.Row([
+                        dbc.Col(dbc.Label("Your Message:", id="modal-label-2"), width=12),
+                        dbc.Col(dbc.Textarea(id="contact-message", placeholder="Your message here...", style={"height": "120px"}), width=12),
+                    ]),
+                ], id="modal-body"),
+                dbc.ModalFooter([
+                    dbc.Button("Close", id="close-contact-modal-btn", color="secondary"),
+                    dbc.Button("Send", id="send-contact-btn", color="primary", n_clicks=0),
+                ], id="modal-footer"),
+            ],
+            id="contact-modal",
+            is_open=False,
+        ),
 
-    dbc.Tooltip("Toggle Dark Mode", target="theme-toggle-btn", placement="bottom", id="theme-toggle-tooltip"),
-    dbc.Tooltip("Report a bug or data error", target="bug-report-icon", placement="bottom"),
-    dbc.Tooltip("Share with a friend", target="share-friend-icon", placement="bottom"),
-    dbc.Tooltip("Contact Us", target="open-contact-modal-btn", placement="bottom"),
+        dbc.Modal(
+            [
+                dbc.ModalHeader(dbc.ModalTitle("Restaurants Near Me"), id="near-me-header"),
+                dbc.ModalBody([
+                    dbc.RadioItems(
+                        id="near-me-mode",
+                        options=near_me_options,
+                        value="k10",
+                        inline=True,
+                        style={"marginBottom": "10px"}
+                    ),
+                    html.Div(id="near-me-results")
+                ], id="near-me-body"),
+                dbc.ModalFooter(
+                    dbc.Button("Close", id="close-near-me-btn", color="secondary"),
+                    id="near-me-footer"
+                ),
+            ],
+            id="near-me-modal",
+            is_open=False,
+            size="lg",
+            scrollable=True,
+        ),
 
-    html.Div(
-        dbc.Row([
-            dbc.Col(
-                html.Div([
-                    dbc.Row([
-                        dbc.Col(
-                            dbc.DropdownMenu(
-                                label="Prefecture",
-                                children=[
-                                    html.Div(
-                                        dbc.Checklist(id="prefecture-dropdown", options=prefecture_options),
-                                        id="prefecture-checklist-container",
-                                        style={"maxHeight": "150px", "overflowY": "auto", "padding": "5px 10px"}
-                                    )
-                                ],
-                                id="prefecture-menu",
-                                style={"width": "100%"}, color="light", toggle_style=filter_toggle_style,
-                                className="filter-dropdown-menu"
+        dbc.Tooltip("Toggle Dark Mode", target="theme-toggle-btn", placement="bottom", id="theme-toggle-tooltip"),
+        dbc.Tooltip("Report a bug or data error", target="bug-report-icon", placement="bottom"),
+        dbc.Tooltip("Share with a friend", target="share-friend-icon", placement="bottom"),
+        dbc.Tooltip("Contact Us", target="open-contact-modal-btn", placement="bottom"),
+
+        html.Div(
+            dbc.Row([
+                dbc.Col(
+                    html.Div([
+                        dbc.Row([
+                            dbc.Col(
+                                dbc.DropdownMenu(
+                                    label="Prefecture",
+                                    children=[
+                                        html.Div(
+                                            dbc.Checklist(id="prefecture-dropdown", options=prefecture_options),
+                                            id="prefecture-checklist-container",
+                                            style={"maxHeight": "150px", "overflowY": "auto", "padding": "5px 10px"}
+                                        )
+                                    ],
+                                    id="prefecture-menu",
+                                    style={"width": "100%"}, color="light", toggle_style=filter_toggle_style,
+                                    className="filter-dropdown-menu"
+                                ),
+                                width=2
                             ),
-                            width=3
-                        ),
-                        dbc.Col(
-                            dbc.DropdownMenu(
-                                label="Season",
-                                children=[
-                                    html.Div(
-                                        dbc.Checklist(id="season-dropdown", options=season_options),
-                                        id="season-checklist-container",
-                                        style={"maxHeight": "150px", "overflowY": "auto", "padding": "5px 10px"}
-                                    )
-                                ],
-                                id="season-menu",
-                                style={"width": "100%"}, color="light", toggle_style=filter_toggle_style,
-                                className="filter-dropdown-menu"
+                            dbc.Col(
+                                dbc.DropdownMenu(
+                                    label="Season",
+                                    children=[
+                                        html.Div(
+                                            dbc.Checklist(id="season-dropdown", options=season_options),
+                                            id="season-checklist-container",
+                                            style={"maxHeight": "150px", "overflowY": "auto", "padding": "5px 10px"}
+                                        )
+                                    ],
+                                    id="season-menu",
+                                    style={"width": "100%"}, color="light", toggle_style=filter_toggle_style,
+                                    className="filter-dropdown-menu"
+                                ),
+                                width=1
                             ),
-                            width=2
-                        ),
-                        dbc.Col(
-                            dbc.DropdownMenu(
-                                label="Type",
-                                children=[
-                                    html.Div(
-                                        dbc.Checklist(id="type-dropdown", options=type_options),
-                                        id="type-checklist-container",
-                                        style={"maxHeight": "150px", "overflowY": "auto", "padding": "5px 10px"}
-                                    )
-                                ],
-                                id="type-menu",
-                                style={"width": "100%"}, color="light", toggle_style=filter_toggle_style,
-                                className="filter-dropdown-menu"
+                            dbc.Col(
+                                dbc.DropdownMenu(
+                                    label="Type",
+                                    children=[
+                                        html.Div(
+                                            dbc.Checklist(id="type-dropdown", options=type_options),
+                                            id="type-checklist-container",
+                                            style={"maxHeight": "150px", "overflowY": "auto", "padding": "5px 10px"}
+                                        )
+                                    ],
+                                    id="type-menu",
+                                    style={"width": "100%"}, color="light", toggle_style=filter_toggle_style,
+                                    className="filter-dropdown-menu"
+                                ),
+                                width=1
                             ),
-                            width=2
-                        ),
-                        dbc.Col(
-                            dbc.DropdownMenu(
-                                label="Dietary",
-                                children=[
-                                    html.Div(
-                                        dbc.Checklist(id="dietary-dropdown", options=dietary_options),
-                                        id="dietary-checklist-container",
-                                        style={"maxHeight": "150px", "overflowY": "auto", "padding": "5px 10px"}
-                                    )
-                                ],
-                                id="dietary-menu",
-                                style={"width": "100%"}, color="light", toggle_style=filter_toggle_style,
-                                className="filter-dropdown-menu"
+                            dbc.Col(
+                                dbc.DropdownMenu(
+                                    label="Dietary",
+                                    children=[
+                                        html.Div(
+                                            dbc.Checklist(id="dietary-dropdown", options=dietary_options),
+                                            id="dietary-checklist-container",
+                                            style={"maxHeight": "150px", "overflowY": "auto", "padding": "5px 10px"}
+                                        )
+                                    ],
+                                    id="dietary-menu",
+                                    style={"width": "100%"}, color="light", toggle_style=filter_toggle_style,
+                                    className="filter-dropdown-menu"
+                                ),
+                                width=1
                             ),
-                            width=2
-                        ),
-                        dbc.Col(dish_search_dropdown, width=3),
-                    ],
-                    id="filter-panel",
-                    style={
-                        "position": "absolute", "top": "20px", "left": "20px", "right": "23px",
-                        "zIndex": 1000, "backgroundColor": "rgba(255, 255, 255, 0.95)",
-                        "padding": "10px 15px", "borderRadius": "10px",
-                        "boxShadow": "0 2px 8px rgba(0,0,0,0.15)", "alignItems": "center"
-                    }),
-                    
-                    dcc.Graph(id="map", style={"flex": "1 1 auto", "border-radius": "15px","overflow": "hidden","minHeight": 0}),
-                    
-                    html.Button(
-                        html.I(className="fa fa-map-marker"),
-                        id="enable-location-btn",
-                        n_clicks=0,
-                        style={
-                            "position": "absolute", "bottom": "75px", "right": "25px", "zIndex": "1000",
-                            "backgroundColor": "white", "border": "1px solid #CCC",
-                            "borderRadius": "50%", "width": "42px", "height": "42px",
-                            "fontSize": "20px", "boxShadow": "0 2px 6px rgba(0,0,0,0.2)",
-                            "cursor": "pointer", "display": "flex", "alignItems": "center",
-                            "justifyContent": "center", "padding": "0"
-                        }
-                    ),
-                    dbc.Tooltip("Enable Location", target="enable-location-btn", placement="left"),
-                ],
-                id="map-panel-wrapper",
-                style={
-                    "height": "100%", "border": "1px solid #E0E0E0",
-                    "box-shadow": "0 4px 12px rgba(0, 0, 0, 0.05)", "border-radius": "15px",
-                    "padding": "20px", "box-sizing": "border-box", "display": "flex",
-                    "flexDirection": "column", "backgroundColor": "#F8F9FA",
-                    "position": "relative"
-                }),
-                width=5
-            ),
-            dbc.Col(
-                html.Div(
-                    [
-                        html.Div(
-                            [
-                                html.Span(
-                                    "Select a Dish",
-                                    id="dish-title",
-                                    style={
-                                        "fontSize": "18px", "fontWeight": "600",
-                                        "backgroundColor": "#e9ecef", "color": "#212529",
-                                        "padding": "8px 16px", "borderRadius": "8px",
-                                        "margin": 0,
-                                        "flexShrink": 0
-                                    }
+                            dbc.Col(
+                                dbc.DropdownMenu(
+                                    label="Ingredients",
+                                    children=[
+                                        html.Div(
+                                            dbc.Input(
+                                                id="ingredient-search",
+                                                type="search",
+                                                placeholder="Find an ingredient",
+                                                style={"height": "32px", "fontSize": "14px"}
+                                            ),
+                                            style={"padding": "5px 10px"}
+                                        ),
+                                        dbc.DropdownMenuItem("Contains", header=True),
+                                        html.Div(
+                                            dbc.Checklist(id="ingredient-include", options=[]),
+                                            id="ingredient-include-container",
+                                            style={"maxHeight": "150px", "overflowY": "auto", "padding": "5px 10px"}
+                                        ),
+                                        dbc.DropdownMenuItem(divider=True),
+                                        dbc.DropdownMenuItem("Without", header=True),
+                                        html.Div(
+                                            dbc.Checklist(id="ingredient-exclude", options=[]),
+                                            id="ingredient-exclude-container",
+                                            style={"maxHeight": "150px", "overflowY": "auto", "padding": "5px 10px"}
+                                        )
+                                    ],
+                                    id="ingredient-menu",
+                                    style={"width": "100%"}, color="light", toggle_style=filter_toggle_style,
+                                    className="filter-dropdown-menu"
+                                ),
+                                width=2
+                            ),
+                            dbc.Col(
+                                dbc.DropdownMenu(
+                                    label="Nutrients",
+                                    children=[
+                                        html.Div(
+                                            nutrient_range_sliders,
+                                            id="nutrient-slider-container",
+                                            style={"width": "280px", "padding": "5px 15px"}
+                                        )
+                                    ],
+                                    id="nutrient-menu",
+                                    style={"width": "100%"}, color="light", toggle_style=filter_toggle_style,
+                                    className="filter-dropdown-menu"
+                                ),
+                                width=1
+                            ),
+                            dbc.Col(
+                                dbc.Input(
+                                    id="text-search",
+                                    type="search",
+                                    debounce=True,
+                                    placeholder="Dishes, ingredients, history",
+                                    style={"height": "38px", "fontSize": "14px"}
                                 ),
-                                html.Span(
-                                    "",
-                                    id="dish-prefecture-badge",
-                                    style={
-                                        "fontSize": "18px", "fontWeight": "600",
-                                        "backgroundColor": "#f8d7da",
-                                        "color": "#721c24",
-                                        "padding": "8px 16px", "borderRadius": "8px",
-                                        "display": "none"
-                                    }
-                                )
-                            ],
+                                width=2
+                            ),
+                            dbc.Col(dish_search_dropdown(), width=2),
+                        ],
+                        id="filter-panel",
+                        style={
+                            "position": "absolute", "top": "20px", "left": "20px", "right": "23px",
+                            "zIndex": 1000, "backgroundColor": "var(--filter-panel-bg)",
+                            "padding": "10px 15px", "borderRadius": "10px",
+                            "boxShadow": "var(--filter-panel-shadow)", "alignItems": "center"
+                        }),
+
+                        dcc.Graph(id="map", style={"flex": "1 1 auto", "border-radius": "15px","overflow": "hidden","minHeight": 0}),
+
+                        html.Button(
+                            html.I(className="fa fa-map-marker"),
+                            id="enable-location-btn",
+                            n_clicks=0,
                             style={
-                                "display": "flex",
-                                "alignItems": "center",
-                                "flexWrap": "wrap",
-                                "gap": "10px",
-                                "marginBottom": "20px"
+                                "position": "absolute", "bottom": "75px", "right": "25px", "zIndex": "1000",
+                                "backgroundColor": "var(--map-btn-bg)", "border": "var(--map-btn-border)",
+                                "borderRadius": "50%", "width": "42px", "height": "42px",
+                                "fontSize": "20px", "boxShadow": "var(--map-btn-shadow)",
+                                "cursor": "pointer", "display": "flex", "alignItems": "center",
+                                "justifyContent": "center", "padding": "0", "color": "var(--map-btn-color)"
                             }
                         ),
-                        
-                        html.Div(
-                            create_right_panel(dish_name=None),
-                            id="dish-info",
+                        dbc.Tooltip("Enable Location", target="enable-location-btn", placement="left"),
+                        html.Button(
+                            html.I(className="fa fa-cutlery"),
+                            id="near-me-btn",
+                            n_clicks=0,
                             style={
-                                "display": "flex", "flexDirection": "column",
-                                "flex": 1, "minHeight": 0
+                                "position": "absolute", "bottom": "125px", "right": "25px", "zIndex": "1000",
+                                "backgroundColor": "var(--map-btn-bg)", "border": "var(--map-btn-border)",
+                                "borderRadius": "50%", "width": "42px", "height": "42px",
+                                "fontSize": "20px", "boxShadow": "var(--map-btn-shadow)",
+                                "cursor": "pointer", "display": "flex", "alignItems": "center",
+                                "justifyContent": "center", "padding": "0", "color": "var(--map-btn-color)"
                             }
-                        )
+                        ),
+                        dbc.Tooltip("Restaurants Near Me", target="near-me-btn", placement="left"),
                     ],
-                    id="info-panel-wrapper",
+                    id="map-panel-wrapper",
                     style={
-                        "height": "100%", "border": "1px solid #E0E0E0",
-                        "box-shadow": "0 4px 12px rgba(0, 0, 0, 0.05)",
-                        "border-radius": "15px", "padding": "20px",
-                        "box-sizing": "border-box", "display": "flex",
-                        "flexDirection": "column", "backgroundColor": "#F8F9FA",
-                        "overflowY": "auto"
-                    }
+                        "height": "100%", "border": "var(--panel-border)",
+                        "box-shadow": "var(--panel-shadow)", "border-radius": "15px",
+                        "padding": "20px", "box-sizing": "border-box", "display": "flex",
+                        "flexDirection": "column", "backgroundColor": "var(--panel-bg)",
+                        "position": "relative"
+                    }),
+                    width=5
                 ),
-                width=7
-            )
-        ], style={"flex": 1, "minHeight": 0, "margin": 0},className="g-4"),
-        id="main-content",
-        style={"display": "flex", "flexDirection": "column", "flex": 1,"padding": "0 20px 20px 20px"}
+                dbc.Col(
+                    html.Div(
+                        [
+                            html.Div(
+                                [
+                                    html.Span(
+                                        "Select a Dish",
+                                        id="dish-title",
+                                        style={
+                                            "fontSize": "18px", "fontWeight": "600",
+                                            "backgroundColor": "var(--dish-title-bg)", "color": "var(--dish-title-color)",
+                                            "padding": "8px 16px", "borderRadius": "8px",
+                                            "margin": 0,
+                                            "flexShrink": 0
+                                        }
+                                    ),
+                                    html.Span(
+                                        "",
+                                        id="dish-prefecture-badge",
+                                        className="region-badge",
+                                        style={
+                                            "fontSize": "18px", "fontWeight": "600",
+                                            "--region-bg": "#f8d7da",
+                                            "--region-text": "#721c24",
+                                            "padding": "8px 16px", "borderRadius": "8px",
+                                            "display": "none"
+                                        }
+                                    )
+                                ],
+                                style={
+                                    "display": "flex",
+                                    "alignItems": "center",
+                                    "flexWrap": "wrap",
+                                    "gap": "10px",
+                                    "marginBottom": "20px"
+                                }
+                            ),
+
+                            html.Div(
+                                create_right_panel(dish_id=None),
+                                id="dish-info",
+                                style={
+                                    "display": "flex", "flexDirection": "column",
+                                    "flex": 1, "minHeight": 0
+                                }
+                            )
+                        ],
+                        id="info-panel-wrapper",
+                        style={
+                            "height": "100%", "border": "var(--panel-border)",
+                            "box-shadow": "var(--panel-shadow)",
+                            "border-radius": "15px", "padding": "20px",
+                            "box-sizing": "border-box", "display": "flex",
+                            "flexDirection": "column", "backgroundColor": "var(--panel-bg)",
+                            "overflowY": "auto"
+                        }
+                    ),
+                    width=7
+                )
+            ], style={"flex": 1, "minHeight": 0, "margin": 0},className="g-4"),
+            id="main-content",
+            style={"display": "flex", "flexDirection": "column", "flex": 1,"padding": "0 20px 20px 20px"}
+        )
+    ],
+    fluid=True,
+    id="main-container",
+    className="theme-light",
+    style={"minHeight": "100vh", "display": "flex", "flexDirection": "column","backgroundColor": "var(--app-bg)","fontFamily": "'Noto Sans JP', sans-serif"}
     )
-],
-fluid=True,
-id="main-container",
-style={"minHeight": "100vh", "display": "flex", "flexDirection": "column","backgroundColor": "#F0F2F5","fontFamily": "'Noto Sans JP', sans-serif"}
-)
+
+
+# The layout is built per data version, so a page loaded after a reload gets the
+# new filter options.
+layout_cache = LRUCache("layout", maxsize=2)
+
+
+def serve_layout():
+    data = current_dataset()
+    return layout_cache.get_or_compute(data.version, lambda: build_layout(data))
+
+
+app.layout = serve_layout
 
 app.clientside_callback(
     """
@@ -1103,338 +1716,339 @@ app.clientside_callback(
     Input("enable-location-btn", "n_clicks")
 )
 
-@app.callback(
+app.clientside_callback(
+    """
+    function(n_clicks, isDark) {
+        return !isDark;
+    }
+    """,
     Output("dark-mode", "data"),
     Input("theme-toggle-btn", "n_clicks"),
     State("dark-mode", "data"),
     prevent_initial_call=True
 )
-def toggle_dark_mode(n_clicks, is_dark):
-    return not is_dark
 
-@app.callback(
-    Output("main-container", "style"),
-    Output("main-title", "style"),
-    Output("top-bar", "style"),
-    Output("bug-report-icon", "style"),
-    Output("share-friend-icon", "style"),
-    Output("open-contact-modal-btn", "style"),
-    Output("theme-toggle-btn", "style"),
-    Output("map-panel-wrapper", "style"),
-    Output("info-panel-wrapper", "style"),
-    Output("filter-panel", "style"),
-    Output("dish-title", "style"),
-    Output("enable-location-btn", "style"),
+app.clientside_callback(
+    """
+    function(isDark) {
+        document.body.classList.toggle("theme-dark", !!isDark);
+        return [
+            isDark ? "theme-dark" : "theme-light",
+            isDark ? "fa fa-sun-o" : "fa fa-moon-o",
+            isDark ? "Toggle Light Mode" : "Toggle Dark Mode"
+        ];
+    }
+    """,
+    Output("main-container", "className"),
     Output("theme-icon", "className"),
     Output("theme-toggle-tooltip", "children"),
-    Output("contact-modal", "style"),
-    Output("modal-header", "style"),
-    Output("modal-body", "style"),
-    Output("modal-footer", "style"),
-    Output("modal-p", "style"),
-    Output("modal-label-1", "style"),
-    Output("modal-label-2", "style"),
-    Output("contact-email", "style"),
-    Output("contact-message", "style"),
     Input("dark-mode", "data")
 )
-def update_theme_styles(is_dark):
-    base_toggle_style = filter_toggle_style.copy()
-    
-    base_checklist_style = {"maxHeight": "150px", "overflowY": "auto", "padding": "5px 10px"}
-
-    if is_dark:
-        main_container_style = {"minHeight": "100vh", "display": "flex", "flexDirection": "column","backgroundColor": "#121212","fontFamily": "'Noto Sans JP', sans-serif"}
-        main_title_style = {"margin": "0", "color": "#E0E0E0"}
-        top_bar_style = {"display": "flex", "alignItems": "center", "padding": "10px 20px 0px 10px"}
-        
-        icon_style = {"textDecoration": "none", "color": "#888", "fontSize": "26px", "marginLeft": "20px"}
-        toggle_icon_style = {"textDecoration": "none", "color": "#888", "fontSize": "26px", "cursor": "pointer"}
-        
-        map_panel_style = {
-            "height": "100%", "border": "1px solid #3a3a3a", "box-shadow": "0 4px 12px rgba(0, 0, 0, 0.3)",
-            "border-radius": "15px", "padding": "20px", "box-sizing": "border-box", "display": "flex",
-            "flexDirection": "column", "backgroundColor": "#1a1a1a", "position": "relative"
-        }
-        info_panel_style = {
-            "height": "100%", "border": "1px solid #3a3a3a", "box-shadow": "0 4px 12px rgba(0, 0, 0, 0.3)",
-            "border-radius": "15px", "padding": "20px", "box-sizing": "border-box", "display": "flex",
-            "flexDirection": "column", "backgroundColor": "#1a1a1a", "overflowY": "auto"
-        }
-        filter_panel_style = {
-            "position": "absolute", "top": "20px", "left": "20px", "right": "23px", "zIndex": 1000,
-            "backgroundColor": "rgba(43, 43, 43, 0.95)",
-            "padding": "10px 15px", "borderRadius": "10px", "boxShadow": "0 2px 8px rgba(0,0,0,0.5)",
-            "alignItems": "center"
-        }
-        
-        dish_title_style = {
-            "fontSize": "18px", "fontWeight": "600", "backgroundColor": "#3a3a3a", "color": "#E0E0E0",
-            "padding": "8px 16px", "borderRadius": "8px",
-            "margin": 0, "flexShrink": 0
-        }
 
-        location_btn_style = {
-            "position": "absolute", "bottom": "75px", "right": "25px", "zIndex": "1000",
-            "backgroundColor": "#3a3a3a", "border": "1px solid #4a4a4a",
-            "borderRadius": "50%", "width": "42px", "height": "42px", "fontSize": "20px",
-            "boxShadow": "0 2px 6px rgba(0,0,0,0.5)", "cursor": "pointer", "display": "flex",
-            "alignItems": "center", "justifyContent": "center", "padding": "0", "color": "#E0E0E0"
-        }
-        theme_icon_class = "fa fa-sun-o"
-        
-        
-        modal_style = {"backgroundColor": "#2b2b2b"}
-        modal_header_style = {"borderBottom": "1px solid #3a3a3a", "color": "#E0E0E0"}
-        modal_body_style = {"backgroundColor": "#2b2b2b"}
-        modal_footer_style = {"backgroundColor": "#2b2b2b", "borderTop": "1px solid #3a3a3a"}
-        modal_p_style = {"color": "#B0B0B0"}
-        modal_label_style = {"color": "#E0E0E0"}
-        modal_input_style = {"backgroundColor": "#3a3a3a", "color": "#E0E0E0", "border": "1px solid #4a4a4a"}
-        modal_textarea_style = {"height": "120px", "backgroundColor": "#3a3a3a", "color": "#E0E0E0", "border": "1px solid #4a4a4a"}
-
-        return (
-            main_container_style, main_title_style, top_bar_style,
-            icon_style, icon_style, icon_style, toggle_icon_style,
-            map_panel_style, info_panel_style, filter_panel_style, dish_title_style, location_btn_style,
-            theme_icon_class,
-            "Toggle Light Mode",
-            modal_style, modal_header_style, modal_body_style, modal_footer_style,
-            modal_p_style, modal_label_style, modal_label_style,
-            modal_input_style, modal_textarea_style
-        )
-        
-    else:
-        main_container_style = {"minHeight": "100vh", "display": "flex", "flexDirection": "column","backgroundColor": "#F0F2F5","fontFamily": "'Noto Sans JP', sans-serif"}
-        main_title_style = {"margin": "0", "color": "black"}
-        top_bar_style = {"display": "flex", "alignItems": "center", "padding": "10px 20px 0px 10px"}
-        
-        icon_style = {"textDecoration": "none", "color": "#A0A0A0", "fontSize": "26px", "marginLeft": "20px"}
-        toggle_icon_style = {"textDecoration": "none", "color": "#A0A0A0", "fontSize": "26px", "cursor": "pointer"}
+# Light -> dark colour pairs; the radar figure is a plotly figure, so it is recoloured in place.
+RADAR_DARK_COLORS = dict(zip(radar_theme_colors(False), radar_theme_colors(True)))
+for radar_band in RADAR_BANDS.values():
+    RADAR_DARK_COLORS[radar_band["fill_color"][1]] = radar_band["fill_color"][0]
 
-        map_panel_style = {
-            "height": "100%", "border": "1px solid #E0E0E0", "box-shadow": "0 4px 12px rgba(0, 0, 0, 0.05)",
-            "border-radius": "15px", "padding": "20px", "box-sizing": "border-box", "display": "flex",
-            "flexDirection": "column", "backgroundColor": "#F8F9FA", "position": "relative"
-        }
-        info_panel_style = {
-            "height": "100%", "border": "1px solid #E0E0E0", "box-shadow": "0 4px 12px rgba(0, 0, 0, 0.05)",
-            "border-radius": "15px", "padding": "20px", "box-sizing": "border-box", "display": "flex",
-            "flexDirection": "column", "backgroundColor": "#F8F9FA", "overflowY": "auto"
-        }
-        filter_panel_style = {
-            "position": "absolute", "top": "20px", "left": "20px", "right": "23px", "zIndex": 1000,
-            "backgroundColor": "rgba(255, 255, 255, 0.95)",
-            "padding": "10px 15px", "borderRadius": "10px", "boxShadow": "0 2px 8px rgba(0,0,0,0.15)",
-            "alignItems": "center"
+app.clientside_callback(
+    """
+    function(isDark, figure) {
+        if (!figure) {
+            return window.dash_clientside.no_update;
         }
-        
-        dish_title_style = {
-            "fontSize": "18px", "fontWeight": "600", "backgroundColor": "#e9ecef", "color": "#212529",
-            "padding": "8px 16px", "borderRadius": "8px",
-            "margin": 0, "flexShrink": 0
+        const toDark = %s;
+        const swap = {};
+        Object.keys(toDark).forEach(light => {
+            if (isDark) { swap[light] = toDark[light]; } else { swap[toDark[light]] = light; }
+        });
+        function recolour(value) {
+            if (typeof value === "string") {
+                return swap.hasOwnProperty(value) ? swap[value] : value;
+            }
+            if (Array.isArray(value)) {
+                return value.map(recolour);
+            }
+            if (value && typeof value === "object") {
+                const out = {};
+                Object.keys(value).forEach(k => { out[k] = recolour(value[k]); });
+                return out;
+            }
+            return value;
         }
+        return {data: recolour(figure.data), layout: recolour(figure.layout)};
+    }
+    """ % json.dumps(RADAR_DARK_COLORS),
+    Output("radar-chart", "figure", allow_duplicate=True),
+    Input("dark-mode", "data"),
+    State("radar-chart", "figure"),
+    prevent_initial_call=True
+)
 
-        location_btn_style = {
-            "position": "absolute", "bottom": "75px", "right": "25px", "zIndex": "1000",
-            "backgroundColor": "white", "border": "1px solid #CCC",
-            "borderRadius": "50%", "width": "42px", "height": "42px", "fontSize": "20px",
-            "boxShadow": "0 2px 6px rgba(0,0,0,0.2)", "cursor": "pointer", "display": "flex",
-            "alignItems": "center", "justifyContent": "center", "padding": "0", "color": "black"
-        }
-        theme_icon_class = "fa fa-moon-o"
-        
-        
-        modal_style = {}
-        modal_header_style = {}
-        modal_body_style = {}
-        modal_footer_style = {}
-        modal_p_style = {}
-        modal_label_style = {}
-        modal_input_style = {}
-        modal_textarea_style = {"height": "120px"}
-        
-        return (
-            main_container_style, main_title_style, top_bar_style,
-            icon_style, icon_style, icon_style, toggle_icon_style,
-            map_panel_style, info_panel_style, filter_panel_style, dish_title_style, location_btn_style,
-            theme_icon_class,
-            "Toggle Dark Mode",
-            modal_style, modal_header_style, modal_body_style, modal_footer_style,
-            modal_p_style, modal_label_style, modal_label_style,
-            modal_input_style, modal_textarea_style
-        )
+
+def update_map(selected_prefectures, selected_seasons, selected_types, selected_dietary, included_ingredients,
+               excluded_ingredients, nutrient_ranges, selected_dish, search_text, user_location, clicked_dish, is_dark,
+               map_filtering="server"):
+    if map_filtering == "client":
+        return no_update
+    figure = base_map_figure(
+        selected_prefectures, selected_seasons, selected_types, selected_dietary, included_ingredients,
+        excluded_ingredients, nutrient_ranges, selected_dish, search_text, is_dark
+    )
+    return with_overlays(figure, user_location, current_dataset().dish_index.id_from_reference(clicked_dish))
 
 
-@app.callback(
+app.callback(
     Output("map", "figure"),
     Input("prefecture-dropdown", "value"),
     Input("season-dropdown", "value"),
     Input("type-dropdown", "value"),
     Input("dietary-dropdown", "value"),
+    Input("ingredient-include", "value"),
+    Input("ingredient-exclude", "value"),
+    Input({"type": "nutrient-range", "index": ALL}, "value"),
     Input("dish-search", "value"),
-    Input("user-location", "data"),
-    Input("clicked-dish", "data"),
-    Input("dark-mode", "data")
+    Input("text-search", "value"),
+    State("user-location", "data"),
+    State("clicked-dish", "data"),
+    State("dark-mode", "data"),
+    State("map-filtering", "data")
+)(update_map)
+
+app.clientside_callback(
+    """
+    function(isDark, figure) {
+        if (!figure || !figure.layout || !figure.layout.map) {
+            return window.dash_clientside.no_update;
+        }
+        const map = Object.assign({}, figure.layout.map, {style: isDark ? "dark" : "light"});
+        return Object.assign({}, figure, {layout: Object.assign({}, figure.layout, {map: map})});
+    }
+    """,
+    Output("map", "figure", allow_duplicate=True),
+    Input("dark-mode", "data"),
+    State("map", "figure"),
+    prevent_initial_call=True
 )
-def update_map(selected_prefectures, selected_seasons, selected_types, selected_dietary, selected_dish, user_location, clicked_dish, is_dark):
-    filtered = dishes.copy()
-    
-    map_center = {"lat": 36, "lon": 138}
-    map_zoom = 4
 
-    if selected_prefectures:
-        filtered = filtered[filtered["prefecture"].isin(selected_prefectures)]
-    if selected_seasons:
-        filtered = filtered[filtered["seasonality"].isin(selected_seasons)]
-    if selected_types:
-        filtered = filtered[filtered["type"].isin(selected_types)]
-    if selected_dietary:
-        for col in selected_dietary:
-            filtered = filtered[filtered[col] == True]
-    
-    if selected_dish:
-        filtered = filtered[filtered["dish_name"] == selected_dish]
-        
-    fig = px.scatter_map(
-        filtered,
-        lat="area_lat",
-        lon="area_lon",
-        hover_name="dish_name",
-        zoom=map_zoom,
-        center=map_center,
-        color_discrete_sequence=["#FFFA00"],
-        size_max=20,
-    )
 
-    fig.update_traces(
-        hovertemplate="%{hovertext}<extra></extra>"
+if CLIENTSIDE_FILTERING:
+    # Full-text matching needs the index, so the server resolves the query to row
+    # ids and the browser filters with them.
+    @app.callback(Output("search-rows", "data"), Input("text-search", "value"), State("map-filtering", "data"))
+    def update_search_rows(search_text, map_filtering):
+        if map_filtering != "client":
+            return no_update
+        ranked = current_dataset().search_index.query(search_text)
+        return None if ranked is None else ranked.tolist()
+
+    app.clientside_callback(
+        """
+        function(prefectures, seasons, types, dietary, included, excluded, nutrientRanges, dishSearch, searchRows, userLocation, clickedDish, isDark, columns) {
+            if (!columns) {
+                return window.dash_clientside.no_update;
+            }
+            function selection(values, categories) {
+                if (!values || values.length === 0) {
+                    return null;
+                }
+                return new Set(values.map(v => categories.indexOf(v)));
+            }
+            const facets = [
+                [selection(prefectures, columns.categories.prefecture), columns.codes.prefecture],
+                [selection(seasons, columns.categories.seasonality), columns.codes.seasonality],
+                [selection(types, columns.categories.type), columns.codes.type]
+            ].filter(f => f[0] !== null);
+            let dietaryMask = 0;
+            (dietary || []).forEach(col => {
+                dietaryMask |= 1 << columns.dietary_columns.indexOf(col);
+            });
+
+            const matches = searchRows ? new Set(searchRows) : null;
+            // Ingredients are checked once per distinct ingredient list, not per dish.
+            const listOk = columns.ingredient_lists.map(names =>
+                (included || []).every(name => names.includes(name)) &&
+                !(excluded || []).some(name => names.includes(name))
+            );
+            // Sliders left at the full extent filter nothing, as on the server.
+            const ranges = [];
+            (nutrientRanges || []).forEach((range, k) => {
+                const bounds = columns.nutrient_bounds[k];
+                if (range && !(range[0] <= bounds[0] && range[1] >= bounds[1])) {
+                    ranges.push([columns.nutrients[k], range[0], range[1]]);
+                }
+            });
+
+            const lat = [], lon = [], hovertext = [], customdata = [];
+            for (let i = 0; i < columns.id.length; i++) {
+                if (dishSearch && columns.name[i] !== dishSearch) continue;
+                if (matches && !matches.has(columns.id[i])) continue;
+                if (!listOk[columns.ingredients[i]]) continue;
+                if ((columns.dietary[i] & dietaryMask) !== dietaryMask) continue;
+                if (!ranges.every(r => r[0][i] !== null && r[0][i] >= r[1] && r[0][i] <= r[2])) continue;
+                if (!facets.every(f => f[0].has(f[1][i]))) continue;
+                lat.push(columns.lat[i]);
+                lon.push(columns.lon[i]);
+                hovertext.push(columns.name[i]);
+                customdata.push([columns.id[i]]);
+            }
+
+            const skeleton = columns.figure;
+            const points = Object.assign({}, skeleton.data[0], {
+                lat: lat, lon: lon, hovertext: hovertext, customdata: customdata,
+                cluster: Object.assign({}, skeleton.data[0].cluster, {enabled: !dishSearch})
+            });
+            const user = Object.assign({}, skeleton.data[1], {lat: [], lon: []});
+            if (userLocation && userLocation.lat && userLocation.lon) {
+                user.lat = [userLocation.lat];
+                user.lon = [userLocation.lon];
+            }
+            const selected = Object.assign({}, skeleton.data[2], {lat: [], lon: [], customdata: [], hovertext: []});
+            const selectedIndex = clickedDish ? columns.name.indexOf(clickedDish.name) : -1;
+            if (selectedIndex >= 0) {
+                selected.lat = [columns.lat[selectedIndex]];
+                selected.lon = [columns.lon[selectedIndex]];
+                selected.customdata = [[columns.id[selectedIndex]]];
+                selected.hovertext = [columns.name[selectedIndex]];
+            }
+            const layout = Object.assign({}, skeleton.layout, {
+                map: Object.assign({}, skeleton.layout.map, {style: isDark ? "dark" : "light"})
+            });
+            return {data: [points, user, selected], layout: layout};
+        }
+        """,
+        Output("map", "figure", allow_duplicate=True),
+        Input("prefecture-dropdown", "value"),
+        Input("season-dropdown", "value"),
+        Input("type-dropdown", "value"),
+        Input("dietary-dropdown", "value"),
+        Input("ingredient-include", "value"),
+        Input("ingredient-exclude", "value"),
+        Input({"type": "nutrient-range", "index": ALL}, "value"),
+        Input("dish-search", "value"),
+        Input("search-rows", "data"),
+        Input("user-location", "data"),
+        Input("clicked-dish", "data"),
+        Input("dark-mode", "data"),
+        State("dish-columns", "data"),
+        prevent_initial_call="initial_duplicate"
     )
-    fig.update_traces(marker=dict(size=20))
-    
-    if not selected_dish:
-        fig.update_traces(cluster=dict(enabled=True))
 
-    if user_location and user_location.get("lat") and user_location.get("lon"):
-        fig.add_scattermap(
-            lat=[user_location["lat"]],
-            lon=[user_location["lon"]],
-            mode="markers",
-            marker=dict(size=15, color="#079DFF", symbol="circle"),
-            hoverinfo="text",
-            hovertext=["Current Location"],
-            name="User Location",
-            showlegend=False
-        )
 
-    if clicked_dish:
-        selected_row = dishes[dishes["dish_name"] == clicked_dish]
-        if not selected_row.empty:
-            lat = selected_row.iloc[0]["area_lat"]
-            lon = selected_row.iloc[0]["area_lon"]
-            fig.add_scattermap(
-                lat=[lat],
-                lon=[lon],
-                mode="markers",
-                marker=dict(size=20, color="#FF6000", symbol="circle"),
-                name="Selected Dish",
-                showlegend=False,
-                hoverinfo="none"
-            )
+app.clientside_callback(
+    """
+    function(searchValue) {
+        // Only the last keystroke of a burst reaches the server.
+        const pending = (window.dishSearchPending || 0) + 1;
+        window.dishSearchPending = pending;
+        return new Promise(resolve => setTimeout(() => {
+            resolve(pending === window.dishSearchPending ? searchValue : window.dash_clientside.no_update);
+        }, %d));
+    }
+    """ % DISH_SEARCH_DEBOUNCE_MS,
+    Output("dish-search-query", "data"),
+    Input("dish-search", "search_value"),
+    prevent_initial_call=True
+)
 
-    map_style = "dark" if is_dark else "light"
 
-    fig.update_layout(map_style=map_style, margin={"r":0,"t":0,"l":0,"b":0})
-    fig.update_layout(uirevision="keep-zoom")
+@app.callback(
+    Output("ingredient-include", "options"),
+    Output("ingredient-exclude", "options"),
+    Input("ingredient-search", "value"),
+    State("ingredient-include", "value"),
+    State("ingredient-exclude", "value")
+)
+def update_ingredient_options(query, included, excluded):
+    return ingredient_options(query, included), ingredient_options(query, excluded)
 
-    return fig
 
+@app.callback(
+    Output("dish-search", "options"),
+    Input("dish-search-query", "data"),
+    State("dish-search", "value")
+)
+def update_dish_search_options(query, selected_dish):
+    return dish_search_options(query, selected_dish)
 
+
+def dish_header(record):
+    badge_style = {
+        "fontSize": "18px", "fontWeight": "600",
+        "padding": "8px 16px", "borderRadius": "8px"
+    }
+    if record is None:
+        default_colors = REGION_COLORS["default"]
+        badge_style.update({
+            "--region-bg": default_colors["background"],
+            "--region-text": default_colors["text"],
+            "display": "none"
+        })
+        return "Select a Dish", "", badge_style
+
+    colors = REGION_COLORS.get(record.prefecture, REGION_COLORS["default"])
+    badge_style.update({
+        "--region-bg": colors["background"],
+        "--region-text": colors["text"],
+        "display": "inline-block"
+    })
+    return record.dish_name, f"{record.prefecture} Prefecture", badge_style
+
+
+def select_dish(dish_id, user_location, is_dark, changed):
+    record = current_dataset().dish_index.get(dish_id)
+    if record is not None:
+        panel_content = right_panel(record.dish_id, user_location, is_dark_mode=is_dark)
+    else:
+        panel_content = create_right_panel(dish_id=None, is_dark_mode=is_dark)
+    title, badge, badge_style = dish_header(record)
+    if changed:
+        map_patch = map_overlay_patch(user_location, dish_id, changed)
+    else:
+        map_patch = no_update
+    return panel_content, title, badge, badge_style, map_patch
+
+
+# One map click resolves the dish once and answers with the panel, header and
+# marker patch together, instead of cascading through the clicked-dish store.
 @app.callback(
+    Output("clicked-dish", "data"),
     Output("dish-info", "children"),
     Output("dish-title", "children"),
     Output("dish-prefecture-badge", "children"),
     Output("dish-prefecture-badge", "style"),
+    Output("map", "figure", allow_duplicate=True),
     Input("map", "clickData"),
-    Input("dark-mode", "data"),
     Input("user-location", "data"),
-    State("clicked-dish", "data")
+    Input({"type": "similar-dish", "index": ALL}, "n_clicks"),
+    State("clicked-dish", "data"),
+    State("dark-mode", "data"),
+    State("map-filtering", "data"),
+    prevent_initial_call="initial_duplicate"
 )
-def display_dish_info(clickData, is_dark, user_location, clicked_dish_name):
-    
-    ctx = callback_context
-    trigger_id = ctx.triggered[0]["prop_id"].split(".")[0]
-    
-    dish_name_to_render = None
-    
-    if trigger_id == "map":
-        if clickData:
-            dish_name_to_render = clickData["points"][0]["hovertext"]
-    
-    elif trigger_id == "dark-mode" or trigger_id == "user-location":
-        dish_name_to_render = clicked_dish_name
-    
-    if dish_name_to_render:
-        row = dishes[dishes["dish_name"] == dish_name_to_render]
-        if not row.empty:
-            main_ingredients = row.iloc[0]["main_ingredients"]
-            history = row.iloc[0]["history"]
-            image_url = row.iloc[0]["image_url"] if "image_url" in row.columns else None
-            prefecture = row.iloc[0]["prefecture"]
-            
-            colors = REGION_COLORS.get(prefecture, REGION_COLORS["default"])
-            
-            if is_dark:
-                bg_color = colors["text"]
-                text_color = colors["background"]
-            else:
-                bg_color = colors["background"]
-                text_color = colors["text"]
-
-            base_badge_style = {
-                "fontSize": "18px",
-                "fontWeight": "600",
-                "padding": "8px 16px",
-                "borderRadius": "8px"
-            }
-            
-            badge_style_visible = {
-                **base_badge_style,
-                "backgroundColor": bg_color,
-                "color": text_color,
-                "display": "inline-block"
-            }
-            
-            panel_content = create_right_panel(
-                main_ingredients,
-                history,
-                dish_name=dish_name_to_render,
-                image_url=image_url,
-                user_location=user_location,
-                is_dark_mode=is_dark
-            )
-            return panel_content, dish_name_to_render, f"{prefecture} Prefecture", badge_style_visible
-    
-    default_panel = create_right_panel(dish_name=None, is_dark_mode=is_dark)
-    
-    default_colors = REGION_COLORS["default"]
-    
-    if is_dark:
-        default_bg = default_colors["text"]
-        default_text = default_colors["background"]
+def update_selection(clickData, user_location, similar_clicks, clicked_dish, is_dark, map_filtering):
+    # The client keeps dish ids from the data version it was served, so every one
+    # is checked against its dish name before it is read against the current data.
+    dish_index = current_dataset().dish_index
+    triggered = list(callback_context.triggered_prop_ids.values())
+    similar = [component["index"] for component in triggered if isinstance(component, dict)]
+    changed = set()
+    if "map" in triggered:
+        dish_id = dish_index.id_from_click(clickData)
+        changed.add("clicked-dish")
+    elif similar and any(similar_clicks):
+        dish_id = dish_index.id_for_name(similar[0]) if isinstance(similar[0], str) else None
+        changed.add("clicked-dish")
     else:
-        default_bg = default_colors["background"]
-        default_text = default_colors["text"]
-        
-    badge_style_hidden_default = {
-        "fontSize": "18px", "fontWeight": "600",
-        "backgroundColor": default_bg,
-        "color": default_text,
-        "padding": "8px 16px", "borderRadius": "8px",
-        "display": "none"
-    }
-    
-    return default_panel, "Select a Dish", "", badge_style_hidden_default
+        dish_id = dish_index.id_from_reference(clicked_dish)
+    if "user-location" in triggered:
+        changed.add("user-location")
+
+    outputs = select_dish(dish_id, user_location, is_dark, changed)
+    stored_dish = dish_index.reference(dish_id) if "clicked-dish" in changed else no_update
+    if map_filtering == "client":
+        # The browser redraws the markers from the clicked-dish store itself.
+        return (stored_dish,) + outputs[:-1] + (no_update,)
+    return (stored_dish,) + outputs
 
 
 @app.callback(
@@ -1442,31 +2056,44 @@ def display_dish_info(clickData, is_dark, user_location, clicked_dish_name):
     Output("chart-subtitle-wrapper", "children"),
     Output("chart-annotation-box", "children"),
     Output("chart-annotation-box", "style"),
-    Input("clicked-dish", "data"),
     Input("standardize-scale-checkbox", "value"),
-    Input("dark-mode", "data"),
+    State("clicked-dish", "data"),
+    State("dark-mode", "data"),
     prevent_initial_call=True
 )
-def update_radar_chart(dish_name, standardize_scale, is_dark):
-    
-    if dish_name is None:
+def update_radar_chart(standardize_scale, clicked_dish, is_dark):
+    dish_id = current_dataset().dish_index.id_from_reference(clicked_dish)
+    if dish_id is None:
         fig, subtitle, annotation_children, annotation_style, _ = \
             generate_radar_chart_elements(None, False, is_dark_mode=is_dark)
         return fig, subtitle, annotation_children, annotation_style
 
     fig, subtitle_children, annotation_box_children, annotation_box_style, _ = \
-        generate_radar_chart_elements(dish_name, standardize_scale, is_dark_mode=is_dark)
+        generate_radar_chart_elements(dish_id, standardize_scale, is_dark_mode=is_dark)
     
     return fig, subtitle_children, annotation_box_children, annotation_box_style
 
 @app.callback(
-    Output("clicked-dish", "data"),
-    Input("map", "clickData")
+    Output("near-me-modal", "is_open"),
+    Input("near-me-btn", "n_clicks"),
+    Input("close-near-me-btn", "n_clicks"),
+    prevent_initial_call=True
 )
-def store_clicked_dish(clickData):
-    if clickData:
-        return clickData["points"][0]["hovertext"]
-    return None
+def toggle_near_me_modal(n_open, n_close):
+    trigger_id = callback_context.triggered[0]["prop_id"].split(".")[0]
+    return trigger_id == "near-me-btn"
+
+@app.callback(
+    Output("near-me-results", "children"),
+    Input("near-me-modal", "is_open"),
+    Input("near-me-mode", "value"),
+    Input("user-location", "data"),
+    prevent_initial_call=True
+)
+def update_near_me(is_open, mode, user_location):
+    if not is_open:
+        return no_update
+    return create_near_me_results(user_location, mode)
 
 @app.callback(
     Output("contact-modal", "is_open"),
@@ -0,0 +1,232 @@
+"""Time the app's server callbacks over datasets of 1x, 100x and 10,000x the shipped size.
+
+For each scale a synthetic dataset is generated once (tools/generate_dataset.py,
+cached under --data-root) and a fresh interpreter imports the app against it
+through KYODO_DATA_DIR. Every case reports the median and p95 time per call,
+the peak traced allocation of one call and the size of its JSON-serialised
+output. Cases marked "cold" clear the app's caches before every call.
+
+Save a baseline, then compare later runs against it; the exit status is 1 when
+any case is slower or larger than the baseline by more than --threshold:
+
+    python -m benchmarks.bench_callbacks --scales 1 100 --write-baseline
+    python -m benchmarks.bench_callbacks --scales 1 100 --threshold 0.25
+
+Imports the app, so the full requirements must be installed.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+from plotly.io.json import to_json_plotly
+
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline_callbacks.json")
+COMPARED_METRICS = ("median_ms", "peak_kb", "output_bytes")
+
+
+def callback_cases(app, n_picks=20, seed=0):
+    rng = np.random.default_rng(seed)
+    data = app.current_dataset()
+    dish_ids = [int(i) for i in rng.integers(0, len(data.dish_index), n_picks)]
+    records = [data.dish_index.get(i) for i in dish_ids]
+    prefecture = records[0].prefecture
+    location = {"lat": 35.6812, "lon": 139.7671}
+    # A drag of the calories slider's upper handle, the other sliders left open.
+    ranges = data.facet_filter.range_indexes
+    open_ranges = [[index.min, index.max] for index in ranges.values()]
+    calories = ranges["calories"]
+    drag = [
+        [[calories.min, float(high)], *open_ranges[1:]]
+        for high in np.quantile(calories.values, np.linspace(0.9, 0.1, n_picks))
+    ]
+
+    def clear_caches():
+        app.base_map_cache.clear()
+        app.right_panel_cache.clear()
+        app.radar_cache.clear()
+        data.facet_filter._query.cache_clear()
+        data.facet_filter._base_bitmap.cache_clear()
+        data.facet_filter._range_bitmap.cache_clear()
+
+    cases = [
+        ("update_map, no filters", False, [
+            lambda: app.update_map(None, None, None, None, None, None, None, None, None, location, dish_ids[0], False)
+        ]),
+        ("update_map, one prefecture", False, [
+            lambda: app.update_map([prefecture], None, None, None, None, None, None, None, None, location, dish_ids[0], False)
+        ]),
+        ("update_map, season + dietary", False, [
+            lambda: app.update_map(None, ["winter"], None, ["no_pork", "no_nuts"], None, None, None, None, None, None, None, True)
+        ]),
+        ("update_map, dish search", False, [
+            lambda r=r: app.update_map(None, None, None, None, None, None, None, r.dish_name, None, None, r.dish_id, False) for r in records
+        ]),
+        ("update_map, nutrient slider drag", False, [
+            lambda d=d: app.update_map([prefecture], None, None, None, None, None, d, None, None, None, None, False) for d in drag
+        ]),
+        ("select_dish, click", False, [
+            lambda i=i: app.select_dish(i, location, False, {"clicked-dish"}) for i in dish_ids
+        ]),
+        ("select_dish, location change", False, [
+            lambda i=i: app.select_dish(i, location, True, {"user-location"}) for i in dish_ids
+        ]),
+        ("create_right_panel", False, [
+            lambda i=i: app.create_right_panel(i, location, False) for i in dish_ids
+        ]),
+        ("generate_radar_chart_elements", False, [
+            lambda i=i: app.generate_radar_chart_elements(i, False, False) for i in dish_ids
+        ]),
+        ("create_near_me_results, 10 nearest", False, [
+            lambda: app.create_near_me_results(location, "k10")
+        ]),
+        ("create_near_me_results, within 20 km", False, [
+            lambda: app.create_near_me_results(location, "r20")
+        ]),
+    ]
+    cold = [(f"{label} (cold)", True, calls) for label, _, calls in cases if not label.startswith("create_")]
+    return cases + cold, clear_caches
+
+
+def measure(calls, clear_caches, cold, repeats):
+    timings, peaks, sizes = [], [], []
+    for _ in range(repeats):
+        for call in calls:
+            if cold:
+                clear_caches()
+            start = time.perf_counter()
+            call()
+            timings.append(time.perf_counter() - start)
+
+    for call in calls[:5]:
+        if cold:
+            clear_caches()
+        tracemalloc.start()
+        output = call()
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        sizes.append(len(to_json_plotly(output).encode("utf-8")))
+
+    return {
+        "median_ms": float(np.median(timings) * 1e3),
+        "p95_ms": float(np.percentile(timings, 95) * 1e3),
+        "peak_kb": float(np.median(peaks) / 1024),
+        "output_bytes": int(np.median(sizes)),
+        "calls": len(timings),
+    }
+
+
+def run_worker(scale, repeats):
+    start = time.perf_counter()
+    import app
+    import_s = time.perf_counter() - start
+
+    cases, clear_caches = callback_cases(app)
+    results = {}
+    for label, cold, calls in cases:
+        results[f"{scale}x/{label}"] = measure(calls, clear_caches, cold, repeats)
+    data = app.current_dataset()
+    results[f"{scale}x/import app"] = {"median_ms": import_s * 1e3, "dishes": len(data.dish_index), "places": len(data.places)}
+    json.dump(results, sys.stdout)
+
+
+def dataset_dir(scale, data_root):
+    if scale == 1:
+        return "data"
+    path = os.path.join(data_root, f"scale-{scale}")
+    if not os.path.exists(os.path.join(path, "all_dishes.csv")):
+        from tools.generate_dataset import SeedProfile, generate
+        import pandas as pd
+
+        profile = SeedProfile(pd.read_csv("data/all_dishes.csv"), pd.read_csv("data/all_places.csv"))
+        print(f"generating {scale}x dataset in {path} ...", file=sys.stderr)
+        generate(path, len(profile.dishes) * scale, profile.n_places * scale, seed=0, profile=profile)
+    return path
+
+
+def run_scale(scale, data_root, repeats):
+    env = dict(
+        os.environ, KYODO_DATA_DIR=dataset_dir(scale, data_root),
+        KYODO_WARM_PANEL_CACHE="0", KYODO_WARM_MAP_CACHE="0", KYODO_CLIENTSIDE_FILTERING="0"
+    )
+    worker = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_callbacks", "--worker", str(scale), "--repeats", str(repeats)],
+        env=env, stdout=subprocess.PIPE, check=True, text=True
+    )
+    return json.loads(worker.stdout)
+
+
+def regressions(results, baseline, threshold, min_delta_ms):
+    found = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        for metric in COMPARED_METRICS:
+            if metric not in current or metric not in previous or not previous[metric]:
+                continue
+            ratio = current[metric] / previous[metric]
+            if metric == "median_ms" and current[metric] - previous[metric] < min_delta_ms:
+                continue
+            if ratio > 1 + threshold:
+                found.append((key, metric, previous[metric], current[metric], ratio))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 100, 10000])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--data-root", default="data/synthetic")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--write-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed fractional increase over the baseline")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="ignore slowdowns smaller than this")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        run_worker(args.worker, args.repeats)
+        return 0
+
+    results = {}
+    for scale in args.scales:
+        results.update(run_scale(scale, args.data_root, args.repeats))
+
+    print(f"  {'case':<52} {'median':>10} {'p95':>10} {'peak':>11} {'output':>12}")
+    for key, r in results.items():
+        if "peak_kb" not in r:
+            print(f"  {key:<52} {r['median_ms']:>7.0f} ms   dishes={r['dishes']:,} places={r['places']:,}")
+            continue
+        print(
+            f"  {key:<52} {r['median_ms']:>7.2f} ms {r['p95_ms']:>7.2f} ms "
+            f"{r['peak_kb']:>8,.0f} KB {r['output_bytes']:>10,} B"
+        )
+
+    if args.write_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}; run with --write-baseline first")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    found = regressions(results, baseline, args.threshold, args.min_delta_ms)
+    for key, metric, before, after, ratio in found:
+        print(f"REGRESSION {key} {metric}: {before:,.2f} -> {after:,.2f} ({ratio:.2f}x)")
+    if found:
+        return 1
+    print(f"no regressions beyond {args.threshold:.0%} of {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""Server callbacks, time and bytes spent on one map click: old cascade vs. selection pipeline.
+
+The old cascade is replayed from the helpers its callbacks called: the click fired
+store_clicked_dish and display_dish_info, and the clicked-dish store they wrote then
+fired update_radar_chart and update_map_overlays in a second round trip.
+
+Run from the repository root (imports the app, so the full requirements must
+be installed). Disable the cache warm-up threads so the cold runs stay cold:
+
+    KYODO_WARM_PANEL_CACHE=0 KYODO_WARM_MAP_CACHE=0 python -m benchmarks.bench_click_trace --clicks 200
+"""
+import argparse
+import time
+
+import numpy as np
+from plotly.io.json import to_json_plotly
+
+import app
+
+
+def click_data(dish_id):
+    record = app.current_dataset().dish_index.get(dish_id)
+    return {"points": [{"lat": record.area_lat, "lon": record.area_lon, "customdata": [record.dish_id],
+                        "hovertext": record.dish_name}]}
+
+
+def cascade(click, user_location, is_dark):
+    dish_id = app.current_dataset().dish_index.id_from_click(click)
+    yield "store_clicked_dish", 1, dish_id
+
+    clicked = app.current_dataset().dish_index.id_from_click(click)
+    panel = app.right_panel(clicked, user_location, is_dark_mode=is_dark)
+    yield "display_dish_info", 1, (panel,) + app.dish_header(app.current_dataset().dish_index.get(clicked))
+
+    yield "update_radar_chart", 2, app.generate_radar_chart_elements(dish_id, False, is_dark_mode=is_dark)[:4]
+    yield "update_map_overlays", 2, app.map_overlay_patch(user_location, dish_id, {"clicked-dish"})
+
+
+def pipeline(click, user_location, is_dark):
+    dish_id = app.current_dataset().dish_index.id_from_click(click)
+    yield "update_selection", 1, (dish_id,) + app.select_dish(dish_id, user_location, is_dark, {"clicked-dish"})
+
+
+def trace(replay, clicks, user_location, is_dark=False):
+    callbacks, round_trips, seconds, payload = [], [], [], []
+    for click in clicks:
+        n_callbacks, trips, elapsed, size = 0, 0, 0.0, 0
+        steps = replay(click, user_location, is_dark)
+        while True:
+            start = time.perf_counter()
+            try:
+                _, trip, outputs = next(steps)
+            except StopIteration:
+                break
+            elapsed += time.perf_counter() - start
+            size += len(to_json_plotly(outputs).encode("utf-8"))
+            n_callbacks, trips = n_callbacks + 1, max(trips, trip)
+        callbacks.append(n_callbacks)
+        round_trips.append(trips)
+        seconds.append(elapsed)
+        payload.append(size)
+    return callbacks[0], round_trips[0], np.median(seconds), np.percentile(seconds, 99), np.median(payload)
+
+
+def clear_caches():
+    app.right_panel_cache.clear()
+    app.radar_cache.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clicks", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    dish_ids = rng.integers(0, len(app.current_dataset().dish_index), args.clicks)
+    clicks = [click_data(int(i)) for i in dish_ids]
+    location = {"lat": 35.6812, "lon": 139.7671}
+
+    print(f"dishes={len(app.current_dataset().dish_index)} clicks={args.clicks}")
+    print(f"  {'':<28} {'callbacks':>9} {'round trips':>11} {'median':>10} {'p99':>10} {'bytes':>9}")
+    for label, replay in (("cascade", cascade), ("pipeline", pipeline)):
+        for cache_state in ("cold", "warm"):
+            if cache_state == "cold":
+                clear_caches()
+            n, trips, median_s, p99_s, size = trace(replay, clicks, location)
+            print(
+                f"  {label + ', ' + cache_state + ' caches':<28} {n:>9} {trips:>11} "
+                f"{median_s * 1e3:>7.2f} ms {p99_s * 1e3:>7.2f} ms {size:>9,.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
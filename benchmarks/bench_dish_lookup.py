@@ -0,0 +1,66 @@
+"""Per-click dish lookup cost: boolean-mask scan vs. the keyed dish index.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_dish_lookup
+"""
+import argparse
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from dataset import build_dish_index
+
+
+SIZES = (140, 1_000, 10_000, 100_000)
+
+
+def scaled_dishes(base, n_rows):
+    reps = -(-n_rows // len(base))
+    frame = pd.concat([base] * reps, ignore_index=True).iloc[:n_rows].copy()
+    frame["dish_name"] = [f"{name} #{i}" for i, name in enumerate(frame["dish_name"])]
+    frame["dish_id"] = np.arange(len(frame))
+    return frame
+
+
+def mask_click(frame, name):
+    # What one click used to cost: five mask scans, each materialising the row.
+    for _ in range(5):
+        row = frame[frame["dish_name"] == name]
+        row.iloc[0]["calories"]
+
+
+def index_click(index, click_data):
+    dish_id = index.id_from_click(click_data)
+    for _ in range(5):
+        index.get(dish_id).calories
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--csv", default="data/all_dishes.csv")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    base = pd.read_csv(args.csv)
+    print(f"{'rows':>8} {'mask scan (us)':>16} {'index (us)':>12} {'speed-up':>10}")
+    for n_rows in SIZES:
+        frame = scaled_dishes(base, n_rows)
+        index = build_dish_index(frame)
+        rng = np.random.default_rng(0)
+        targets = rng.integers(0, n_rows, size=args.repeat)
+        names = frame["dish_name"].to_numpy()
+
+        mask_repeat = max(1, min(args.repeat, 2_000_000 // n_rows))
+        mask_s = timeit.timeit(
+            lambda: [mask_click(frame, names[t]) for t in targets[:mask_repeat]], number=1
+        ) / mask_repeat
+        clicks = [{"points": [{"customdata": [int(t)], "hovertext": names[t]}]} for t in targets]
+        index_s = timeit.timeit(lambda: [index_click(index, c) for c in clicks], number=1) / len(clicks)
+
+        print(f"{n_rows:>8} {mask_s * 1e6:>16.1f} {index_s * 1e6:>12.2f} {mask_s / index_s:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Dish search dropdown: every name embedded in the layout vs. completions served per prefix.
+
+Prints the JSON size of the old all-names options list next to one page of
+completions, and the time to complete typed prefixes from the sorted-prefix
+index, uncached, as each one reaches the server after the debounce.
+
+Run from the repository root (generates the dataset on first use):
+
+    python -m benchmarks.bench_dish_search --scale 1000
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from benchmarks.bench_snapshot_load import prepare
+from schema import load_dishes
+from search import PrefixIndex
+
+
+PREFIXES = ["ko", "kob", "kobu", "mochi", "no har", "hoba meshi (k", "#9278", "sushi", "zz"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=1000)
+    parser.add_argument("--data-root", default="data/synthetic")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    data_dir = prepare(args.scale, args.data_root)
+    names = load_dishes(os.path.join(data_dir, "all_dishes.csv"))["dish_name"]
+    start = time.perf_counter()
+    index = PrefixIndex(names)
+    build_s = time.perf_counter() - start
+
+    all_options = json.dumps([{"label": name, "value": name} for name in names])
+    print(f"dishes={len(names):,} index build {build_s * 1e3:.0f} ms")
+    print(f"  all names in the layout        {len(all_options) / 1e3:10,.1f} kB")
+    print(f"  {'prefix':<16} {'matches':>8} {'page (kB)':>10} {'complete':>10}")
+    for prefix in PREFIXES:
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            page, total = index.complete(prefix, args.limit)
+            timings.append(time.perf_counter() - start)
+        payload = json.dumps([{"label": name, "value": name} for name in page])
+        print(f"  {prefix!r:<16} {total:>8,} {len(payload) / 1e3:>10.1f} {np.median(timings) * 1e3:>7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
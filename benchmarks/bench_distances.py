@@ -0,0 +1,86 @@
+"""Restaurant distances: row-wise DataFrame.apply vs. the vectorised distance engine.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_distances
+
+Row-wise timings (distance plus label formatting) above --rowwise-limit places
+are measured on that many rows and extrapolated linearly (marked with ~). The
+app only formats labels for the rows it displays.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from geo import EARTH_RADIUS_KM, distances_km, format_distances, place_coordinates
+
+
+SIZES = (10, 10_000, 1_000_000)
+USER_LAT, USER_LON = 35.6812, 139.7671
+
+
+def synthetic_places(n_places, seed=0):
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        "latitude": rng.uniform(24.0, 45.5, n_places),
+        "longitude": rng.uniform(123.0, 146.0, n_places),
+    })
+    frame.loc[rng.random(n_places) < 0.01, "latitude"] = np.nan
+    return frame
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    # The per-row distance the app used before the vectorised engine.
+    if any(pd.isna([lat1, lon1, lat2, lon2])):
+        return np.nan
+    lat1, lon1, lat2, lon2 = map(np.radians, [lat1, lon1, lat2, lon2])
+    a = np.sin((lat2 - lat1) / 2.0)**2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2.0)**2
+    return EARTH_RADIUS_KM * 2 * np.arcsin(np.sqrt(a))
+
+
+def rowwise(place_rows):
+    distance = place_rows.apply(
+        lambda row: haversine(USER_LAT, USER_LON, row["latitude"], row["longitude"]),
+        axis=1
+    )
+    return distance.apply(lambda x: f"{x:.1f} km" if pd.notna(x) else "?")
+
+
+def vectorised(coords):
+    return distances_km(USER_LAT, USER_LON, coords)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rowwise-limit", type=int, default=100_000)
+    args = parser.parse_args()
+
+    print(f"{'places':>10} {'row-wise (ms)':>15} {'vectorised (ms)':>16} {'+ labels (ms)':>14} {'speed-up':>10}")
+    for n_places in SIZES:
+        places = synthetic_places(n_places)
+        coords = place_coordinates(places["latitude"], places["longitude"])
+
+        sample = places.iloc[:args.rowwise_limit]
+        rowwise_s, expected = timed(lambda: rowwise(sample))
+        rowwise_s *= n_places / len(sample)
+        vector_s, km = timed(lambda: vectorised(coords))
+        label_s, labels = timed(lambda: format_distances(km))
+        assert ((labels[:len(sample)] == "?") == (expected.to_numpy() == "?")).all()
+
+        marker = "~" if n_places > len(sample) else " "
+        print(
+            f"{n_places:>10} {marker}{rowwise_s * 1e3:>14.2f} {vector_s * 1e3:>16.2f} "
+            f"{label_s * 1e3:>14.2f} {rowwise_s / (vector_s + label_s):>9.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Ingredient include/exclude filtering: substring scans vs. posting bitmaps.
+
+Draws --rows dishes from the real ingredient lists and asks one query with
+--terms ingredient terms at once: the --include most common ingredients must be
+listed and the rest must not. The scan runs a substring search per term over
+every row's ingredient text (and so also matches "rice" inside "rice flour");
+the index ANDs and AND-NOTs one packed bitmap per term. The index result is
+checked against parsing the first --check rows one by one.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_ingredient_filter --rows 1000000 --terms 50
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from filters import FacetFilter
+from ingredients import IngredientIndex, parse_ingredients
+
+
+def scan_filter(ingredient_lists, included, excluded):
+    text = ingredient_lists.str.lower()
+    keep = np.ones(len(text), dtype=bool)
+    for name in included:
+        keep &= text.str.contains(name, regex=False, na=False).to_numpy()
+    for name in excluded:
+        keep &= ~text.str.contains(name, regex=False, na=False).to_numpy()
+    return np.flatnonzero(keep)
+
+
+def parsed_filter(ingredient_lists, included, excluded):
+    keep = []
+    for row, text in enumerate(ingredient_lists):
+        names = parse_ingredients(text)
+        if all(name in names for name in included) and not any(name in names for name in excluded):
+            keep.append(row)
+    return np.array(keep, dtype=np.int64)
+
+
+def uncached(engine, key):
+    engine._base_bitmap.cache_clear()
+    return engine._evaluate(key)
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--csv", default="data/all_dishes.csv")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--terms", type=int, default=50)
+    parser.add_argument("--include", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--check", type=int, default=20_000)
+    args = parser.parse_args()
+
+    base = pd.read_csv(args.csv)["main_ingredients"]
+    rng = np.random.default_rng(0)
+    dishes = pd.DataFrame({"main_ingredients": rng.choice(base.to_numpy(dtype=object), size=args.rows)})
+    for column in ("prefecture", "seasonality", "type"):
+        dishes[column] = pd.Categorical(np.zeros(args.rows, dtype=np.int8))
+
+    start = time.perf_counter()
+    index = IngredientIndex(dishes["main_ingredients"])
+    engine = FacetFilter(dishes, dietary_columns=(), ingredients=index)
+    build_s = time.perf_counter() - start
+
+    terms = index.vocabulary[:args.terms]
+    included, excluded = terms[:args.include], terms[args.include:]
+    key = engine.canonical(included=included, excluded=excluded)
+    query_s, rows = best_of(lambda: uncached(engine, key), args.repeat)
+    scan_s, scanned = best_of(lambda: scan_filter(dishes["main_ingredients"], included, excluded), 1)
+    expected = parsed_filter(dishes["main_ingredients"].iloc[:args.check], included, excluded)
+    assert np.array_equal(rows[rows < args.check], expected)
+
+    bitmap_mb = sum(bitmap.nbytes for bitmap in index.bitmaps.values()) / 1e6
+    print(f"rows={args.rows:,} vocabulary={len(index):,} terms={len(terms)} "
+          f"({len(included)} included, {len(excluded)} excluded) matches={len(rows):,}")
+    print(f"  index build (once)        {build_s * 1e3:9.1f} ms   bitmaps {bitmap_mb:.1f} MB")
+    print(f"  substring scan            {scan_s * 1e3:9.1f} ms   ({len(scanned):,} matches)")
+    print(f"  bitmap query, uncached    {query_s * 1e3:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
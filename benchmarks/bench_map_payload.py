@@ -0,0 +1,39 @@
+"""Bytes sent to the browser per map interaction: full figure rebuild vs. Patch.
+
+Run from the repository root (imports the app, so the full requirements must
+be installed):
+
+    python -m benchmarks.bench_map_payload
+"""
+from plotly.io.json import to_json_plotly
+
+import app
+
+
+def payload_bytes(value):
+    return len(to_json_plotly(value).encode("utf-8"))
+
+
+def main():
+    first, second = 0, len(app.current_dataset().dish_index) // 2
+    location = {"lat": 35.6812, "lon": 139.7671}
+
+    scenarios = [
+        ("click a dish", dict(clicked_dish=second), {"clicked-dish"}),
+        ("grant location", dict(user_location=location), {"user-location"}),
+    ]
+    base_state = dict(user_location=None, clicked_dish=first)
+
+    print(f"dishes={len(app.current_dataset().dish_index)}")
+    print(f"  {'interaction':<18} {'full figure (B)':>16} {'patch (B)':>10} {'reduction':>10}")
+    for label, change, changed in scenarios:
+        state = {**base_state, **change}
+        clicked = app.current_dataset().dish_index.reference(state["clicked_dish"])
+        full = app.update_map(None, None, None, None, None, None, None, None, None, state["user_location"], clicked, False)
+        patch = app.map_overlay_patch(state["user_location"], state["clicked_dish"], changed)
+        full_b, patch_b = payload_bytes(full), payload_bytes(patch)
+        print(f"  {label:<18} {full_b:>16,} {patch_b:>10,} {full_b / patch_b:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+""""Restaurants near me" queries on the grid index vs. a full distance scan.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_near_me --places 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from geo import PlaceGrid, distances_km
+
+
+def synthetic_places(n_places, seed=0):
+    # Clustered around a few Japanese cities, like real restaurant data.
+    rng = np.random.default_rng(seed)
+    centres = np.array([
+        (35.68, 139.77), (34.69, 135.50), (35.18, 136.91), (43.06, 141.35),
+        (33.59, 130.40), (38.27, 140.87), (34.39, 132.46), (26.21, 127.68)
+    ])
+    which = rng.integers(0, len(centres), n_places)
+    spread = rng.exponential(0.3, n_places)[:, None]
+    coords = centres[which] + rng.normal(0, 1, (n_places, 2)) * spread
+    return coords[:, 0], coords[:, 1]
+
+
+def latency(fn, queries):
+    timings = []
+    for q in queries:
+        start = time.perf_counter()
+        fn(*q)
+        timings.append(time.perf_counter() - start)
+    return np.median(timings), np.percentile(timings, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--places", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    lat, lon = synthetic_places(args.places)
+    start = time.perf_counter()
+    grid = PlaceGrid(lat, lon)
+    build_s = time.perf_counter() - start
+
+    rng = np.random.default_rng(1)
+    picks = rng.integers(0, args.places, args.queries)
+    user_points = [(lat[i] + rng.normal(0, 0.01), lon[i] + rng.normal(0, 0.01)) for i in picks]
+
+    for user_lat, user_lon in user_points[:20]:
+        km = distances_km(user_lat, user_lon, grid.coords)
+        expected = np.sort(km)[:10]
+        assert np.allclose(grid.nearest(user_lat, user_lon, 10)[1], expected)
+        assert len(grid.within(user_lat, user_lon, 5)[0]) == int((km <= 5).sum())
+
+    print(f"places={args.places:,} cell={grid.cell_deg:.3f} deg build={build_s * 1e3:.0f} ms")
+    rows = [
+        ("full scan, 10 nearest", lambda a, b: np.argpartition(distances_km(a, b, grid.coords), 10)[:10]),
+        ("grid, 10 nearest", lambda a, b: grid.nearest(a, b, 10)),
+        ("grid, within 1 km", lambda a, b: grid.within(a, b, 1)),
+        ("grid, within 5 km (top 50)", lambda a, b: grid.within(a, b, 5, limit=50)),
+    ]
+    for label, fn in rows:
+        median_s, p99_s = latency(fn, user_points)
+        print(f"  {label:<28} median {median_s * 1e3:8.3f} ms   p99 {p99_s * 1e3:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Nutrient range sliders: a full DataFrame mask per slider event vs. presorted range indexes.
+
+Draws --rows dishes from the real nutrient values and facets, fixes a facet
+selection, and replays a drag of the calories slider's upper handle over
+--events positions while the protein range stays set. The mask recomputes
+every condition per event, as filtering the DataFrame would; the engine
+resolves each range by binary search over its presorted column, reusing the
+facet bitmap and the unchanged protein range between events. This is the
+filter alone; the whole map callback for a drag, figure included, is the
+"update_map, nutrient slider drag" case of benchmarks.bench_callbacks.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_nutrient_ranges --rows 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from dataset import NUTRIENT_COLUMNS
+from filters import FacetFilter
+
+
+def synthetic_dishes(base, n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, len(base), n_rows)
+    frame = pd.DataFrame({
+        column: pd.Categorical(base[column].to_numpy()[picks]) for column in ("prefecture", "seasonality", "type")
+    })
+    for column in NUTRIENT_COLUMNS:
+        # Jitter the values so the sorted columns are not 140 runs of ties.
+        frame[column] = (base[column].to_numpy()[picks] * rng.uniform(0.8, 1.2, n_rows)).astype(np.float32)
+    return frame
+
+
+def mask_filter(dishes, prefectures, types, ranges):
+    mask = dishes["prefecture"].isin(prefectures) & dishes["type"].isin(types)
+    for column, (low, high) in ranges.items():
+        mask &= dishes[column].between(low, high)
+    return np.flatnonzero(mask.to_numpy())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--csv", default="data/all_dishes.csv")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--events", type=int, default=50)
+    args = parser.parse_args()
+
+    base = pd.read_csv(args.csv)
+    dishes = synthetic_dishes(base, args.rows)
+    prefectures = list(base["prefecture"].unique()[:12])
+    types = sorted(base["type"].unique())[:4]
+
+    start = time.perf_counter()
+    engine = FacetFilter(dishes, dietary_columns=())
+    build_s = time.perf_counter() - start
+
+    calories = engine.range_indexes["calories"]
+    protein = (5.0, float(np.quantile(engine.range_indexes["protein"].values, 0.8)))
+    drag = [
+        {"calories": (calories.min, float(high)), "protein": protein}
+        for high in np.quantile(calories.values, np.linspace(0.95, 0.05, args.events))
+    ]
+
+    mask_timings, engine_timings = [], []
+    for ranges in drag:
+        start = time.perf_counter()
+        expected = mask_filter(dishes, prefectures, types, ranges)
+        mask_timings.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        rows = engine.query(prefectures, None, types, ranges=ranges)
+        engine_timings.append(time.perf_counter() - start)
+        assert np.array_equal(rows, expected)
+
+    sorted_mb = sum(index.order.nbytes + index.values.nbytes for index in engine.range_indexes.values()) / 1e6
+    print(f"rows={args.rows:,} events={args.events} matches {len(rows):,} .. {len(engine.query(prefectures, None, types, ranges=drag[0])):,}")
+    print(f"  engine build (once)       {build_s * 1e3:9.1f} ms   sorted columns {sorted_mb:.1f} MB")
+    print(f"  DataFrame mask per event  {np.median(mask_timings) * 1e3:9.2f} ms median")
+    print(f"  range index per event     {np.median(engine_timings) * 1e3:9.2f} ms median, "
+          f"first {engine_timings[0] * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Full-text search latency: pandas substring scans vs. the inverted index.
+
+Builds the index over the synthetic dishes, rebuilds it from the previous index
+(as a data reload does) with a slice of the texts edited, and times uncached
+queries: exact words, prefixes, typos and multi-word queries. The exit status is
+1 when the slowest query's median exceeds --budget-ms.
+
+Run from the repository root (generates the dataset on first use):
+
+    python -m benchmarks.bench_search --scale 1000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.bench_snapshot_load import prepare
+from schema import load_dishes
+from search import SEARCH_FIELDS, SearchIndex
+
+
+QUERIES = [
+    "salmon", "kombu maki", "miso", "sal", "ja", "salmno", "hokaido kelp",
+    "soy sauce rice", "buckwheat noodles", "edo period festival", "92781",
+]
+
+
+def substring_scan(dishes, query):
+    matched = np.ones(len(dishes), dtype=bool)
+    for word in query.lower().split():
+        hit = np.zeros(len(dishes), dtype=bool)
+        for field in SEARCH_FIELDS:
+            hit |= dishes[field].str.lower().str.contains(word, regex=False, na=False).to_numpy()
+        matched &= hit
+    return np.flatnonzero(matched)
+
+
+def median_ms(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1e3, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=1000)
+    parser.add_argument("--data-root", default="data/synthetic")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--edited", type=float, default=0.01, help="fraction of rows whose history changes on rebuild")
+    parser.add_argument("--budget-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    dishes = load_dishes(os.path.join(prepare(args.scale, args.data_root), "all_dishes.csv"))
+    start = time.perf_counter()
+    index = SearchIndex(dishes)
+    build_s = time.perf_counter() - start
+
+    edited = dishes.copy()
+    rows = np.arange(0, len(edited), max(1, round(1 / args.edited)))
+    edited.loc[rows, "history"] = [f"Revised entry {row}: first served at a harbour festival." for row in rows]
+    start = time.perf_counter()
+    SearchIndex(edited, previous=index)
+    rebuild_s = time.perf_counter() - start
+
+    print(f"dishes={len(dishes):,} terms={len(index.vocabulary):,}")
+    print(f"  index build             {build_s * 1e3:9.0f} ms")
+    print(f"  rebuild, {len(rows):,} texts edited {rebuild_s * 1e3:6.0f} ms")
+    print(f"  {'query':<22} {'matches':>8} {'substring scan':>15} {'index':>10}")
+    slowest = 0.0
+    for query in QUERIES:
+        scan_ms, _ = median_ms(lambda: substring_scan(dishes, query), max(1, args.repeat // 10))
+        key = index.canonical(query)
+        index_ms, ranked = median_ms(lambda: index._evaluate(key), args.repeat)
+        slowest = max(slowest, index_ms)
+        print(f"  {query:<22} {len(ranked):>8,} {scan_ms:>12.1f} ms {index_ms:>7.2f} ms")
+
+    if slowest > args.budget_ms:
+        print(f"FAIL slowest query takes {slowest:.2f} ms (budget {args.budget_ms:.1f} ms)")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
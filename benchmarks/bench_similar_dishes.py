@@ -0,0 +1,75 @@
+"""Similar dishes: building the top-k neighbour table at load vs. looking it up per click.
+
+Builds the table over the synthetic dishes, checks a sample of rows against
+scoring them against every other dish, and times the per-click row lookup.
+
+Run from the repository root (generates the dataset on first use):
+
+    python -m benchmarks.bench_similar_dishes --scale 1000
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_snapshot_load import prepare
+from dataset import build_nutrient_matrix
+from ingredients import IngredientIndex
+from schema import load_dishes
+from similarity import SIMILARITY_WEIGHTS, _standardized_nutrients, build_similar_dishes
+
+
+def brute_force_scores(dishes, nutrients, ingredients, row):
+    weights = SIMILARITY_WEIGHTS
+    features = _standardized_nutrients(nutrients).astype(np.float64)
+    nutrient = np.exp(-((features - features[row]) ** 2).sum(axis=1) / (2 * features.shape[1]))
+    names = [set(ingredients.lists[code]) if code >= 0 else set() for code in ingredients.codes]
+    own = names[row]
+    jaccard = np.array([len(own & other) / max(len(own | other), 1) for other in names])
+    scores = (
+        weights["nutrients"] * nutrient
+        + weights["ingredients"] * jaccard
+        + weights["type"] * (dishes["type"].to_numpy() == dishes["type"].iloc[row])
+        + weights["region"] * (dishes["prefecture"].to_numpy() == dishes["prefecture"].iloc[row])
+    )
+    scores[row] = -np.inf
+    return scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=1000)
+    parser.add_argument("--data-root", default="data/synthetic")
+    parser.add_argument("--check", type=int, default=20, help="rows compared against brute force")
+    parser.add_argument("--repeat", type=int, default=1000)
+    args = parser.parse_args()
+
+    dishes = load_dishes(os.path.join(prepare(args.scale, args.data_root), "all_dishes.csv"))
+    ingredients = IngredientIndex(dishes["main_ingredients"])
+    nutrients = build_nutrient_matrix(dishes).absolute
+    start = time.perf_counter()
+    table = build_similar_dishes(dishes, nutrients, ingredients)
+    build_s = time.perf_counter() - start
+
+    rng = np.random.default_rng(0)
+    for row in rng.choice(len(dishes), size=min(args.check, len(dishes)), replace=False):
+        expected = np.sort(brute_force_scores(dishes, nutrients, ingredients, row))[::-1][:table.ids.shape[1]]
+        assert np.allclose(table.scores[row], np.maximum(expected, 0), atol=1e-4), row
+
+    rows = rng.integers(0, len(dishes), size=args.repeat)
+    start = time.perf_counter()
+    for row in rows:
+        table.row(row)
+    lookup_us = (time.perf_counter() - start) / args.repeat * 1e6
+
+    table_mb = (table.ids.nbytes + table.scores.nbytes) / 1e6
+    print(f"dishes={len(dishes):,} k={table.ids.shape[1]} profiles="
+          f"{len(pd.MultiIndex.from_arrays([ingredients.codes, dishes['type'], dishes['prefecture']]).unique()):,}")
+    print(f"  table build (once per load) {build_s * 1e3:9.0f} ms   table {table_mb:.1f} MB")
+    print(f"  lookup per click            {lookup_us:9.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Cold start and per-worker memory: parsing the CSVs vs. memory-mapping the snapshot.
+
+Starts --workers fresh interpreters per loader, all holding the data at once like
+gunicorn workers, and reads their /proc/<pid>/smaps_rollup. PSS splits shared
+pages (the memory-mapped snapshot files) between the workers that map them.
+
+Run from the repository root (generates and compiles the dataset on first use):
+
+    python -m benchmarks.bench_snapshot_load --scale 100 --workers 4
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from dataset import build_place_adjacency
+from schema import load_dishes, load_places
+from snapshot import load_snapshot, write_snapshot
+
+
+def load(mode, data_dir):
+    if mode == "csv":
+        dishes = load_dishes(os.path.join(data_dir, "all_dishes.csv"))
+        places = load_places(os.path.join(data_dir, "all_places.csv"))
+        adjacency = build_place_adjacency(dishes["places"], places)
+    else:
+        snapshot = load_snapshot(os.path.join(data_dir, "snapshot"))
+        dishes, places, adjacency = snapshot.dishes, snapshot.places, snapshot.place_adjacency
+    return dishes, places, adjacency
+
+
+def run_worker(mode, data_dir):
+    start = time.perf_counter()
+    data = load(mode, data_dir)
+    print(f"{time.perf_counter() - start:.6f}", flush=True)
+    sys.stdin.read()
+    return data
+
+
+def memory_kb(pid):
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return fields["Rss"], fields["Pss"], fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+
+
+def measure(mode, data_dir, n_workers):
+    started = time.perf_counter()
+    workers = [
+        subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.bench_snapshot_load", "--worker", mode, "--data-dir", data_dir],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+        )
+        for _ in range(n_workers)
+    ]
+    load_s = [float(worker.stdout.readline()) for worker in workers]
+    ready_s = time.perf_counter() - started
+    memory = np.array([memory_kb(worker.pid) for worker in workers]) / 1024
+    for worker in workers:
+        worker.communicate("")
+    return np.median(load_s), ready_s, memory.mean(axis=0), memory[:, 1].sum()
+
+
+def prepare(scale, data_root):
+    if scale == 1:
+        data_dir = "data"
+    else:
+        data_dir = os.path.join(data_root, f"scale-{scale}")
+        if not os.path.exists(os.path.join(data_dir, "all_dishes.csv")):
+            from tools.generate_dataset import SeedProfile, generate
+
+            profile = SeedProfile(pd.read_csv("data/all_dishes.csv"), pd.read_csv("data/all_places.csv"))
+            generate(data_dir, len(profile.dishes) * scale, profile.n_places * scale, seed=0, profile=profile)
+
+    csv_paths = [os.path.join(data_dir, "all_dishes.csv"), os.path.join(data_dir, "all_places.csv")]
+    if load_snapshot(os.path.join(data_dir, "snapshot"), csv_paths) is None:
+        write_snapshot(*csv_paths, os.path.join(data_dir, "snapshot"))
+    return data_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--data-root", default="data/synthetic")
+    parser.add_argument("--data-dir", help=argparse.SUPPRESS)
+    parser.add_argument("--worker", choices=["csv", "snapshot"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.data_dir)
+        return
+
+    data_dir = prepare(args.scale, args.data_root)
+    print(f"{data_dir}: {args.workers} workers")
+    print(f"  {'loader':<10} {'load':>9} {'all ready':>10} {'RSS/worker':>11} {'PSS/worker':>11} {'private/worker':>15} {'PSS total':>10}")
+    for mode in ("csv", "snapshot"):
+        load_s, ready_s, (rss, pss, private), pss_total = measure(mode, data_dir, args.workers)
+        print(
+            f"  {mode:<10} {load_s * 1e3:>6.0f} ms {ready_s * 1e3:>7.0f} ms {rss:>8.0f} MB {pss:>8.0f} MB "
+            f"{private:>12.0f} MB {pss_total:>7.0f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Total memory of a gunicorn server as workers are added, with and without preloading.
+
+Starts the app under gunicorn.conf.py with 1 and then --workers workers, replays a
+short scenario so the workers touch the data the way real traffic does, and sums
+PSS over the master and its workers (/proc/<pid>/smaps_rollup). With the shared,
+preloaded dataset each extra worker should add only a small fraction of the
+single-worker footprint; the exit status is 1 when it adds more than --max-growth.
+
+Run from the repository root (generates and compiles the dataset on first use):
+
+    python -m benchmarks.bench_worker_memory --scale 100 --workers 4
+
+Imports the app in the server processes, so the full requirements must be installed.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.bench_snapshot_load import memory_kb, prepare
+from tools.replay_load import Server, Session, Stats, wait_until_up
+
+
+def child_pids(pid):
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name is parenthesised and may contain spaces; the ppid follows it.
+        if int(stat.rpartition(")")[2].split()[1]) == pid:
+            children.append(int(entry))
+    return children
+
+
+def replay(url, scenario, users):
+    with open(scenario) as f:
+        steps = [json.loads(line) for line in f if line.strip()]
+    server = Server(url)
+    stats = Stats()
+    for _ in range(users):
+        Session(server, stats, timeout=60).run(steps)
+
+
+def measure(app_spec, data_dir, n_workers, preload, port, scenario, users, startup_timeout):
+    env = dict(
+        os.environ, KYODO_DATA_DIR=data_dir, KYODO_PRELOAD="1" if preload else "0",
+        KYODO_CLIENTSIDE_FILTERING="0"
+    )
+    url = f"http://127.0.0.1:{port}"
+    master = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "-w", str(n_workers),
+         "-b", f"127.0.0.1:{port}", app_spec],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_until_up(url, startup_timeout)
+        # Gunicorn forks the workers one by one; wait until every one of them has booted.
+        deadline = time.monotonic() + startup_timeout
+        while len(child_pids(master.pid)) < n_workers and time.monotonic() < deadline:
+            time.sleep(0.2)
+        if scenario:
+            replay(url, scenario, users)
+        workers = child_pids(master.pid)
+        master_memory = memory_kb(master.pid)
+        worker_memory = [memory_kb(pid) for pid in workers]
+    finally:
+        master.terminate()
+        master.wait()
+    total_pss = (master_memory[1] + sum(pss for _, pss, _ in worker_memory)) / 1024
+    worker_rss = sum(rss for rss, _, _ in worker_memory) / len(worker_memory) / 1024
+    worker_private = sum(private for _, _, private in worker_memory) / len(worker_memory) / 1024
+    return total_pss, worker_rss, worker_private
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--data-root", default="data/synthetic")
+    parser.add_argument("--app", default="app:server", help="WSGI application to serve")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--scenario", default="tools/scenarios/browse.jsonl",
+                        help="replayed against every server before measuring; empty to skip")
+    parser.add_argument("--users", type=int, default=8, help="scenario repetitions before measuring")
+    parser.add_argument("--startup-timeout", type=float, default=300.0)
+    parser.add_argument("--max-growth", type=float, default=0.25,
+                        help="allowed PSS per extra preloaded worker, as a fraction of the single-worker total")
+    args = parser.parse_args()
+
+    data_dir = prepare(args.scale, args.data_root)
+    print(f"{data_dir}: {args.app} with 1 and {args.workers} workers")
+    print(f"  {'mode':<11} {'workers':>7} {'PSS total':>10} {'RSS/worker':>11} {'private/worker':>15} {'per extra worker':>17}")
+    growth = {}
+    for preload in (True, False):
+        mode = "preload" if preload else "no preload"
+        single = None
+        for n_workers in sorted({1, args.workers}):
+            total, rss, private = measure(
+                args.app, data_dir, n_workers, preload, args.port, args.scenario, args.users, args.startup_timeout
+            )
+            extra = ""
+            if single is None:
+                single = total
+            else:
+                growth[mode] = (total - single) / (n_workers - 1) / single
+                extra = f"{growth[mode]:>16.0%}"
+            print(f"  {mode:<11} {n_workers:>7} {total:>7.0f} MB {rss:>8.0f} MB {private:>12.0f} MB {extra:>17}")
+
+    if args.workers > 1 and growth["preload"] > args.max_growth:
+        print(f"FAIL each extra preloaded worker adds {growth['preload']:.0%} of the single-worker footprint "
+              f"(allowed {args.max_growth:.0%})")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
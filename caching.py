@@ -0,0 +1,103 @@
+import sys
+import threading
+from collections import OrderedDict
+
+
+def deep_sizeof(value):
+    """Bytes held by a tree of dicts, lists and scalars, counting each object once."""
+    seen = set()
+    total = 0
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple)):
+            stack.extend(item)
+    return total
+
+
+class LRUCache:
+    """Thread-safe LRU cache with hit/miss/eviction counters.
+
+    Bounded by ``maxsize`` entries and, when ``max_bytes`` is set, by the total
+    of ``sizeof(value)`` over the cached values.
+    """
+
+    def __init__(self, name, maxsize=256, max_bytes=None, sizeof=None):
+        self.name = name
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda value: 0)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value, _ = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return value
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            while self._entries and (
+                (self.maxsize is not None and len(self._entries) > self.maxsize)
+                or (self.max_bytes is not None and self.current_bytes > self.max_bytes)
+            ):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+        return value
+
+    def get_or_compute(self, key, compute):
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = self.put(key, compute())
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def discard(self, predicate):
+        """Drop the entries whose key matches ``predicate``; returns how many were dropped."""
+        with self._lock:
+            stale = [key for key in self._entries if predicate(key)]
+            for key in stale:
+                self.current_bytes -= self._entries.pop(key)[1]
+        return len(stale)
+
+    def stats(self):
+        return {
+            "entries": len(self._entries), "bytes": self.current_bytes,
+            "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+        }
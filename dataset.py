@@ -0,0 +1,259 @@
+import ast
+import hashlib
+import logging
+import os
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+
+logger = logging.getLogger(__name__)
+
+
+DIETARY_COLUMNS = ("vegan", "vegetarian", "no_gluten", "no_seafood", "no_pork", "no_dairy", "no_nuts")
+DIETARY_BITS = "dietary"  # uint8 column; bit i is set when DIETARY_COLUMNS[i] holds
+
+
+def dietary_mask(dishes, column):
+    """Boolean row mask for one dietary flag, from the packed bits or a plain column."""
+    if DIETARY_BITS in dishes.columns:
+        bit = DIETARY_COLUMNS.index(column)
+        return (dishes[DIETARY_BITS].to_numpy() >> bit) & 1 == 1
+    if column not in dishes.columns:
+        return np.zeros(len(dishes), dtype=bool)
+    return dishes[column].to_numpy() == True
+
+
+class DishRecord(NamedTuple):
+    dish_id: int
+    dish_name: str
+    prefecture: str
+    area_name: str
+    main_ingredients: str
+    history: str
+    image_url: str
+    type: str
+    seasonality: str
+    calories: float
+    protein: float
+    carbohydrates: float
+    fats: float
+    sodium: float
+    vegan: bool
+    vegetarian: bool
+    no_gluten: bool
+    no_seafood: bool
+    no_pork: bool
+    no_dairy: bool
+    no_nuts: bool
+    area_lat: float
+    area_lon: float
+
+
+TEXT_FIELDS = ("dish_name", "prefecture", "area_name", "main_ingredients", "history", "image_url", "type", "seasonality")
+NUMERIC_FIELDS = ("calories", "protein", "carbohydrates", "fats", "sodium", "area_lat", "area_lon")
+
+
+def _clean_text(value):
+    return None if pd.isna(value) else str(value)
+
+
+def _clean_number(value):
+    return 0.0 if pd.isna(value) else float(value)
+
+
+class DishIndex:
+    """Dish records keyed by positional dish id, built once when the data is loaded.
+
+    The dish id is the row position in the ``dishes`` frame, so map points can carry
+    it in ``customdata`` and a click resolves with a single tuple lookup. A reload
+    that adds or removes rows shifts the positions, so ids held by the client
+    travel with the dish name and resolve through ``resolve``.
+    """
+
+    def __init__(self, records):
+        self.records = tuple(records)
+        self.ids_by_name = {record.dish_name: record.dish_id for record in self.records}
+
+    def __len__(self):
+        return len(self.records)
+
+    def get(self, dish_id):
+        if dish_id is None or isinstance(dish_id, bool):
+            return None
+        try:
+            dish_id = int(dish_id)
+        except (TypeError, ValueError):
+            return None
+        if 0 <= dish_id < len(self.records):
+            return self.records[dish_id]
+        return None
+
+    def id_for_name(self, dish_name):
+        return self.ids_by_name.get(dish_name)
+
+    def by_name(self, dish_name):
+        return self.get(self.ids_by_name.get(dish_name))
+
+    def resolve(self, dish_id, dish_name):
+        """Current id of the dish a client knew as ``dish_id`` named ``dish_name``; None once it is gone."""
+        if not isinstance(dish_name, str):
+            return None
+        record = self.get(dish_id)
+        if record is not None and record.dish_name == dish_name:
+            return record.dish_id
+        return self.ids_by_name.get(dish_name)
+
+    def reference(self, dish_id):
+        """What the client keeps for a selected dish: its id and name, for ``id_from_reference``."""
+        record = self.get(dish_id)
+        return {"id": record.dish_id, "name": record.dish_name} if record else None
+
+    def id_from_reference(self, reference):
+        if not isinstance(reference, dict):
+            return None
+        return self.resolve(reference.get("id"), reference.get("name"))
+
+    def id_from_click(self, click_data):
+        # Map points carry the id in customdata and the name in hovertext.
+        if not click_data or not click_data.get("points"):
+            return None
+        point = click_data["points"][0]
+        customdata = point.get("customdata")
+        if isinstance(customdata, (list, tuple)):
+            customdata = customdata[0] if customdata else None
+        return self.resolve(customdata, point.get("hovertext"))
+
+
+def as_float64(values):
+    # float32 goes through its shortest decimal form, so 42.3 stays 42.3 rather than 42.29999923706055.
+    values = np.asarray(values)
+    if values.dtype == np.float32:
+        return values.astype(str).astype(np.float64)
+    return values
+
+
+def build_dish_index(dishes):
+    columns = [field for field in DishRecord._fields if field != "dish_id"]
+    frame = dishes.reindex(columns=[column for column in columns if column not in DIETARY_COLUMNS])
+    for field in NUMERIC_FIELDS:
+        frame[field] = as_float64(frame[field])
+    for field in DIETARY_COLUMNS:
+        frame[field] = dietary_mask(dishes, field)
+    frame = frame[columns]
+    records = []
+    for dish_id, values in enumerate(frame.itertuples(index=False, name=None)):
+        row = dict(zip(columns, values))
+        for field in TEXT_FIELDS:
+            row[field] = _clean_text(row[field])
+        for field in NUMERIC_FIELDS:
+            row[field] = _clean_number(row[field])
+        for field in DIETARY_COLUMNS:
+            row[field] = row[field] is True or str(row[field]).lower() == "true"
+        records.append(DishRecord(dish_id=dish_id, **row))
+    return DishIndex(records)
+
+
+class Adjacency:
+    """CSR adjacency: the targets of row ``i`` are ``targets[offsets[i]:offsets[i + 1]]``.
+
+    Dish -> place adjacency stores row positions into the de-duplicated places
+    table; ``transpose`` gives the place -> dish direction.
+    """
+
+    def __init__(self, offsets, targets):
+        self.offsets = offsets
+        self.targets = targets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def row(self, i):
+        if i is None or not 0 <= i < len(self):
+            return self.targets[:0]
+        return self.targets[self.offsets[i]:self.offsets[i + 1]]
+
+    def transpose(self, n_targets):
+        sources = np.repeat(np.arange(len(self), dtype=self.targets.dtype), np.diff(self.offsets))
+        order = np.argsort(self.targets, kind="stable")
+        offsets = np.zeros(n_targets + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.targets, minlength=n_targets), out=offsets[1:])
+        return Adjacency(offsets, sources[order])
+
+
+def build_places_table(places):
+    duplicated = places["id"].duplicated()
+    if duplicated.any():
+        logger.warning("Dropping %d duplicate place rows: %s", duplicated.sum(), sorted(places.loc[duplicated, "id"].unique()))
+    return places[~duplicated].reset_index(drop=True)
+
+
+def _parse_place_ids(value):
+    if value is None or (isinstance(value, float) and np.isnan(value)) or value == "":
+        return []
+    parsed = ast.literal_eval(value) if isinstance(value, str) else value
+    if not isinstance(parsed, (list, tuple)):
+        raise ValueError(f"expected a list of place ids, got {type(parsed).__name__}")
+    return [str(place_id) for place_id in parsed]
+
+
+def build_place_adjacency(dish_places, places):
+    position_by_id = {place_id: i for i, place_id in enumerate(places["id"])}
+    offsets = np.zeros(len(dish_places) + 1, dtype=np.int64)
+    indices = []
+    bad_literals = []
+    unknown_ids = set()
+
+    for dish_id, value in enumerate(dish_places):
+        try:
+            place_ids = _parse_place_ids(value)
+        except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError) as exc:
+            bad_literals.append((dish_id, exc))
+            place_ids = []
+
+        positions = set()
+        for place_id in place_ids:
+            position = position_by_id.get(place_id)
+            if position is None:
+                unknown_ids.add(place_id)
+            else:
+                positions.add(position)
+        indices.extend(sorted(positions))
+        offsets[dish_id + 1] = len(indices)
+
+    if bad_literals:
+        logger.warning(
+            "Could not parse the places column for %d dishes (row: error): %s",
+            len(bad_literals), "; ".join(f"{dish_id}: {exc}" for dish_id, exc in bad_literals)
+        )
+    if unknown_ids:
+        logger.warning("%d place ids are not in the places table: %s", len(unknown_ids), sorted(unknown_ids))
+
+    return Adjacency(offsets, np.asarray(indices, dtype=np.int32))
+
+
+def data_version(paths):
+    """Identifier for the data files on disk; derived caches key on it."""
+    digest = hashlib.sha1()
+    for path in paths:
+        stat = os.stat(path)
+        digest.update(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()[:12]
+
+
+NUTRIENT_COLUMNS = ("calories", "protein", "carbohydrates", "fats", "sodium")
+DAILY_TARGETS = {"calories": 2000, "protein": 50, "carbohydrates": 275, "fats": 70, "sodium": 2300}
+
+
+class NutrientMatrix(NamedTuple):
+    absolute: np.ndarray
+    percent: np.ndarray
+
+
+def build_nutrient_matrix(dishes):
+    """N x 5 float32 nutrient values and their share of the daily targets, in %."""
+    absolute = as_float64(dishes.reindex(columns=NUTRIENT_COLUMNS).fillna(0).to_numpy())
+    targets = np.array([DAILY_TARGETS[column] for column in NUTRIENT_COLUMNS], dtype=np.float64)
+    percent = np.round(absolute / targets * 100, 1)
+    return NutrientMatrix(absolute.astype(np.float32), percent.astype(np.float32))
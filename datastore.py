@@ -0,0 +1,188 @@
+import hmac
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import numpy as np
+from flask import abort, g, jsonify, request
+
+from dataset import build_dish_index, build_nutrient_matrix, build_place_adjacency, data_version
+from filters import FacetFilter
+from geo import PlaceGrid
+from ingredients import IngredientIndex
+from schema import load_dishes, load_places
+from search import PrefixIndex, SearchIndex
+from similarity import build_similar_dishes
+from snapshot import ensure_snapshot, load_snapshot
+
+
+logger = logging.getLogger(__name__)
+
+
+class Dataset:
+    """One version of the dishes and places tables plus every index derived from them.
+
+    Built completely before it is published and never modified afterwards, so a
+    callback holding a Dataset sees one consistent version however long it runs.
+    """
+
+    def __init__(self, dishes, places, place_adjacency, version, previous=None, clientside_max_dishes=None):
+        dishes["dish_id"] = np.arange(len(dishes))
+        self.dishes = dishes
+        self.places = places
+        self.place_adjacency = place_adjacency
+        self.version = version
+        self.dish_index = build_dish_index(dishes)
+        self.ingredient_index = IngredientIndex(dishes["main_ingredients"])
+        self.facet_filter = FacetFilter(dishes, ingredients=self.ingredient_index)
+        self.nutrients = build_nutrient_matrix(dishes)
+        self.similar_dishes = build_similar_dishes(dishes, self.nutrients.absolute, self.ingredient_index)
+        self.dishes_by_place = place_adjacency.transpose(len(places))
+        self.place_grid = PlaceGrid(places["latitude"], places["longitude"])
+        self.place_coords = self.place_grid.coords
+        self.name_index = PrefixIndex(dishes["dish_name"])
+        self.search_index = SearchIndex(dishes, previous=previous.search_index if previous is not None else None)
+        # Small enough to ship to the browser and filter there (None: never).
+        self.clientside_filtering = clientside_max_dishes is not None and len(dishes) <= clientside_max_dishes
+
+
+def load_dataset(dishes_csv, places_csv, snapshot_dir, build_snapshot=False, previous=None, clientside_max_dishes=None):
+    """Dataset from the snapshot in ``snapshot_dir`` when it is current, else from the CSVs.
+
+    With ``build_snapshot`` a missing or stale snapshot is compiled first, so every
+    process that loads this version maps the same files. Indexes that can be
+    updated rather than rebuilt (the search index) start from ``previous``.
+    """
+    sources = [dishes_csv, places_csv]
+    if build_snapshot:
+        snapshot = ensure_snapshot(snapshot_dir, dishes_csv, places_csv)
+    else:
+        snapshot = load_snapshot(snapshot_dir, sources)
+    if snapshot is not None:
+        return Dataset(
+            snapshot.dishes, snapshot.places, snapshot.place_adjacency, snapshot.version, previous, clientside_max_dishes
+        )
+
+    version = data_version(sources)
+    dishes = load_dishes(dishes_csv)
+    places = load_places(places_csv)
+    place_adjacency = build_place_adjacency(dishes["places"], places)
+    return Dataset(dishes.drop(columns=["places"]), places, place_adjacency, version, previous, clientside_max_dishes)
+
+
+class DatasetStore:
+    """The live Dataset, replaced by a new version when the data files change.
+
+    ``reload`` builds the next Dataset off to the side and publishes it with a
+    single reference assignment. Requests pin the version that was live when they
+    started (``install``), so every ``current()`` call during one callback returns
+    the same Dataset even if a swap happens meanwhile. Code outside a request can
+    pin one explicitly with ``pinned()``. ``load(previous)`` is passed the live
+    Dataset (None for the first load) so it can reuse what did not change.
+
+    Each process watches on its own: a thread per process polls the files every
+    ``poll_interval`` seconds and reloads once a new version has been stable for
+    one interval, so a half-written file is not picked up. It is started by the
+    first request, after gunicorn has forked the workers.
+    """
+
+    def __init__(self, load, paths, poll_interval=5.0):
+        self.load = load
+        self.paths = list(paths)
+        self.poll_interval = poll_interval
+        self._current = load(None)
+        self._pinned = ContextVar("pinned_dataset", default=None)
+        self._reload_lock = threading.Lock()
+        self._listeners = []
+        self._watcher_pid = None
+
+    def current(self):
+        return self._pinned.get() or self._current
+
+    @contextmanager
+    def pinned(self, dataset=None):
+        token = self._pinned.set(dataset or self._current)
+        try:
+            yield self._pinned.get()
+        finally:
+            self._pinned.reset(token)
+
+    def on_swap(self, listener):
+        """Call ``listener(dataset)`` after each new version is published, one swap at a time."""
+        self._listeners.append(listener)
+        return listener
+
+    def reload(self, force=False):
+        """Load and publish the data on disk if its version changed; True when swapped."""
+        with self._reload_lock:
+            if not force and data_version(self.paths) == self._current.version:
+                return False
+            started = time.perf_counter()
+            dataset = self.load(self._current)
+            previous, self._current = self._current, dataset
+            logger.info(
+                "Swapped dataset %s -> %s (%d dishes, %d places) in %.1f s",
+                previous.version, dataset.version, len(dataset.dishes), len(dataset.places), time.perf_counter() - started
+            )
+            # Under the lock, so a listener never handles a version older than one it already saw.
+            for listener in self._listeners:
+                listener(dataset)
+        return True
+
+    def watch(self):
+        if not self.poll_interval or self._watcher_pid == os.getpid():
+            return
+        self._watcher_pid = os.getpid()
+        threading.Thread(target=self._watch, name="dataset-watcher", daemon=True).start()
+
+    def _watch(self):
+        seen = failed = None
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                version = data_version(self.paths)
+            except OSError:
+                continue
+            if version in (self._current.version, failed):
+                seen = None
+            elif version != seen:
+                seen = version
+            else:
+                try:
+                    self.reload()
+                except Exception:
+                    # Keep serving the previous version until the files change again.
+                    failed = version
+                    logger.exception("Dataset reload failed; still serving %s", self._current.version)
+
+    def install(self, app, admin_token=None, route="/admin/reload"):
+        server = app.server
+
+        @server.before_request
+        def pin_dataset():
+            self.watch()
+            g.dataset_token = self._pinned.set(self._current)
+
+        @server.teardown_request
+        def unpin_dataset(exc=None):
+            token = g.pop("dataset_token", None)
+            if token is not None:
+                self._pinned.reset(token)
+
+        if admin_token:
+            def reload_view():
+                if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {admin_token}"):
+                    abort(403)
+                previous = self._current.version
+                try:
+                    swapped = self.reload(force=request.args.get("force") == "1")
+                except Exception as exc:
+                    logger.exception("Dataset reload failed; still serving %s", previous)
+                    return jsonify(error=f"{type(exc).__name__}: {exc}", version=previous), 500
+                return jsonify(swapped=swapped, previous=previous, version=self._current.version)
+
+            server.add_url_rule(route, "reload_dataset", reload_view, methods=["POST"])
+        return self
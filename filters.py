@@ -0,0 +1,230 @@
+from functools import lru_cache
+
+import numpy as np
+
+import pandas as pd
+
+from dataset import DIETARY_BITS, DIETARY_COLUMNS, NUTRIENT_COLUMNS, dietary_mask
+
+
+FACET_COLUMNS = ("prefecture", "seasonality", "type")
+RANGE_COLUMNS = NUTRIENT_COLUMNS
+
+
+def pack_mask(mask):
+    return np.packbits(np.asarray(mask, dtype=bool))
+
+
+def unpack_rows(bitmap, n_rows):
+    rows = np.flatnonzero(np.unpackbits(bitmap, count=n_rows))
+    rows.flags.writeable = False
+    return rows
+
+
+def restrict_to(row_ids, dish_id):
+    if dish_id is None:
+        return row_ids[:0]
+    pos = np.searchsorted(row_ids, dish_id)
+    if pos < len(row_ids) and row_ids[pos] == dish_id:
+        return row_ids[pos:pos + 1]
+    return row_ids[:0]
+
+
+def rank_within(ranked, row_ids, n_rows):
+    """The ids of ``ranked`` that are also in ``row_ids``, keeping the ranked order."""
+    keep = np.zeros(n_rows, dtype=bool)
+    keep[row_ids] = True
+    return ranked[keep[ranked]]
+
+
+class RangeIndex:
+    """One numeric column presorted for range queries.
+
+    ``order`` lists the row ids by ascending value and ``values`` the matching
+    sorted values, so the rows in a range are two binary searches and a slice
+    of ``order``. Rows without a value are left out of every range.
+    """
+
+    def __init__(self, values):
+        values = np.asarray(values)
+        if values.dtype.kind != "f":
+            values = values.astype(np.float64)
+        present = np.flatnonzero(~np.isnan(values))
+        self.n_rows = len(values)
+        self.order = present[np.argsort(values[present], kind="stable")]
+        self.values = values[self.order]
+        self.missing = np.flatnonzero(np.isnan(values))
+        self.min = float(self.values[0]) if len(self.values) else 0.0
+        self.max = float(self.values[-1]) if len(self.values) else 0.0
+
+    def covers(self, low, high):
+        return low <= self.min and high >= self.max
+
+    def _bound(self, value, towards):
+        # The bound in the column's own dtype, rounded inwards: searching with a
+        # wider key would convert the whole column on every query.
+        bound = self.values.dtype.type(value)
+        if (float(bound) < value) if towards > 0 else (float(bound) > value):
+            bound = np.nextafter(bound, self.values.dtype.type(towards))
+        return bound
+
+    def span(self, low, high):
+        low, high = self._bound(low, np.inf), self._bound(high, -np.inf)
+        return int(np.searchsorted(self.values, low, side="left")), int(np.searchsorted(self.values, high, side="right"))
+
+    def bitmap(self, low, high):
+        start, stop = self.span(low, high)
+        # Scatter whichever side of the range is smaller.
+        if 2 * (stop - start) <= self.n_rows:
+            mask = np.zeros(self.n_rows, dtype=bool)
+            mask[self.order[start:stop]] = True
+        else:
+            mask = np.ones(self.n_rows, dtype=bool)
+            mask[self.order[:start]] = False
+            mask[self.order[stop:]] = False
+            mask[self.missing] = False
+        return pack_mask(mask)
+
+
+def _canonical_values(values):
+    if not values:
+        return ()
+    return tuple(sorted(set(values)))
+
+
+class FacetFilter:
+    """Packed bitmaps per facet value, answering filter states with bitwise ops.
+
+    Values selected within one facet are OR-ed, facets are AND-ed together and
+    every selected dietary flag must hold. With an IngredientIndex, dishes must
+    also list every included ingredient and none of the excluded ones. Ranges
+    over the numeric ``range_columns`` go through a RangeIndex each. Results
+    are sorted row ids, memoised per canonical filter tuple. The bitmap of
+    everything but the ranges and each range's bitmap are memoised too, so
+    dragging one slider only recomputes that slider's range.
+    """
+
+    def __init__(self, dishes, facet_columns=FACET_COLUMNS, dietary_columns=DIETARY_COLUMNS, cache_size=256,
+                 ingredients=None, range_columns=RANGE_COLUMNS):
+        self.n_rows = len(dishes)
+        self.facet_columns = tuple(facet_columns)
+        self.facet_bitmaps = {}
+        for column in self.facet_columns:
+            series = dishes[column]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                # Compare the small integer codes rather than the strings.
+                codes = series.cat.codes.to_numpy()
+                present = np.unique(codes[codes >= 0])
+                self.facet_bitmaps[column] = {
+                    series.cat.categories[code]: pack_mask(codes == code) for code in present
+                }
+                continue
+            values = series.to_numpy()
+            self.facet_bitmaps[column] = {
+                value: pack_mask(values == value) for value in series.dropna().unique()
+            }
+        self.dietary_bitmaps = {
+            column: pack_mask(dietary_mask(dishes, column))
+            for column in dietary_columns if DIETARY_BITS in dishes.columns or column in dishes.columns
+        }
+        self.ingredients = ingredients
+        self.range_indexes = {
+            column: RangeIndex(dishes[column]) for column in range_columns if column in dishes.columns
+        }
+        self.all_rows = pack_mask(np.ones(self.n_rows, dtype=bool))
+        self.all_rows.flags.writeable = False
+        self.empty = np.zeros_like(self.all_rows)
+        self.empty.flags.writeable = False
+        self._query = lru_cache(maxsize=cache_size)(self._evaluate)
+        self._base_bitmap = lru_cache(maxsize=16)(self._evaluate_base)
+        self._range_bitmap = lru_cache(maxsize=32)(self._evaluate_range)
+
+    def canonical(self, prefectures=None, seasons=None, types=None, dietary=None, included=None, excluded=None,
+                  ranges=None):
+        return (
+            _canonical_values(prefectures),
+            _canonical_values(seasons),
+            _canonical_values(types),
+            _canonical_values(dietary),
+            _canonical_values(included),
+            _canonical_values(excluded),
+            self.canonical_ranges(ranges),
+        )
+
+    def canonical_ranges(self, ranges):
+        """Active ranges of a ``{column: (low, high)}`` mapping as sorted (column, low, high) triples.
+
+        A range covering every value of its column filters nothing and is dropped.
+        """
+        if not ranges:
+            return ()
+        active = []
+        for column, bounds in ranges.items():
+            index = self.range_indexes.get(column)
+            if index is None or not bounds:
+                continue
+            low, high = sorted(float(bound) for bound in bounds)
+            if not index.covers(low, high):
+                active.append((column, low, high))
+        return tuple(sorted(active))
+
+    def query(self, prefectures=None, seasons=None, types=None, dietary=None, included=None, excluded=None,
+              ranges=None):
+        return self._query(self.canonical(prefectures, seasons, types, dietary, included, excluded, ranges))
+
+    def query_key(self, key):
+        """Rows for a key already returned by ``canonical``."""
+        return self._query(key)
+
+    def query_bitmap(self, key):
+        bitmap = self._base_bitmap(key[:-1])
+        for column, low, high in key[-1]:
+            bitmap = np.bitwise_and(bitmap, self._range_bitmap(column, low, high))
+        return bitmap
+
+    def _evaluate_range(self, column, low, high):
+        bitmap = self.range_indexes[column].bitmap(low, high)
+        bitmap.flags.writeable = False
+        return bitmap
+
+    def _evaluate_base(self, key):
+        facet_selections = key[:len(self.facet_columns)]
+        dietary, included, excluded = key[len(self.facet_columns):]
+
+        bitmap = self.all_rows
+        for column, selected in zip(self.facet_columns, facet_selections):
+            if not selected:
+                continue
+            facet = self.facet_bitmaps[column]
+            union = self.empty.copy()
+            for value in selected:
+                if value in facet:
+                    np.bitwise_or(union, facet[value], out=union)
+            bitmap = union if bitmap is self.all_rows else np.bitwise_and(bitmap, union, out=bitmap)
+
+        for column in dietary:
+            flag = self.dietary_bitmaps.get(column, self.empty)
+            bitmap = flag.copy() if bitmap is self.all_rows else np.bitwise_and(bitmap, flag, out=bitmap)
+
+        for name in included:
+            listed = self.ingredients.bitmap(name) if self.ingredients is not None else self.empty
+            bitmap = listed.copy() if bitmap is self.all_rows else np.bitwise_and(bitmap, listed, out=bitmap)
+        if excluded and self.ingredients is not None:
+            union = self.empty.copy()
+            for name in excluded:
+                np.bitwise_or(union, self.ingredients.bitmap(name), out=union)
+            np.invert(union, out=union)
+            bitmap = union if bitmap is self.all_rows else np.bitwise_and(bitmap, union, out=bitmap)
+        # Shared by every range query on top of it.
+        bitmap.flags.writeable = False
+        return bitmap
+
+    def _evaluate(self, key):
+        if not any(key):
+            rows = np.arange(self.n_rows)
+            rows.flags.writeable = False
+            return rows
+        return unpack_rows(self.query_bitmap(key), self.n_rows)
+
+    def cache_info(self):
+        return self._query.cache_info()
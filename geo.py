@@ -0,0 +1,144 @@
+import math
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+
+EARTH_RADIUS_KM = 6371.0
+
+
+class PlaceCoordinates(NamedTuple):
+    lat_rad: np.ndarray
+    lon_rad: np.ndarray
+    cos_lat: np.ndarray
+
+
+def place_coordinates(latitudes, longitudes):
+    lat_rad = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon_rad = np.radians(np.asarray(longitudes, dtype=np.float64))
+    return PlaceCoordinates(lat_rad, lon_rad, np.cos(lat_rad))
+
+
+def distances_km(user_lat, user_lon, coords, rows=None):
+    """Haversine distance from one user coordinate to many places, in one pass.
+
+    ``rows`` optionally selects place positions; missing coordinates give NaN.
+    """
+    lat_rad, lon_rad, cos_lat = coords
+    if rows is not None:
+        lat_rad, lon_rad, cos_lat = lat_rad[rows], lon_rad[rows], cos_lat[rows]
+    if user_lat is None or user_lon is None or pd.isna(user_lat) or pd.isna(user_lon):
+        return np.full(len(lat_rad), np.nan)
+
+    user_lat_rad = np.radians(float(user_lat))
+    user_lon_rad = np.radians(float(user_lon))
+    a = np.sin((lat_rad - user_lat_rad) / 2.0) ** 2
+    a += np.cos(user_lat_rad) * cos_lat * np.sin((lon_rad - user_lon_rad) / 2.0) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def format_distances(km, missing="?"):
+    return np.array(
+        [missing if math.isnan(d) else f"{d:.1f} km" for d in np.asarray(km, dtype=np.float64).tolist()], dtype=object
+    )
+
+
+KM_PER_DEGREE = np.pi * EARTH_RADIUS_KM / 180.0
+
+
+class PlaceGrid:
+    """Fixed lat/lon grid over place coordinates for radius and k-nearest queries.
+
+    Places are sorted by cell key (``row * n_cols + col``), so each grid row of a
+    query window is one contiguous slice found with ``searchsorted``. Candidates
+    are then checked with exact haversine distances.
+    """
+
+    def __init__(self, latitudes, longitudes, cell_deg=None, target_per_cell=32):
+        lat = np.asarray(latitudes, dtype=np.float64)
+        lon = np.asarray(longitudes, dtype=np.float64)
+        self.coords = place_coordinates(lat, lon)
+        self.n_places = len(lat)
+
+        valid = np.flatnonzero(~(np.isnan(lat) | np.isnan(lon)))
+        if cell_deg is None:
+            if len(valid):
+                span = max(np.ptp(lat[valid]) * np.ptp(lon[valid]), 1.0)
+                cell_deg = float(np.sqrt(span * target_per_cell / len(valid)))
+            else:
+                cell_deg = 1.0
+            cell_deg = min(max(cell_deg, 0.005), 2.0)
+            keys = self._set_cell(cell_deg, lat[valid], lon[valid])
+            if len(keys):
+                # Restaurants cluster in cities: size cells for the dense cells, not the average.
+                busy = np.percentile(np.unique(keys, return_counts=True)[1], 99)
+                if busy > 4 * target_per_cell:
+                    cell_deg = max(cell_deg / np.sqrt(busy / target_per_cell), 0.005)
+        keys = self._set_cell(cell_deg, lat[valid], lon[valid])
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.positions = valid[order]
+
+    def _set_cell(self, cell_deg, lat, lon):
+        self.cell_deg = cell_deg
+        self.n_rows = int(np.ceil(180.0 / cell_deg)) + 1
+        self.n_cols = int(np.ceil(360.0 / cell_deg))
+        return self._row(lat) * self.n_cols + self._col(lon)
+
+    def _row(self, lat):
+        return np.floor((np.asarray(lat) + 90.0) / self.cell_deg).astype(np.int64)
+
+    def _col(self, lon):
+        return np.floor(((np.asarray(lon) + 180.0) % 360.0) / self.cell_deg).astype(np.int64) % self.n_cols
+
+    def _candidates(self, lat, lon, radius_km):
+        dlat = radius_km / KM_PER_DEGREE
+        row_lo = max(int(self._row(max(lat - dlat, -90.0))), 0)
+        row_hi = min(int(self._row(min(lat + dlat, 90.0))), self.n_rows - 1)
+
+        max_abs_lat = min(abs(lat) + dlat, 90.0)
+        cos_lat = np.cos(np.radians(max_abs_lat))
+        if max_abs_lat >= 89.9 or radius_km >= cos_lat * KM_PER_DEGREE * 180.0:
+            col_ranges = [(0, self.n_cols - 1)]
+        else:
+            dlon = radius_km / (KM_PER_DEGREE * cos_lat)
+            col_lo = int(self._col(lon - dlon))
+            col_hi = int(self._col(lon + dlon))
+            if col_lo <= col_hi:
+                col_ranges = [(col_lo, col_hi)]
+            else:
+                col_ranges = [(col_lo, self.n_cols - 1), (0, col_hi)]
+
+        bases = np.arange(row_lo, row_hi + 1, dtype=np.int64)[:, None] * self.n_cols
+        col_lo, col_hi = np.array(col_ranges, dtype=np.int64).T
+        lo = np.searchsorted(self.keys, (bases + col_lo).ravel())
+        hi = np.searchsorted(self.keys, (bases + col_hi + 1).ravel())
+        slices = [self.positions[a:b] for a, b in zip(lo.tolist(), hi.tolist()) if b > a]
+        if not slices:
+            return self.positions[:0]
+        return np.concatenate(slices)
+
+    def within(self, lat, lon, radius_km, limit=None):
+        """Places within ``radius_km`` of (lat, lon), nearest first, as (positions, km)."""
+        candidates = self._candidates(float(lat), float(lon), float(radius_km))
+        km = distances_km(lat, lon, self.coords, candidates)
+        inside = km <= radius_km
+        candidates, km = candidates[inside], km[inside]
+        if limit is not None and len(km) > limit:
+            nearest = np.argpartition(km, limit - 1)[:limit]
+            candidates, km = candidates[nearest], km[nearest]
+        order = np.argsort(km, kind="stable")
+        return candidates[order], km[order]
+
+    def nearest(self, lat, lon, k):
+        """The ``k`` nearest places to (lat, lon), nearest first, as (positions, km)."""
+        k = min(int(k), len(self.positions))
+        if k <= 0:
+            return self.positions[:0], np.empty(0)
+        radius_km = self.cell_deg * KM_PER_DEGREE
+        while True:
+            positions, km = self.within(lat, lon, radius_km, limit=k)
+            if len(positions) >= k or radius_km >= np.pi * EARTH_RADIUS_KM:
+                return positions, km
+            radius_km *= 2.0
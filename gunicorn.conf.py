@@ -0,0 +1,70 @@
+"""Gunicorn settings for serving the dashboard: ``gunicorn app:server`` picks this file up.
+
+The master imports the app once (``preload_app``), so the dataset, its indexes and
+the warmed caches live in pages that forked workers share copy-on-write. The
+dataset itself comes from the memory-mapped snapshot, which the master builds
+when it is missing or stale. The garbage collector stays off in the master and
+everything it allocated is frozen before the fork, so collections in the workers
+don't write to those shared pages.
+
+Warming the caches in the master delays every worker, so the master gives the
+warm-up at most KYODO_PRELOAD_WARM_SECONDS (default 10) and stops it there;
+whatever is left is rendered on demand.
+
+Each worker keeps its own callback histograms and flushes them to
+KYODO_METRICS_DIR, where /metrics sums them; without one a scrape would see a
+single worker. When it is not set the server uses a temporary directory,
+removed again on shutdown.
+"""
+import gc
+import os
+import shutil
+import sys
+import tempfile
+
+from metrics import remove_flushed
+
+
+preload_app = os.environ.get("KYODO_PRELOAD", "1") == "1"
+preload_warm_seconds = float(os.environ.get("KYODO_PRELOAD_WARM_SECONDS", 10))
+
+# Set here rather than in on_starting: a preloaded app is imported before that hook runs.
+owns_metrics_dir = "KYODO_METRICS_DIR" not in os.environ
+if owns_metrics_dir:
+    os.environ["KYODO_METRICS_DIR"] = tempfile.mkdtemp(prefix="kyodo-metrics-")
+
+if preload_app:
+    os.environ.setdefault("KYODO_BUILD_SNAPSHOT", "1")
+    # Collections in the master only leave freed holes in pages the workers will share.
+    gc.disable()
+
+
+def on_starting(server):
+    # Files left by a previous run's workers would be summed into this one's.
+    remove_flushed(os.environ["KYODO_METRICS_DIR"])
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    app = sys.modules.get("app")
+    # A warmer still running at fork time would be missing from the workers,
+    # possibly holding a cache lock that no worker can release.
+    if app is not None and app.finish_cache_warmers(preload_warm_seconds):
+        server.log.info("Stopped the cache warm-up after %.0f s; the rest is rendered on demand", preload_warm_seconds)
+    gc.collect()
+    gc.freeze()
+    server.log.info("Froze %d preloaded objects before forking workers", gc.get_freeze_count())
+
+
+def post_fork(server, worker):
+    gc.enable()
+
+
+def child_exit(server, worker):
+    remove_flushed(os.environ["KYODO_METRICS_DIR"], worker.pid)
+
+
+def on_exit(server):
+    if owns_metrics_dir:
+        shutil.rmtree(os.environ["KYODO_METRICS_DIR"], ignore_errors=True)
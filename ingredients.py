@@ -0,0 +1,108 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from filters import pack_mask
+from search import fold
+
+
+_PARENTHESIS = re.compile(r"\(([^)]*)\)?")
+_SEPARATORS = re.compile(r"[,;/\n]")
+_OR_SIMILAR = re.compile(r"\b(or (similar|other)\b.*|etc\.?)")
+_AND = re.compile(r"\s+and\s+")
+_QUOTES = str.maketrans("", "", "\"'“”‘’")
+_SPACES = re.compile(r"\s+")
+_CONJUNCTION = re.compile(r"^(or|and) ")
+NOT_INGREDIENTS = frozenset({"etc", "etc.", "others", "other", "and more"})
+
+
+def _singular(word):
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 4 and word.endswith(("oes", "shes", "ches", "xes")):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def canonical_ingredient(text):
+    """Vocabulary form of one ingredient: folded, unquoted, its last word singular."""
+    text = _SPACES.sub(" ", fold(text).translate(_QUOTES)).strip(" .,:;-*=()")
+    text = _CONJUNCTION.sub("", text)
+    if not text:
+        return ""
+    words = text.split(" ")
+    words[-1] = _singular(words[-1])
+    return " ".join(words)
+
+
+def parse_ingredients(text):
+    """Canonical ingredients of a ``main_ingredients`` list, in order and without repeats.
+
+    Parenthesised notes are dropped, except "(=name)" synonyms, which are kept as
+    ingredients of their own: "gobou(=burdock root)" gives "gobou" and "burdock root".
+    """
+    if not isinstance(text, str):
+        return []
+    found = []
+    for item in _SEPARATORS.split(text):
+        synonyms = [note.strip()[1:] for note in _PARENTHESIS.findall(item) if note.strip().startswith("=")]
+        names = _AND.split(_OR_SIMILAR.sub("", _PARENTHESIS.sub(" ", item)))
+        for name in [*names, *synonyms]:
+            name = canonical_ingredient(name)
+            if name and name not in NOT_INGREDIENTS:
+                found.append(name)
+    return list(dict.fromkeys(found))
+
+
+class IngredientIndex:
+    """Canonical ingredient vocabulary with a packed row bitmap per ingredient.
+
+    Each distinct ``main_ingredients`` text is parsed once (``lists``, with
+    ``codes`` giving each row's text, -1 for none); an ingredient's bitmap marks
+    the rows whose text lists it. ``vocabulary`` is ordered by the number of
+    dishes, most common first.
+    """
+
+    def __init__(self, ingredient_lists):
+        codes, texts = pd.factorize(pd.Series(ingredient_lists, dtype=object))
+        self.n_rows = len(codes)
+        self.codes = codes
+        self.lists = [parse_ingredients(text) for text in texts]
+        texts_by_name = {}
+        for text_id, names in enumerate(self.lists):
+            for name in names:
+                texts_by_name.setdefault(name, []).append(text_id)
+
+        rows_per_text = np.bincount(codes[codes >= 0], minlength=len(texts))
+        counts = {name: int(rows_per_text[text_ids].sum()) for name, text_ids in texts_by_name.items()}
+        self.vocabulary = sorted(counts, key=lambda name: (-counts[name], name))
+        self.counts = counts
+        self.bitmaps = {}
+        for name in self.vocabulary:
+            listed = np.zeros(len(texts) + 1, dtype=bool)
+            listed[texts_by_name[name]] = True
+            # Code -1 (no ingredients given) lands on the trailing False.
+            self.bitmaps[name] = pack_mask(listed[codes])
+        self.empty = np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.vocabulary)
+
+    def canonical(self, names):
+        if not names:
+            return ()
+        return tuple(sorted({canonical_ingredient(name) for name in names}))
+
+    def bitmap(self, name):
+        return self.bitmaps.get(name, self.empty)
+
+    def complete(self, prefix, limit=20):
+        """(names, total): the most common ingredients with a word starting with ``prefix``, and how many match."""
+        prefix = fold(prefix or "").strip()
+        if not prefix:
+            return self.vocabulary[:limit], len(self.vocabulary)
+        names = [name for name in self.vocabulary if name.startswith(prefix) or f" {prefix}" in name]
+        return names[:limit], len(names)
@@ -0,0 +1,235 @@
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+
+from flask import Response, g, request
+
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = tuple(256 * 4 ** i for i in range(9))  # 256 B .. 16 MiB
+
+HISTOGRAMS = {
+    "duration_seconds": ("Wall time spent handling a Dash callback request.", DURATION_BUCKETS),
+    "cpu_seconds": ("CPU time of the worker thread handling a Dash callback request.", DURATION_BUCKETS),
+    "input_bytes": ("Size of the Dash callback request body.", SIZE_BUCKETS),
+    "output_bytes": ("Size of the Dash callback response body.", SIZE_BUCKETS),
+}
+
+
+def _empty_histogram(buckets):
+    return {"buckets": [0] * (len(buckets) + 1), "sum": 0.0, "count": 0}
+
+
+UNKNOWN_CALLBACK = "unknown"
+
+_callback_names = {}
+
+
+def callback_name(app, output):
+    """Name of the function registered for a Dash callback output spec, or ``UNKNOWN_CALLBACK``.
+
+    The spec comes from the request body, so only the ones Dash registered are
+    remembered: anything else would grow the cache and the label set without bound.
+    """
+    if not isinstance(output, str):
+        return UNKNOWN_CALLBACK
+    name = _callback_names.get(output)
+    if name is None:
+        callback = app.callback_map.get(output, {}).get("callback")
+        if callback is None:
+            return UNKNOWN_CALLBACK
+        name = getattr(callback, "__name__", None) or output
+        _callback_names[output] = name
+    return name
+
+
+def remove_flushed(directory, pid="*"):
+    """Delete the histograms flushed by worker ``pid``, or by every worker."""
+    for path in glob.glob(os.path.join(directory, f"callbacks-{pid}.json")):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _escape(label):
+    return str(label).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class CallbackMetrics:
+    """Per-callback latency and payload histograms for the Dash callback route.
+
+    Each worker keeps its histograms in memory and, when ``directory`` is set,
+    flushes them to ``callbacks-<pid>.json`` there every ``flush_interval``
+    seconds. The ``/metrics`` view sums every worker's file, so a scrape that
+    lands on any gunicorn worker sees the whole server.
+    """
+
+    def __init__(self, directory=None, prefix="kyodo_callback", flush_interval=5.0):
+        self.directory = directory
+        self.prefix = prefix
+        self.flush_interval = flush_interval
+        self._series = {}
+        self._errors = {}
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            atexit.register(self.flush)
+
+    def observe(self, callback, values, failed=False):
+        with self._lock:
+            series = self._series.setdefault(callback, {})
+            for metric, value in values.items():
+                buckets = HISTOGRAMS[metric][1]
+                histogram = series.setdefault(metric, _empty_histogram(buckets))
+                index = len(buckets)
+                for i, bound in enumerate(buckets):
+                    if value <= bound:
+                        index = i
+                        break
+                histogram["buckets"][index] += 1
+                histogram["sum"] += value
+                histogram["count"] += 1
+            if failed:
+                self._errors[callback] = self._errors.get(callback, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            return {"series": json.loads(json.dumps(self._series)), "errors": dict(self._errors)}
+
+    def _path(self, pid):
+        return os.path.join(self.directory, f"callbacks-{pid}.json")
+
+    def flush(self):
+        # A process that never answered a callback (the preloading master) has nothing to add.
+        if not self.directory or not (self._series or self._errors):
+            return
+        path = self._path(os.getpid())
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+        self._last_flush = time.monotonic()
+
+    def collect(self):
+        """This worker's live histograms merged with the last flush of every other worker."""
+        merged = self.snapshot()
+        if not self.directory:
+            return merged
+        own_path = self._path(os.getpid())
+        for path in glob.glob(os.path.join(self.directory, "callbacks-*.json")):
+            if path == own_path:
+                continue
+            try:
+                with open(path) as f:
+                    other = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for callback, series in other.get("series", {}).items():
+                merged_series = merged["series"].setdefault(callback, {})
+                for metric, histogram in series.items():
+                    if metric not in HISTOGRAMS:
+                        continue
+                    target = merged_series.setdefault(metric, _empty_histogram(HISTOGRAMS[metric][1]))
+                    target["buckets"] = [a + b for a, b in zip(target["buckets"], histogram["buckets"])]
+                    target["sum"] += histogram["sum"]
+                    target["count"] += histogram["count"]
+            for callback, count in other.get("errors", {}).items():
+                merged["errors"][callback] = merged["errors"].get(callback, 0) + count
+        return merged
+
+    def render(self):
+        data = self.collect()
+        lines = []
+        for metric, (help_text, buckets) in HISTOGRAMS.items():
+            name = f"{self.prefix}_{metric}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for callback in sorted(data["series"]):
+                histogram = data["series"][callback].get(metric)
+                if histogram is None:
+                    continue
+                label = f'callback="{_escape(callback)}"'
+                cumulative = 0
+                for bound, count in zip(buckets + ("+Inf",), histogram["buckets"]):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{label},le="{bound}"}} {cumulative}')
+                lines.append(f"{name}_sum{{{label}}} {histogram['sum']:.6f}")
+                lines.append(f"{name}_count{{{label}}} {histogram['count']}")
+        name = f"{self.prefix}_errors_total"
+        lines.append(f"# HELP {name} Dash callback requests answered with a server error.")
+        lines.append(f"# TYPE {name} counter")
+        for callback in sorted(data["errors"]):
+            lines.append(f'{name}{{callback="{_escape(callback)}"}} {data["errors"][callback]}')
+        return "\n".join(lines) + "\n"
+
+    def install(self, app, route="/metrics"):
+        server = app.server
+
+        @server.before_request
+        def start_callback_timer():
+            if request.path.endswith("_dash-update-component"):
+                g.callback_timer = (time.perf_counter(), time.thread_time())
+
+        @server.after_request
+        def record_callback(response):
+            timer = g.pop("callback_timer", None)
+            if timer is None:
+                return response
+            wall, cpu = time.perf_counter() - timer[0], time.thread_time() - timer[1]
+            body = request.get_json(silent=True)
+            callback = callback_name(app, body.get("output") if isinstance(body, dict) else None)
+            if callback == UNKNOWN_CALLBACK:
+                # Dash has no callback for it and answered with an error; nothing to time.
+                return response
+            output_bytes = response.calculate_content_length()
+            self.observe(
+                callback,
+                {
+                    "duration_seconds": wall,
+                    "cpu_seconds": cpu,
+                    "input_bytes": request.content_length or 0,
+                    "output_bytes": output_bytes or 0,
+                },
+                failed=response.status_code >= 500,
+            )
+            if self.directory and time.monotonic() - self._last_flush >= self.flush_interval:
+                self.flush()
+            return response
+
+        server.add_url_rule(
+            route, "callback_metrics",
+            lambda: Response(self.render(), mimetype="text/plain; version=0.0.4")
+        )
+        return self
+
+
+class CallbackRecorder:
+    """Appends every Dash callback request body to a JSONL file, for tools/replay_load.py."""
+
+    def __init__(self, path):
+        self.path = path
+        self._started = time.time()
+        self._lock = threading.Lock()
+
+    def install(self, app):
+        @app.server.before_request
+        def record_callback_request():
+            if not request.path.endswith("_dash-update-component"):
+                return
+            body = request.get_json(silent=True)
+            if not isinstance(body, dict):
+                return
+            line = json.dumps({
+                "callback": callback_name(app, body.get("output")),
+                "t": round(time.time() - self._started, 3),
+                "payload": body,
+            })
+            with self._lock, open(self.path, "a") as f:
+                f.write(line + "\n")
+
+        return self
@@ -0,0 +1,165 @@
+import logging
+import sys
+
+import numpy as np
+import pandas as pd
+
+from dataset import DIETARY_BITS, DIETARY_COLUMNS, NUTRIENT_COLUMNS, build_places_table
+
+
+logger = logging.getLogger(__name__)
+
+
+CATEGORY = "category"    # few distinct values: int codes into a shared category list
+FLOAT32 = "float32"
+FLOAT64 = "float64"
+FLAG = "flag"            # packed with the table's other flags into one uint8 bit column
+TEXT = "text"            # mostly unique strings, kept as they are
+INTERNED = "interned"    # repeated strings: equal values share one str object
+
+DISH_SCHEMA = {
+    "dish_name": INTERNED,
+    "prefecture": CATEGORY,
+    "area_name": INTERNED,
+    "main_ingredients": TEXT,
+    "history": TEXT,
+    "image_url": TEXT,
+    "type": CATEGORY,
+    "seasonality": CATEGORY,
+    **{column: FLOAT32 for column in NUTRIENT_COLUMNS},
+    **{column: FLAG for column in DIETARY_COLUMNS},
+    "area_lat": FLOAT32,
+    "area_lon": FLOAT32,
+    "places": TEXT,
+}
+
+PLACE_SCHEMA = {
+    "id": TEXT,
+    "name": INTERNED,
+    "latitude": FLOAT32,
+    "longitude": FLOAT32,
+    # Shown as-is in the places tables, where float32 would print as 4.300000190734863.
+    "rating": FLOAT64,
+    "price_level": CATEGORY,
+    "googleMapsUri": TEXT,
+}
+
+VALID_RANGES = {
+    "area_lat": (-90, 90), "area_lon": (-180, 180), "latitude": (-90, 90), "longitude": (-180, 180),
+    "rating": (0, 5), **{column: (0, np.inf) for column in NUTRIENT_COLUMNS},
+}
+
+TRUE_VALUES = {"true", "1", "yes"}
+FALSE_VALUES = {"false", "0", "no"}
+
+
+def _intern(values):
+    return np.array([sys.intern(value) if isinstance(value, str) else value for value in values], dtype=object)
+
+
+def _numeric(series, column, dtype, source):
+    values = pd.to_numeric(series, errors="coerce")
+    unparsed = values.isna() & series.notna()
+    if unparsed.any():
+        logger.warning("%s: %d values of %s are not numbers and were dropped", source, unparsed.sum(), column)
+    low, high = VALID_RANGES.get(column, (-np.inf, np.inf))
+    outside = (values < low) | (values > high)
+    if outside.any():
+        logger.warning("%s: %d values of %s are outside [%s, %s] and were dropped", source, outside.sum(), column, low, high)
+        values = values.mask(outside)
+    return values.to_numpy(dtype=dtype, na_value=np.nan)
+
+
+def _flag(series, column, source):
+    if pd.api.types.is_bool_dtype(series) and not series.isna().any():
+        return series.to_numpy(dtype=bool)
+    text = series.astype(str).str.strip().str.lower()
+    truthy = text.isin(TRUE_VALUES)
+    invalid = ~(truthy | text.isin(FALSE_VALUES))
+    if invalid.any():
+        logger.warning("%s: %d values of %s are not true/false and were read as false", source, invalid.sum(), column)
+    return truthy.to_numpy()
+
+
+def apply_schema(frame, schema, source="frame"):
+    """Typed copy of ``frame`` with exactly the schema's columns, in schema order.
+
+    Missing columns raise ValueError; extra columns are dropped. Values that do not
+    fit their column (unparseable or out-of-range numbers, flags that are neither
+    true nor false) are logged and become NaN or False.
+    """
+    missing = [column for column in schema if column not in frame.columns]
+    if missing:
+        raise ValueError(f"{source} is missing columns: {', '.join(missing)}")
+    extra = [column for column in frame.columns if column not in schema]
+    if extra:
+        logger.warning("%s: ignoring columns that are not in the schema: %s", source, ", ".join(extra))
+
+    flags = [column for column, kind in schema.items() if kind == FLAG]
+    if flags and tuple(flags) != DIETARY_COLUMNS:
+        raise ValueError("flag columns must be the dietary columns, in DIETARY_COLUMNS order")
+
+    data = {}
+    for column, kind in schema.items():
+        series = frame[column]
+        if kind == CATEGORY:
+            data[column] = series if isinstance(series.dtype, pd.CategoricalDtype) else series.astype("category")
+        elif kind in (FLOAT32, FLOAT64):
+            data[column] = _numeric(series, column, np.dtype(kind), source)
+        elif kind == FLAG:
+            if DIETARY_BITS not in data:
+                data[DIETARY_BITS] = np.zeros(len(frame), dtype=np.uint8)
+            bit = flags.index(column)
+            data[DIETARY_BITS] |= _flag(series, column, source).astype(np.uint8) << bit
+        elif kind == INTERNED:
+            data[column] = _intern(series.to_numpy(dtype=object))
+        else:
+            data[column] = series.to_numpy(dtype=object)
+    return pd.DataFrame(data, index=pd.RangeIndex(len(frame)), copy=False)
+
+
+def read_csv(path, schema):
+    header = pd.read_csv(path, nrows=0).columns
+    usecols = [column for column in header if column in schema]
+    # Parse facets straight into categoricals and text as plain objects; numbers and
+    # flags are checked by apply_schema.
+    dtype = {
+        column: "category" if kind == CATEGORY else object
+        for column, kind in schema.items() if kind in (CATEGORY, TEXT, INTERNED)
+    }
+    frame = pd.read_csv(path, usecols=usecols, dtype={c: t for c, t in dtype.items() if c in usecols})
+    if len(usecols) < len(header):
+        logger.warning("%s: ignoring columns that are not in the schema: %s",
+                       path, ", ".join(column for column in header if column not in schema))
+    return apply_schema(frame, schema, source=path)
+
+
+def load_dishes(path):
+    return read_csv(path, DISH_SCHEMA)
+
+
+def load_places(path):
+    return build_places_table(read_csv(path, PLACE_SCHEMA))
+
+
+def column_bytes(series):
+    """Resident bytes of one column, counting each shared str object once."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.nbytes + int(series.cat.categories.memory_usage(deep=True))
+    values = series.to_numpy()
+    if values.dtype != object:
+        return values.nbytes
+    unique = {id(value): value for value in values}
+    return values.nbytes + sum(sys.getsizeof(value) for value in unique.values())
+
+
+def memory_report(frame):
+    """Per-column dtype and resident bytes, largest first."""
+    report = pd.DataFrame(
+        {
+            "dtype": [str(frame[column].dtype) for column in frame.columns],
+            "bytes": [column_bytes(frame[column]) for column in frame.columns],
+        },
+        index=frame.columns,
+    )
+    return report.sort_values("bytes", ascending=False)
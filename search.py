@@ -0,0 +1,370 @@
+import bisect
+import re
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+
+# Field weights: a hit in the dish name outranks one in the ingredients, which
+# outranks one somewhere in the history text.
+SEARCH_FIELDS = {"dish_name": 3.0, "main_ingredients": 2.0, "history": 1.0}
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from in into is it its of on or that the this to was were which with".split()
+)
+
+EXACT, PREFIX = 1.0, 0.7
+FUZZY = {1: 0.5, 2: 0.35}       # by edit distance
+MIN_PREFIX = 2
+MIN_FUZZY = 4                   # shorter tokens are not corrected
+MAX_EXPANSIONS = 32             # prefix/fuzzy terms per query token, most frequent first
+
+_TOKEN = re.compile(r"\w+")
+_COMBINING = re.compile("[\u0300-\u036f]")
+
+
+def fold(text):
+    """``text`` lowercased with accents removed, so "Ryōri" matches "ryori"."""
+    return _COMBINING.sub("", unicodedata.normalize("NFKD", text.lower()))
+
+
+def tokenize(text):
+    """Lowercase, accent-folded word tokens of ``text``, without stopwords and single characters."""
+    if not isinstance(text, str):
+        return []
+    return [token for token in _TOKEN.findall(fold(text)) if len(token) > 1 and token not in STOPWORDS]
+
+
+def max_edits(token):
+    if len(token) < MIN_FUZZY or token.isdigit():
+        return 0
+    return 1 if len(token) < 8 else 2
+
+
+def _deletes(term, distance):
+    found = {term}
+    frontier = {term}
+    for _ in range(distance):
+        frontier = {word[:i] + word[i + 1:] for word in frontier for i in range(len(word))}
+        found |= frontier
+    return found
+
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance (a transposition counts as one edit), or limit + 1 past ``limit``."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def _segments(offsets, rows):
+    """Flat positions of the CSR segments ``offsets[r]:offsets[r + 1]`` for each of ``rows``, in order."""
+    starts = offsets[rows]
+    lengths = offsets[rows + 1] - starts
+    if not len(lengths):
+        return np.zeros(0, dtype=np.int64), lengths
+    shift = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+    return np.arange(lengths.sum()) + shift, lengths
+
+
+class SearchField:
+    """Index of one text column, built over its distinct texts.
+
+    Dishes share ingredient lists and history texts, so each distinct text is
+    analysed once and ``codes`` maps every row to its text. ``term_offsets`` /
+    ``terms`` / ``counts`` is the forward index (text -> terms, kept to rebuild
+    incrementally); ``posting_offsets`` / ``posting_texts`` / ``posting_weights``
+    the inverted one (global term id -> texts), with idf and field weight folded
+    into the weights.
+    """
+
+    def __init__(self, name, weight, texts, codes, term_offsets, terms, counts):
+        self.name = name
+        self.weight = weight
+        self.texts = texts
+        self.codes = codes
+        self.identity = len(texts) == len(codes) and np.array_equal(codes, np.arange(len(codes)))
+        self.term_offsets = term_offsets
+        self.terms = terms
+        self.counts = counts
+
+    def invert(self, n_terms, n_rows):
+        text_of_entry = np.repeat(np.arange(len(self.texts), dtype=np.int32), np.diff(self.term_offsets))
+        order = np.argsort(self.terms, kind="stable")
+        sorted_terms = self.terms[order]
+        self.posting_offsets = np.searchsorted(sorted_terms, np.arange(n_terms + 1))
+        self.posting_texts = text_of_entry[order]
+
+        rows_per_text = np.bincount(self.codes, minlength=len(self.texts))
+        self.df = np.bincount(self.terms, weights=rows_per_text[text_of_entry], minlength=n_terms)
+        with np.errstate(divide="ignore"):
+            idf = np.where(self.df > 0, np.log1p(n_rows / self.df), 0.0)
+        self.posting_weights = (
+            self.weight * idf[sorted_terms] * (1 + np.log(self.counts[order]))
+        ).astype(np.float32)
+
+    def text_scores(self, expansions):
+        """Best factor * weight per distinct text over the expanded terms, or None if none occurs here."""
+        scores = None
+        for term, factor in expansions:
+            lo, hi = self.posting_offsets[term], self.posting_offsets[term + 1]
+            if lo == hi:
+                continue
+            if scores is None:
+                scores = np.zeros(len(self.texts), dtype=np.float32)
+            texts = self.posting_texts[lo:hi]
+            scores[texts] = np.maximum(scores[texts], factor * self.posting_weights[lo:hi])
+        return scores
+
+
+class SearchIndex:
+    """Inverted index over dish names, ingredients and history for free-text queries.
+
+    Every query token must match (exactly, as a prefix, or within one or two
+    typos when it is not a known word); a token's score is its best-matching
+    term's tf-idf summed over the fields. ``query`` returns row ids ranked by
+    total score, best first, memoised per normalised query. Built with
+    ``previous``, texts that were already indexed are reused instead of being
+    tokenised again.
+    """
+
+    def __init__(self, dishes, fields=SEARCH_FIELDS, previous=None, cache_size=256):
+        self.n_rows = len(dishes)
+        analysed = []
+        vocabulary = set()
+        for name, weight in fields.items():
+            codes, texts = pd.factorize(dishes[name].fillna(""))
+            texts = pd.Index(texts)
+            reused = self._reuse(previous, name, texts)
+            fresh = [(position, tokenize(texts[position])) for position in np.flatnonzero(reused[0] < 0)]
+            for _, tokens in fresh:
+                vocabulary.update(tokens)
+            if reused[3] is not None:
+                vocabulary.update(previous.vocabulary[np.unique(reused[3])])
+            analysed.append((name, weight, texts, codes.astype(np.int32), reused, fresh))
+
+        self.vocabulary = np.array(sorted(vocabulary), dtype=object)
+        self._terms = self.vocabulary.tolist()
+        self._term_ids = {term: i for i, term in enumerate(self._terms)}
+        remap = None
+        if previous is not None:
+            remap = np.searchsorted(self.vocabulary, previous.vocabulary)
+
+        self.fields = {}
+        for name, weight, texts, codes, (indexer, lengths, counts, terms), fresh in analysed:
+            field = self._assemble(name, weight, texts, codes, indexer, lengths, counts, terms, fresh, remap)
+            field.invert(len(self._terms), self.n_rows)
+            self.fields[name] = field
+        self.df = sum(field.df for field in self.fields.values())
+
+        if previous is not None and previous._terms == self._terms:
+            self._deletes = previous._deletes
+        else:
+            self._deletes = self._build_deletes()
+        self._query = lru_cache(maxsize=cache_size)(self._evaluate)
+
+    def _build_deletes(self):
+        """Every vocabulary word under each of its spellings with up to ``max_edits`` characters deleted."""
+        deletes = {}
+        for term_id, term in enumerate(self._terms):
+            distance = max_edits(term)
+            if distance:
+                for variant in _deletes(term, distance):
+                    deletes.setdefault(variant, []).append(term_id)
+        return deletes
+
+    @staticmethod
+    def _reuse(previous, name, texts):
+        """Forward-index entries of the texts ``previous`` already analysed for field ``name``."""
+        field = previous.fields.get(name) if previous is not None else None
+        if field is None:
+            return np.full(len(texts), -1), None, None, None
+        indexer = field.texts.get_indexer(texts)
+        known = indexer[indexer >= 0]
+        positions, lengths = _segments(field.term_offsets, known)
+        return indexer, lengths, field.counts[positions], field.terms[positions]
+
+    def _assemble(self, name, weight, texts, codes, indexer, lengths, counts, terms, fresh, remap):
+        text_lengths = np.zeros(len(texts), dtype=np.int64)
+        fresh_terms, fresh_counts = [], []
+        for position, tokens in fresh:
+            term_counts = Counter(tokens)
+            text_lengths[position] = len(term_counts)
+            fresh_terms.extend(self._term_ids[term] for term in term_counts)
+            fresh_counts.extend(term_counts.values())
+        if lengths is not None:
+            text_lengths[indexer >= 0] = lengths
+
+        term_offsets = np.concatenate(([0], np.cumsum(text_lengths)))
+        all_terms = np.zeros(term_offsets[-1], dtype=np.int32)
+        all_counts = np.zeros(term_offsets[-1], dtype=np.int32)
+        if lengths is not None:
+            target, _ = _segments(term_offsets, np.flatnonzero(indexer >= 0))
+            all_terms[target] = remap[terms]
+            all_counts[target] = counts
+        if fresh:
+            target, _ = _segments(term_offsets, np.array([position for position, _ in fresh], dtype=np.int64))
+            all_terms[target] = fresh_terms
+            all_counts[target] = fresh_counts
+        return SearchField(name, weight, texts, codes, term_offsets, all_terms, all_counts)
+
+    def canonical(self, text):
+        return tuple(dict.fromkeys(tokenize(text)))
+
+    def query(self, text):
+        """Ranked row ids matching ``text``, or None when it has no searchable tokens."""
+        return self.ranked(self.canonical(text))
+
+    def ranked(self, key):
+        if not key:
+            return None
+        return self._query(key)
+
+    def expand(self, token):
+        """(term id, factor) pairs a query token matches: itself, its completions and, if unknown, near misses."""
+        expansions = {}
+        lo = bisect.bisect_left(self._terms, token)
+        if lo < len(self._terms) and self._terms[lo] == token:
+            expansions[lo] = EXACT
+        if len(token) >= MIN_PREFIX:
+            hi = bisect.bisect_left(self._terms, token + "\uffff", lo)
+            completions = np.arange(lo, hi)
+            if len(completions) > MAX_EXPANSIONS:
+                completions = completions[np.argsort(-self.df[completions], kind="stable")[:MAX_EXPANSIONS]]
+            for term in completions.tolist():
+                expansions.setdefault(term, PREFIX)
+        distance = max_edits(token)
+        if distance and lo not in expansions:
+            candidates = {
+                term for variant in _deletes(token, distance) for term in self._deletes.get(variant, ())
+            }
+            near = []
+            for term in candidates:
+                edits = edit_distance(token, self._terms[term], distance)
+                if edits <= distance:
+                    near.append((edits, -self.df[term], term))
+            for edits, _, term in sorted(near)[:MAX_EXPANSIONS]:
+                expansions.setdefault(term, FUZZY[edits])
+        return list(expansions.items())
+
+    def _evaluate(self, tokens):
+        total = matched = None
+        for token in tokens:
+            expansions = self.expand(token)
+            score = None
+            for field in self.fields.values():
+                text_scores = field.text_scores(expansions) if expansions else None
+                if text_scores is None:
+                    continue
+                row_scores = text_scores if field.identity else text_scores[field.codes]
+                score = row_scores if score is None else np.add(score, row_scores, out=score)
+            if score is None:
+                rows = np.zeros(0, dtype=np.int64)
+                rows.flags.writeable = False
+                return rows
+            if total is None:
+                total, matched = score, score > 0
+            else:
+                np.add(total, score, out=total)
+                np.logical_and(matched, score > 0, out=matched)
+        rows = np.flatnonzero(matched)
+        # Positive float32 scores order like their bit patterns, so one int64 sort
+        # ranks by score, ties by row id, far quicker than a stable float argsort.
+        bits = total[rows].view(np.int32).astype(np.int64)
+        rows = np.sort(((0x7FFFFFFF - bits) << 32) | rows) & 0xFFFFFFFF
+        rows.flags.writeable = False
+        return rows
+
+    def cache_info(self):
+        return self._query.cache_info()
+
+
+class PrefixIndex:
+    """Names completed from a typed prefix, with a sorted-key range per query.
+
+    ``keys`` holds the distinct names folded and sorted, so the names starting
+    with a prefix are one ``bisect`` range, already in alphabetical order. Names
+    where a later word starts with it come from a second sorted list, of the
+    words, each with the ids of the names using it. Name ids are positions in the
+    sorted order, so sorting ids sorts names.
+    """
+
+    def __init__(self, names):
+        names = pd.unique(pd.Series(names, dtype=object).dropna())
+        folded = np.array([fold(name) for name in names], dtype=object)
+        order = np.argsort(folded, kind="stable")
+        self.names = names[order]
+        self.keys = folded[order].tolist()
+
+        postings = {}
+        for name_id, key in enumerate(self.keys):
+            for word in dict.fromkeys(_TOKEN.findall(key)):
+                postings.setdefault(word, []).append(name_id)
+        self.words = sorted(postings)
+        self.word_offsets = np.concatenate(([0], np.cumsum([len(postings[word]) for word in self.words])))
+        self.word_names = np.fromiter(
+            (name_id for word in self.words for name_id in postings[word]), dtype=np.int32, count=self.word_offsets[-1]
+        )
+
+    def matches(self, prefix):
+        """Ids of the names starting with ``prefix``, then of those with a later word that does."""
+        lo = bisect.bisect_left(self.keys, prefix)
+        hi = bisect.bisect_left(self.keys, prefix + "\uffff", lo)
+        leading = np.arange(lo, hi)
+
+        # Candidates come from the rarest word of the prefix: a whole word, or the
+        # one still being typed, which is completed.
+        ranges = []
+        for match in _TOKEN.finditer(prefix):
+            word = match.group()
+            word_lo = bisect.bisect_left(self.words, word)
+            if match.end() == len(prefix):
+                word_hi = bisect.bisect_left(self.words, word + "\uffff", word_lo)
+            else:
+                word_hi = word_lo + (word_lo < len(self.words) and self.words[word_lo] == word)
+            start, stop = self.word_offsets[word_lo], self.word_offsets[word_hi]
+            ranges.append((stop - start, start, stop, word))
+        if not ranges:
+            return leading
+        _, start, stop, word = min(ranges)
+        later = np.unique(self.word_names[start:stop])
+        later = later[(later < lo) | (later >= hi)]
+        if word != prefix:
+            later = later[[_later_word_starts_with(self.keys[name_id], prefix) for name_id in later.tolist()]]
+        return np.concatenate((leading, later))
+
+    def canonical(self, prefix):
+        prefix = fold(prefix or "").strip()
+        return prefix if len(prefix) >= MIN_PREFIX else ""
+
+    def complete(self, prefix, limit=20, offset=0):
+        """(names, total): one page of the names matching ``prefix`` and how many match in all."""
+        prefix = self.canonical(prefix)
+        if not prefix:
+            return [], 0
+        name_ids = self.matches(prefix)
+        return self.names[name_ids[offset:offset + limit]].tolist(), len(name_ids)
+
+
+def _later_word_starts_with(key, prefix):
+    position = key.find(prefix, 1)
+    while position != -1:
+        if not (key[position - 1].isalnum() or key[position - 1] == "_"):
+            return True
+        position = key.find(prefix, position + 1)
+    return False
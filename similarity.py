@@ -0,0 +1,130 @@
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+
+# Share of each signal in the combined similarity, which is then in [0, 1].
+SIMILARITY_WEIGHTS = {"nutrients": 0.4, "ingredients": 0.3, "type": 0.15, "region": 0.15}
+SIMILAR_DISHES_K = 8
+
+
+class SimilarDishes(NamedTuple):
+    """Top-k neighbour table: row i holds dish i's most similar dishes, best first.
+
+    Unused slots (fewer than k other dishes) have id -1.
+    """
+
+    ids: np.ndarray      # N x k int32
+    scores: np.ndarray   # N x k float32
+
+    def row(self, dish_id):
+        ids = self.ids[dish_id]
+        keep = ids >= 0
+        return ids[keep], self.scores[dish_id][keep]
+
+
+def _standardized_nutrients(absolute):
+    # Log first: sodium and calories are heavily right-skewed.
+    values = np.log1p(np.maximum(np.nan_to_num(np.asarray(absolute, dtype=np.float64)), 0))
+    spread = values.std(axis=0)
+    spread[spread == 0] = 1
+    return ((values - values.mean(axis=0)) / spread).astype(np.float32)
+
+
+def _nutrient_similarity(a, b, a_norms, b_norms):
+    """exp(-mean squared z-score difference / 2) for every pair of rows of ``a`` and ``b``."""
+    squared = a_norms[:, None] + b_norms[None, :] - 2 * (a @ b.T)
+    np.maximum(squared, 0, out=squared)
+    return np.exp(-squared / (2 * a.shape[1]))
+
+
+def _ingredient_incidence(lists):
+    vocabulary = {name: i for i, name in enumerate(dict.fromkeys(name for names in lists for name in names))}
+    incidence = np.zeros((len(lists) + 1, max(len(vocabulary), 1)), dtype=np.float32)
+    for text_id, names in enumerate(lists):
+        incidence[text_id, [vocabulary[name] for name in names]] = 1
+    # The extra last row is the empty list, for dishes without ingredients (code -1).
+    return incidence
+
+
+def build_similar_dishes(dishes, nutrients, ingredients, k=SIMILAR_DISHES_K, weights=SIMILARITY_WEIGHTS,
+                         block_size=1024, chunk_size=1024):
+    """SimilarDishes for every row, by nutrient profile, ingredient Jaccard overlap, type and prefecture.
+
+    Rows sharing ingredient list, type and prefecture form a profile, and between
+    two profiles everything but the nutrients is constant. Rows are scored in
+    blocks against candidate rows taken profile by profile, best possible score
+    first; a block stops once each of its rows has k neighbours that no remaining
+    profile can beat, so the work follows the number of close pairs rather than N².
+    """
+    n_rows = len(dishes)
+    k = min(k, max(n_rows - 1, 0))
+    ids = np.full((n_rows, k), -1, dtype=np.int32)
+    scores = np.zeros((n_rows, k), dtype=np.float32)
+    if k == 0:
+        return SimilarDishes(ids, scores)
+
+    text_codes = np.where(ingredients.codes >= 0, ingredients.codes, len(ingredients.lists))
+    type_codes = pd.factorize(dishes["type"])[0]
+    region_codes = pd.factorize(dishes["prefecture"])[0]
+    profile, keys = pd.factorize(pd.MultiIndex.from_arrays([text_codes, type_codes, region_codes]))
+    profile_text, profile_type, profile_region = (np.asarray(keys.get_level_values(i)) for i in range(3))
+
+    order = np.argsort(profile, kind="stable")
+    profile_offsets = np.concatenate(([0], np.cumsum(np.bincount(profile, minlength=len(keys)))))
+
+    incidence = _ingredient_incidence(ingredients.lists)
+    sizes = incidence.sum(axis=1)
+    features = _standardized_nutrients(nutrients)
+    norms = np.einsum("ij,ij->i", features, features)
+
+    block_start = 0
+    while block_start < len(keys):
+        # Whole profiles per block, at least one, up to block_size rows.
+        block_end = max(
+            int(np.searchsorted(profile_offsets, profile_offsets[block_start] + block_size, side="right")) - 1,
+            block_start + 1
+        )
+        block_profiles = np.arange(block_start, block_end)
+        rows = order[profile_offsets[block_start]:profile_offsets[block_end]]
+        local = profile[rows] - block_start
+
+        texts = profile_text[block_profiles]
+        overlap = incidence[texts] @ incidence.T
+        jaccard = overlap / np.maximum(sizes[texts][:, None] + sizes[None, :] - overlap, 1)
+        common = (
+            weights["ingredients"] * jaccard[:, profile_text]
+            + weights["type"] * (profile_type[block_profiles][:, None] == profile_type[None, :])
+            + weights["region"] * (profile_region[block_profiles][:, None] == profile_region[None, :])
+        ).astype(np.float32)
+        bound = common.max(axis=0) + weights["nutrients"]
+        candidates = np.argsort(-bound, kind="stable")
+
+        best_scores = np.full((len(rows), k), -np.inf, dtype=np.float32)
+        best_ids = np.full((len(rows), k), -1, dtype=np.int64)
+        position = 0
+        while position < len(candidates) and best_scores[:, -1].min() < bound[candidates[position]]:
+            sizes_ahead = np.cumsum(profile_offsets[candidates[position:] + 1] - profile_offsets[candidates[position:]])
+            take = max(int(np.searchsorted(sizes_ahead, chunk_size, side="right")), 1)
+            chunk_profiles = candidates[position:position + take]
+            position += take
+            other = np.concatenate([order[profile_offsets[p]:profile_offsets[p + 1]] for p in chunk_profiles])
+
+            chunk_scores = common[local][:, profile[other]] + weights["nutrients"] * _nutrient_similarity(
+                features[rows], features[other], norms[rows], norms[other]
+            )
+            chunk_scores[rows[:, None] == other[None, :]] = -np.inf
+
+            merged_scores = np.concatenate((best_scores, chunk_scores), axis=1)
+            merged_ids = np.concatenate((best_ids, np.broadcast_to(other, chunk_scores.shape)), axis=1)
+            top = np.argpartition(-merged_scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(merged_scores, top, axis=1)
+            ranked = np.argsort(-top_scores, axis=1, kind="stable")
+            best_scores = np.take_along_axis(top_scores, ranked, axis=1)
+            best_ids = np.take_along_axis(np.take_along_axis(merged_ids, top, axis=1), ranked, axis=1)
+
+        ids[rows] = best_ids
+        scores[rows] = np.maximum(best_scores, 0)
+        block_start = block_end
+    return SimilarDishes(ids, scores)
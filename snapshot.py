@@ -0,0 +1,161 @@
+import json
+import logging
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+
+from dataset import Adjacency, build_place_adjacency, data_version
+from schema import DISH_SCHEMA, INTERNED, PLACE_SCHEMA, load_dishes, load_places
+
+
+logger = logging.getLogger(__name__)
+
+
+SNAPSHOT_FORMAT = 2
+MANIFEST = "manifest.json"
+
+
+class Snapshot:
+    def __init__(self, dishes, places, place_adjacency, version):
+        self.dishes = dishes
+        self.places = places
+        self.place_adjacency = place_adjacency
+        self.version = version
+
+
+def _column_kind(series):
+    # The frames come from the typed loaders, so the dtype already says how to store a column.
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return "category"
+    if pd.api.types.is_bool_dtype(series):
+        return "bool"
+    if pd.api.types.is_numeric_dtype(series):
+        return "numeric"
+    return "text"
+
+
+def _write_table(frame, name, directory, schema):
+    columns = {}
+    for column in frame.columns:
+        series = frame[column]
+        kind = _column_kind(series)
+        prefix = os.path.join(directory, f"{name}.{column}")
+        spec = {"kind": kind}
+        if kind in ("bool", "numeric"):
+            values = series.to_numpy()
+            np.save(f"{prefix}.npy", values)
+            spec["dtype"] = str(values.dtype)
+        elif kind == "category":
+            categorical = series.array
+            codes_dtype = np.int16 if len(categorical.categories) < 2 ** 15 else np.int32
+            np.save(f"{prefix}.codes.npy", categorical.codes.astype(codes_dtype))
+            spec["categories"] = [str(value) for value in categorical.categories]
+        else:
+            valid = series.notna().to_numpy()
+            strings = [str(value) if ok else "" for value, ok in zip(series.tolist(), valid.tolist())]
+            offsets = np.zeros(len(strings) + 1, dtype=np.int64)
+            np.cumsum([len(s) for s in strings], out=offsets[1:])
+            with open(f"{prefix}.heap", "w", encoding="utf-8", newline="") as f:
+                for s in strings:
+                    f.write(s)
+            np.save(f"{prefix}.offsets.npy", offsets)
+            np.save(f"{prefix}.valid.npy", valid)
+            spec["intern"] = schema.get(column) == INTERNED
+        columns[column] = spec
+    return {"rows": len(frame), "columns": columns}
+
+
+def write_snapshot(dishes_csv, places_csv, directory):
+    """Compile the two CSVs into a columnar snapshot directory, replacing any existing one."""
+    dishes = load_dishes(dishes_csv)
+    places = load_places(places_csv)
+    adjacency = build_place_adjacency(dishes["places"], places)
+
+    tmp_dir = f"{directory.rstrip(os.sep)}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "version": data_version([dishes_csv, places_csv]),
+        "dishes": _write_table(dishes.drop(columns=["places"]), "dishes", tmp_dir, DISH_SCHEMA),
+        "places": _write_table(places, "places", tmp_dir, PLACE_SCHEMA),
+    }
+    np.save(os.path.join(tmp_dir, "adjacency.offsets.npy"), adjacency.offsets)
+    np.save(os.path.join(tmp_dir, "adjacency.targets.npy"), adjacency.targets)
+    with open(os.path.join(tmp_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=1)
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp_dir, directory)
+    return manifest
+
+
+def _read_table(spec, name, directory):
+    data = {}
+    for column, column_spec in spec["columns"].items():
+        prefix = os.path.join(directory, f"{name}.{column}")
+        kind = column_spec["kind"]
+        if kind in ("bool", "numeric"):
+            data[column] = np.load(f"{prefix}.npy", mmap_mode="r")
+        elif kind == "category":
+            codes = np.load(f"{prefix}.codes.npy", mmap_mode="r")
+            data[column] = pd.Categorical.from_codes(codes, categories=column_spec["categories"])
+        else:
+            offsets = np.load(f"{prefix}.offsets.npy", mmap_mode="r").tolist()
+            valid = np.load(f"{prefix}.valid.npy", mmap_mode="r").tolist()
+            with open(f"{prefix}.heap", encoding="utf-8", newline="") as f:
+                heap = f.read()
+            values = np.empty(spec["rows"], dtype=object)
+            values[:] = [heap[a:b] if ok else np.nan for a, b, ok in zip(offsets[:-1], offsets[1:], valid)]
+            if column_spec.get("intern"):
+                values[:] = [sys.intern(value) if ok else value for value, ok in zip(values, valid)]
+            data[column] = values
+    return pd.DataFrame(data, columns=list(spec["columns"]), copy=False)
+
+
+def load_snapshot(directory, source_paths=(), warn_stale=True):
+    """Memory-mapped snapshot from ``directory``, or None when it is missing or older than the CSVs."""
+    manifest_path = os.path.join(directory, MANIFEST)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get("format") != SNAPSHOT_FORMAT:
+        logger.warning("Ignoring snapshot %s: format %s, expected %s", directory, manifest.get("format"), SNAPSHOT_FORMAT)
+        return None
+    if source_paths and all(os.path.exists(path) for path in source_paths):
+        if data_version(source_paths) != manifest["version"]:
+            if warn_stale:
+                logger.warning("Ignoring stale snapshot %s; rebuild it with tools/build_snapshot.py", directory)
+            return None
+
+    dishes = _read_table(manifest["dishes"], "dishes", directory)
+    places = _read_table(manifest["places"], "places", directory)
+    adjacency = Adjacency(
+        np.load(os.path.join(directory, "adjacency.offsets.npy"), mmap_mode="r"),
+        np.load(os.path.join(directory, "adjacency.targets.npy"), mmap_mode="r"),
+    )
+    return Snapshot(dishes, places, adjacency, manifest["version"])
+
+
+def ensure_snapshot(directory, dishes_csv, places_csv):
+    """Load the snapshot, compiling it first when it is missing or stale.
+
+    Processes racing to build the same snapshot serialise on a lock file next to
+    it; the ones that wait find it current and just load it.
+    """
+    import fcntl
+
+    sources = [dishes_csv, places_csv]
+    os.makedirs(os.path.dirname(os.path.abspath(directory)), exist_ok=True)
+    with open(f"{directory.rstrip(os.sep)}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        snapshot = load_snapshot(directory, sources, warn_stale=False)
+        if snapshot is None:
+            logger.info("Compiling snapshot %s", directory)
+            write_snapshot(dishes_csv, places_csv, directory)
+            snapshot = load_snapshot(directory, sources)
+    return snapshot
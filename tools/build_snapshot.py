@@ -0,0 +1,40 @@
+"""Compile all_dishes.csv and all_places.csv into the columnar snapshot the app memory-maps.
+
+Run from the repository root after changing the CSVs (the app ignores a snapshot
+older than the CSVs next to it and falls back to parsing them):
+
+    python -m tools.build_snapshot
+    python -m tools.build_snapshot --data-dir data/synthetic/scale-100
+"""
+import argparse
+import os
+import time
+
+from snapshot import write_snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--out", help="snapshot directory (default: <data-dir>/snapshot)")
+    args = parser.parse_args()
+
+    out = args.out or os.path.join(args.data_dir, "snapshot")
+    start = time.perf_counter()
+    manifest = write_snapshot(
+        os.path.join(args.data_dir, "all_dishes.csv"), os.path.join(args.data_dir, "all_places.csv"), out
+    )
+    size = sum(entry.stat().st_size for entry in os.scandir(out))
+    print(
+        f"{out}: {manifest['dishes']['rows']:,} dishes, {manifest['places']['rows']:,} places, "
+        f"{size / 1e6:,.1f} MB in {time.perf_counter() - start:.1f} s"
+    )
+    for table in ("dishes", "places"):
+        kinds = {}
+        for column, spec in manifest[table]["columns"].items():
+            kinds.setdefault(spec["kind"], []).append(column)
+        print(f"  {table}: " + "; ".join(f"{kind}: {', '.join(columns)}" for kind, columns in sorted(kinds.items())))
+
+
+if __name__ == "__main__":
+    main()
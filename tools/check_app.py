@@ -0,0 +1,216 @@
+"""End-to-end checks of the app through its Flask test client, with a data reload between callbacks.
+
+Copies the dataset into a temporary directory, imports the app against it and
+posts /_dash-update-component requests the way dash-renderer does. Checks:
+
+  * a map update answers with the dishes the filters select, including one
+    with a nutrient range slider moved off its full extent;
+  * a reload that lands while a callback is running does not change the data
+    that callback sees (the request keeps the version it pinned);
+  * the callback after a reload through /admin/reload sees the new data, and
+    the data files are reread rather than served from caches of the old version;
+  * a dish selected before a reload that shifts the row positions stays the
+    same dish, and one the reload removed is no longer selected.
+
+The exit status is 1 when a check fails. Run from the repository root:
+
+    python -m tools.check_app
+    python -m tools.check_app --data-dir data/synthetic/scale-100
+"""
+import argparse
+import base64
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+
+ADMIN_TOKEN = "check-app"
+RELOAD_HEADER = "X-Check-Reload-During-Callback"
+
+
+def component_id(value):
+    return json.dumps(value, sort_keys=True, separators=(",", ":")) if isinstance(value, dict) else value
+
+
+class Client:
+    """Builds callback requests from /_dash-dependencies and the layout's prop values."""
+
+    def __init__(self, app):
+        self.http = app.server.test_client()
+        self.dependencies = self.http.get("/_dash-dependencies").get_json()
+        self.props = {}
+        self._collect(self.http.get("/_dash-layout").get_json())
+
+    def _collect(self, value):
+        if isinstance(value, list):
+            for item in value:
+                self._collect(item)
+        elif isinstance(value, dict):
+            props = value.get("props") if "type" in value and "namespace" in value else None
+            if isinstance(props, dict):
+                if "id" in props:
+                    for prop, prop_value in props.items():
+                        self.props[(component_id(props["id"]), prop)] = prop_value
+                for prop_value in props.values():
+                    self._collect(prop_value)
+
+    def _values(self, dependencies):
+        values = []
+        for dependency in dependencies:
+            if dependency["id"].startswith("{"):
+                # A wildcard: every component whose id matches the fixed keys.
+                pattern = {key: value for key, value in json.loads(dependency["id"]).items() if not isinstance(value, list)}
+                values.append([
+                    {"id": json.loads(key), "property": dependency["property"], "value": value}
+                    for (key, prop), value in self.props.items()
+                    if prop == dependency["property"] and key.startswith("{")
+                    and pattern.items() <= json.loads(key).items()
+                ])
+            else:
+                values.append({
+                    "id": dependency["id"], "property": dependency["property"],
+                    "value": self.props.get((dependency["id"], dependency["property"]))
+                })
+        return values
+
+    def call(self, output, changed, headers=None):
+        """Set ``changed`` ({(id, prop): value}, dict ids as ``component_id`` strings) and fire the callback writing ``output``.
+
+        Returns the value of ``output``, or for a callback with several outputs
+        (``output`` is one of them) its whole response, by component and prop.
+        """
+        self.props.update(changed)
+        dependency = next(dep for dep in self.dependencies if output in dep["output"].strip(".").split("..."))
+        outputs = [
+            {"id": part.rpartition(".")[0], "property": part.rpartition(".")[2]}
+            for part in dependency["output"].strip(".").split("...")
+        ]
+        multi = dependency["output"].startswith("..")
+        body = {
+            "output": dependency["output"],
+            "outputs": outputs if multi else outputs[0],
+            "inputs": self._values(dependency["inputs"]),
+            "state": self._values(dependency.get("state", [])),
+            "changedPropIds": [f"{key}.{prop}" for key, prop in changed],
+        }
+        response = self.http.post("/_dash-update-component", json=body, headers=headers or {})
+        if response.status_code != 200:
+            raise AssertionError(f"{output}: HTTP {response.status_code}\n{response.get_data(as_text=True)[-2000:]}")
+        answer = response.get_json()["response"]
+        if multi:
+            return answer
+        component, _, prop = output.rpartition(".")
+        return answer[component][prop]
+
+
+def map_points(figure):
+    lat = figure["data"][0]["lat"]
+    if isinstance(lat, dict):
+        # Plotly ships numeric arrays as base64 typed arrays.
+        return len(np.frombuffer(base64.b64decode(lat["bdata"]), dtype=lat["dtype"]))
+    return len(lat)
+
+
+def check(label, ok, detail=""):
+    print(f"  {'ok  ' if ok else 'FAIL'} {label}" + (f" ({detail})" if detail else ""))
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data-dir", default="data")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="check-app-")
+    try:
+        for name in ("all_dishes.csv", "all_places.csv"):
+            shutil.copy(os.path.join(args.data_dir, name), work_dir)
+        os.environ.update(
+            KYODO_DATA_DIR=work_dir, KYODO_SNAPSHOT_DIR=os.path.join(work_dir, "snapshot"),
+            KYODO_ADMIN_TOKEN=ADMIN_TOKEN, KYODO_RELOAD_INTERVAL="0", KYODO_CLIENTSIDE_FILTERING="0",
+            KYODO_WARM_PANEL_CACHE="0", KYODO_WARM_MAP_CACHE="0",
+        )
+        sys.path.insert(0, os.getcwd())
+        import app
+        from flask import request
+
+        @app.server.before_request
+        def reload_during_callback():
+            # Registered after the app's own hooks, so the request has pinned its dataset already.
+            if request.headers.get(RELOAD_HEADER):
+                app.data_store.reload(force=True)
+
+        return run_checks(app, work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def run_checks(app, work_dir):
+    dishes_csv = os.path.join(work_dir, "all_dishes.csv")
+    dishes = pd.read_csv(dishes_csv)
+    client = Client(app)
+    ok = True
+
+    prefecture = dishes["prefecture"].mode()[0]
+    expected = int((dishes["prefecture"] == prefecture).sum())
+    figure = client.call("map.figure", {("prefecture-dropdown", "value"): [prefecture]})
+    ok &= check(f"map update for {prefecture}", map_points(figure) == expected, f"{map_points(figure)} of {expected}")
+
+    # Drop that prefecture from the files, then reload while a callback is running.
+    dishes[dishes["prefecture"] != prefecture].to_csv(dishes_csv, index=False)
+    old_version = app.current_dataset().version
+    figure = client.call("map.figure", {("season-dropdown", "value"): None}, headers={RELOAD_HEADER: "1"})
+    swapped = app.current_dataset().version != old_version
+    ok &= check("reload during a callback swaps the dataset", swapped)
+    ok &= check("that callback keeps the dataset it pinned", map_points(figure) == expected,
+                f"{map_points(figure)} of {expected}")
+
+    figure = client.call("map.figure", {("season-dropdown", "value"): []})
+    ok &= check("the next callback sees the reloaded data", map_points(figure) == 0, f"{map_points(figure)} points")
+
+    # Put the prefecture back and reload through the admin route.
+    dishes.to_csv(dishes_csv, index=False)
+    response = client.http.post("/admin/reload", headers={"Authorization": f"Bearer {ADMIN_TOKEN}"})
+    ok &= check("/admin/reload swaps the dataset", response.status_code == 200 and response.get_json()["swapped"],
+                response.get_data(as_text=True).strip())
+    figure = client.call("map.figure", {("season-dropdown", "value"): None})
+    ok &= check("the next callback sees the restored data", map_points(figure) == expected,
+                f"{map_points(figure)} of {expected}")
+
+    # One nutrient slider off its full extent, the others left open.
+    calories = component_id({"index": "calories", "type": "nutrient-range"})
+    low = client.props[(calories, "value")][0]
+    in_range = int(dishes["calories"].between(low, 500).sum())
+    figure = client.call("map.figure", {("prefecture-dropdown", "value"): None, (calories, "value"): [low, 500]})
+    ok &= check("map update with calories up to 500", map_points(figure) == in_range, f"{map_points(figure)} of {in_range}")
+
+    # Select the last dish, then reload without the first prefecture so every row
+    # position after it shifts, and without a second dish that was selected too.
+    kept, dropped = dishes.iloc[-1], dishes[dishes["prefecture"] != dishes["prefecture"].iloc[0]].iloc[0]
+    stale_click = {"points": [{"customdata": [len(dishes) - 1], "hovertext": kept["dish_name"]}]}
+    selected = client.call("clicked-dish.data", {("map", "clickData"): stale_click})["clicked-dish"]["data"]
+    dropped_click = {"points": [{"customdata": [int(dropped.name)], "hovertext": dropped["dish_name"]}]}
+    dropped_selected = client.call("clicked-dish.data", {("map", "clickData"): dropped_click})["clicked-dish"]["data"]
+    dishes[(dishes["prefecture"] != dishes["prefecture"].iloc[0]) & (dishes["dish_name"] != dropped["dish_name"])].to_csv(
+        dishes_csv, index=False
+    )
+    client.http.post("/admin/reload", headers={"Authorization": f"Bearer {ADMIN_TOKEN}"})
+    answer = client.call("clicked-dish.data", {("clicked-dish", "data"): selected, ("user-location", "data"): None})
+    ok &= check("a stored selection keeps its dish after a reload", answer["dish-title"]["children"] == kept["dish_name"],
+                answer["dish-title"]["children"])
+    answer = client.call("clicked-dish.data", {("map", "clickData"): stale_click})
+    ok &= check("a click on a map served before the reload finds the same dish",
+                answer["dish-title"]["children"] == kept["dish_name"], answer["dish-title"]["children"])
+    answer = client.call("clicked-dish.data", {("clicked-dish", "data"): dropped_selected, ("user-location", "data"): None})
+    ok &= check("a selection the reload removed is dropped", answer["dish-title"]["children"] == "Select a Dish",
+                answer["dish-title"]["children"])
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+"""Generate a synthetic dataset shaped like data/all_dishes.csv and data/all_places.csv.
+
+Every synthetic dish copies a real dish from the same prefecture (type,
+season, dietary flags, text) and jitters its nutrients and coordinates, so
+the prefecture/season/type mix follows the real data. Each prefecture owns a
+contiguous block of place ids whose coordinates scatter around that
+prefecture's real dish and restaurant locations, and dishes link only to
+places in their own prefecture's block.
+
+Rows are generated and appended in fixed-size chunks, each from its own
+seeded generator, so output is identical for a given seed and memory stays
+bounded however many rows are written.
+
+Run from the repository root:
+
+    python -m tools.generate_dataset --scale 100 --out data/synthetic
+    python -m tools.generate_dataset --dishes 1000000 --places 10000000 --seed 7 --out /tmp/kyodo-10m
+
+--snapshot also compiles the output into <out>/snapshot (see tools/build_snapshot.py).
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from dataset import DIETARY_COLUMNS, NUTRIENT_COLUMNS, _parse_place_ids
+from snapshot import write_snapshot
+
+
+CHUNK_ROWS = 100_000
+DISH_COLUMNS = [
+    "dish_name", "prefecture", "area_name", "main_ingredients", "history", "image_url", "type",
+    "seasonality", *NUTRIENT_COLUMNS, *DIETARY_COLUMNS, "area_lat", "area_lon", "places"
+]
+PLACE_COLUMNS = ["id", "name", "latitude", "longitude", "rating", "price_level", "googleMapsUri"]
+DISHES_STREAM, PLACES_STREAM = 0, 1
+
+
+class SeedProfile:
+    """Distributions taken from the real dataset that synthetic rows are sampled from."""
+
+    def __init__(self, dishes, places):
+        dishes = dishes.dropna(subset=["prefecture"]).sort_values("prefecture", kind="stable").reset_index(drop=True)
+        self.dishes = dishes
+        self.prefectures, first_rows, counts = np.unique(
+            dishes["prefecture"].to_numpy(dtype=str), return_index=True, return_counts=True
+        )
+        self.template_start = first_rows
+        self.template_count = counts
+        self.weights = counts / counts.sum()
+        self.link_counts = np.array([len(_parse_place_ids(v)) for v in dishes["places"]])
+
+        places_by_id = places.drop_duplicates("id").set_index("id")
+        anchors = []
+        for prefecture in self.prefectures:
+            rows = dishes[dishes["prefecture"] == prefecture]
+            lat, lon = rows["area_lat"].tolist(), rows["area_lon"].tolist()
+            for value in rows["places"]:
+                linked = places_by_id.reindex(_parse_place_ids(value)).dropna(subset=["latitude", "longitude"])
+                lat += linked["latitude"].tolist()
+                lon += linked["longitude"].tolist()
+            points = np.array([lat, lon], dtype=np.float64).T
+            anchors.append(points[~np.isnan(points).any(axis=1)])
+        self.anchors = anchors
+
+        self.n_places = len(places)
+        self.place_names = places["name"].dropna().to_numpy(dtype=object)
+        self.ratings = places["rating"].to_numpy(dtype=np.float64)
+        self.price_levels = places["price_level"].to_numpy(dtype=object)
+
+    def place_blocks(self, n_places):
+        """Split place ids 0..n_places-1 into one contiguous block per prefecture, by dish weight."""
+        exact = self.weights * n_places
+        sizes = np.floor(exact).astype(np.int64)
+        sizes[np.argsort(sizes - exact, kind="stable")[: n_places - sizes.sum()]] += 1
+        return np.concatenate([[0], np.cumsum(sizes)])
+
+
+def place_id(position):
+    return f"SYN{position:010d}"
+
+
+def chunk_rng(seed, stream, chunk):
+    return np.random.default_rng([seed, stream, chunk])
+
+
+def jittered_points(rng, anchors, prefecture_codes, spread_deg):
+    lat = np.empty(len(prefecture_codes))
+    lon = np.empty(len(prefecture_codes))
+    for code in np.unique(prefecture_codes):
+        rows = np.flatnonzero(prefecture_codes == code)
+        points = anchors[code][rng.integers(0, len(anchors[code]), len(rows))]
+        lat[rows] = points[:, 0] + rng.normal(0, spread_deg, len(rows))
+        lon[rows] = points[:, 1] + rng.normal(0, spread_deg, len(rows))
+    return lat.round(6), lon.round(6)
+
+
+def dish_chunk(profile, blocks, seed, chunk, start, stop):
+    rng = chunk_rng(seed, DISHES_STREAM, chunk)
+    n = stop - start
+    codes = rng.choice(len(profile.prefectures), n, p=profile.weights)
+    templates = profile.template_start[codes] + (rng.random(n) * profile.template_count[codes]).astype(np.int64)
+    frame = profile.dishes.iloc[templates].reset_index(drop=True)
+
+    frame["dish_name"] = [f"{name} #{i}" for name, i in zip(frame["dish_name"], range(start, stop))]
+    for column in NUTRIENT_COLUMNS:
+        frame[column] = (frame[column] * rng.lognormal(0.0, 0.15, n)).round(2)
+    frame["area_lat"], frame["area_lon"] = jittered_points(rng, profile.anchors, codes, 0.05)
+
+    links = profile.link_counts[rng.integers(0, len(profile.link_counts), n)]
+    block_start, block_size = blocks[codes], blocks[codes + 1] - blocks[codes]
+    picks = block_start.repeat(links) + (rng.random(links.sum()) * block_size.repeat(links)).astype(np.int64)
+    offsets = np.concatenate([[0], np.cumsum(links)])
+    frame["places"] = [
+        str([place_id(p) for p in dict.fromkeys(picks[a:b].tolist())]) if size else "[]"
+        for a, b, size in zip(offsets[:-1].tolist(), offsets[1:].tolist(), block_size.tolist())
+    ]
+    return frame[DISH_COLUMNS]
+
+
+def place_chunk(profile, blocks, seed, chunk, start, stop):
+    rng = chunk_rng(seed, PLACES_STREAM, chunk)
+    n = stop - start
+    positions = np.arange(start, stop)
+    codes = np.searchsorted(blocks, positions, side="right") - 1
+    latitude, longitude = jittered_points(rng, profile.anchors, codes, 0.08)
+    names = profile.place_names[rng.integers(0, len(profile.place_names), n)]
+    return pd.DataFrame({
+        "id": [place_id(p) for p in positions.tolist()],
+        "name": [f"{name} {p}" for name, p in zip(names, positions.tolist())],
+        "latitude": latitude,
+        "longitude": longitude,
+        "rating": profile.ratings[rng.integers(0, len(profile.ratings), n)],
+        "price_level": profile.price_levels[rng.integers(0, len(profile.price_levels), n)],
+        "googleMapsUri": [f"https://maps.google.com/?cid={p}" for p in positions.tolist()],
+    }, columns=PLACE_COLUMNS)
+
+
+def write_chunks(path, columns, n_rows, make_chunk):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        f.write(",".join(columns) + "\n")
+        for chunk, start in enumerate(range(0, n_rows, CHUNK_ROWS)):
+            make_chunk(chunk, start, min(start + CHUNK_ROWS, n_rows)).to_csv(f, header=False, index=False)
+    os.replace(tmp_path, path)
+
+
+def generate(out_dir, n_dishes, n_places, seed=0, profile=None):
+    profile = profile or SeedProfile(pd.read_csv("data/all_dishes.csv"), pd.read_csv("data/all_places.csv"))
+    blocks = profile.place_blocks(n_places)
+    os.makedirs(out_dir, exist_ok=True)
+    dishes_path = os.path.join(out_dir, "all_dishes.csv")
+    places_path = os.path.join(out_dir, "all_places.csv")
+    write_chunks(places_path, PLACE_COLUMNS, n_places,
+                 lambda chunk, start, stop: place_chunk(profile, blocks, seed, chunk, start, stop))
+    write_chunks(dishes_path, DISH_COLUMNS, n_dishes,
+                 lambda chunk, start, stop: dish_chunk(profile, blocks, seed, chunk, start, stop))
+    return dishes_path, places_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=float, default=1.0, help="multiple of the real row counts")
+    parser.add_argument("--dishes", type=int, help="number of dishes (overrides --scale)")
+    parser.add_argument("--places", type=int, help="number of places (overrides --scale)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="data/synthetic")
+    parser.add_argument("--snapshot", action="store_true", help="also build the columnar snapshot")
+    args = parser.parse_args()
+
+    profile = SeedProfile(pd.read_csv("data/all_dishes.csv"), pd.read_csv("data/all_places.csv"))
+    n_dishes = args.dishes if args.dishes is not None else round(len(profile.dishes) * args.scale)
+    n_places = args.places if args.places is not None else round(profile.n_places * args.scale)
+
+    start = time.perf_counter()
+    paths = generate(args.out, n_dishes, n_places, args.seed, profile)
+    print(f"dishes={n_dishes:,} places={n_places:,} seed={args.seed} in {time.perf_counter() - start:.1f} s")
+    for path in paths:
+        print(f"  {path} ({os.path.getsize(path) / 1e6:,.1f} MB)")
+    if args.snapshot:
+        write_snapshot(*paths, os.path.join(args.out, "snapshot"))
+        print(f"  {os.path.join(args.out, 'snapshot')}/")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""Replay Dash callback traffic against a running server and report latency per callback.
+
+A scenario is a JSONL file; every line is one step of a simulated browser session:
+
+    {"load": true}                                    page load: fetch the layout, fire initial callbacks
+    {"set": {"prefecture-dropdown.value": ["Kyoto"]}} a user action: set props, fire the server callbacks
+                                                      that take them as Input (and any they chain into)
+    {"click": {"type": "similar-dish"}}               click (n_clicks + 1) the first component on the page
+                                                      whose dict id has these keys
+    {"sleep": 0.5}                                    think time
+    {"callback": "update_map", "payload": {...}}      a raw /_dash-update-component body, as written by
+                                                      the recorder (KYODO_RECORD_CALLBACKS=session.jsonl)
+
+"set" steps are resolved against the server's /_dash-dependencies and the props the
+session has seen so far, the way dash-renderer builds requests. Components with a
+dict id are named by its compact JSON with sorted keys, e.g.
+'{"index":"calories","type":"nutrient-range"}.value', and an ALL wildcard in a
+callback's inputs or state is sent as the list of matching components on the page.
+Clientside callbacks are not run: set their outputs directly (e.g. "dark-mode.data"
+for the theme toggle).
+
+Each of --users virtual users replays the scenario --iterations times with its own
+session, all concurrently:
+
+    python -m tools.replay_load tools/scenarios/browse.jsonl --users 100 \\
+        --start "gunicorn -w 4 -b 127.0.0.1:8050 app:server"
+    python -m tools.replay_load session.jsonl --url http://127.0.0.1:8050 --users 20 --iterations 5
+"""
+import argparse
+import json
+import shlex
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+
+MAX_CHAIN_DEPTH = 10
+
+
+def parse_outputs(spec):
+    multi = spec.startswith("..")
+    parts = spec[2:-2].split("...") if multi else [spec]
+    outputs = []
+    for part in parts:
+        component_id, _, prop = part.rpartition(".")
+        outputs.append({"id": component_id, "property": prop})
+    return outputs, multi
+
+
+def callback_label(spec):
+    outputs, _ = parse_outputs(spec)
+    first = outputs[0]
+    label = f"{first['id']}.{first['property'].split('@')[0]}"
+    return label if len(outputs) == 1 else f"{label} (+{len(outputs) - 1})"
+
+
+def component_id(value):
+    """A component id as dash-renderer writes it: dict ids as compact JSON with sorted keys."""
+    return json.dumps(value, sort_keys=True, separators=(",", ":")) if isinstance(value, dict) else value
+
+
+def component_props(value, into):
+    """Collect ``"id.prop": value`` for every component with an id inside a layout fragment."""
+    if isinstance(value, list):
+        for item in value:
+            component_props(item, into)
+    elif isinstance(value, dict):
+        props = value.get("props") if "type" in value and "namespace" in value else None
+        if isinstance(props, dict):
+            if isinstance(props.get("id"), (str, dict)):
+                for prop, prop_value in props.items():
+                    if prop != "id":
+                        into[f"{component_id(props['id'])}.{prop}"] = prop_value
+            for prop_value in props.values():
+                component_props(prop_value, into)
+    return into
+
+
+def wildcard_matches(dependency, key):
+    """Whether the prop ``key`` ("id.prop") belongs to a component an ALL wildcard ``dependency`` selects."""
+    component, _, prop = key.rpartition(".")
+    if prop != dependency["property"] or not component.startswith("{"):
+        return False
+    pattern, candidate = json.loads(dependency["id"]), json.loads(component)
+    fixed = {name: value for name, value in pattern.items() if not isinstance(value, list)}
+    return candidate.keys() == pattern.keys() and fixed.items() <= candidate.items()
+
+
+def dependency_keys(dependency, keys):
+    """The props among ``keys`` that ``dependency`` reads, in the order given."""
+    if dependency["id"].startswith("{"):
+        return [key for key in keys if wildcard_matches(dependency, key)]
+    key = f"{dependency['id']}.{dependency['property']}"
+    return [key] if key in keys else []
+
+
+class Stats:
+    def __init__(self):
+        self.samples = {}
+        self._lock = threading.Lock()
+
+    def add(self, label, seconds, size, ok):
+        with self._lock:
+            self.samples.setdefault(label, []).append((seconds, size, ok))
+
+    def report(self, elapsed):
+        rows = {}
+        total, total_errors = 0, 0
+        for label, samples in sorted(self.samples.items()):
+            seconds = np.array([s for s, _, _ in samples]) * 1e3
+            errors = sum(1 for _, _, ok in samples if not ok)
+            rows[label] = {
+                "requests": len(samples),
+                "errors": errors,
+                "error_rate": errors / len(samples),
+                "p50_ms": float(np.percentile(seconds, 50)),
+                "p95_ms": float(np.percentile(seconds, 95)),
+                "p99_ms": float(np.percentile(seconds, 99)),
+                "mean_bytes": float(np.mean([size for _, size, _ in samples])),
+                "throughput_rps": len(samples) / elapsed,
+            }
+            total += len(samples)
+            total_errors += errors
+        summary = {
+            "requests": total, "errors": total_errors, "error_rate": total_errors / total if total else 0.0,
+            "elapsed_s": elapsed, "throughput_rps": total / elapsed if elapsed else 0.0,
+        }
+        return {"callbacks": rows, "total": summary}
+
+
+class Server:
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+        self.dependencies = requests.get(f"{self.url}/_dash-dependencies", timeout=30).json()
+        self.layout_props = component_props(requests.get(f"{self.url}/_dash-layout", timeout=30).json(), {})
+        self.server_callbacks = [dep for dep in self.dependencies if not dep.get("clientside_function")]
+
+
+class Session:
+    """One virtual browser tab: the props it has seen and the callbacks it fires."""
+
+    def __init__(self, server, stats, timeout):
+        self.server = server
+        self.stats = stats
+        self.timeout = timeout
+        self.http = requests.Session()
+        self.props = dict(server.layout_props)
+        # The props collected from each prop holding components, dropped when it is replaced.
+        self.nested = {}
+
+    def value(self, dependency):
+        if not dependency["id"].startswith("{"):
+            return {
+                "id": dependency["id"], "property": dependency["property"],
+                "value": self.props.get(f"{dependency['id']}.{dependency['property']}")
+            }
+        # An ALL wildcard: every matching component on the page, in layout order.
+        return [
+            {"id": json.loads(key.rpartition(".")[0]), "property": dependency["property"], "value": self.props[key]}
+            for key in dependency_keys(dependency, self.props)
+        ]
+
+    def body(self, dep, changed):
+        outputs, multi = parse_outputs(dep["output"])
+        return {
+            "output": dep["output"],
+            "outputs": outputs if multi else outputs[0],
+            "inputs": [self.value(d) for d in dep["inputs"]],
+            "changedPropIds": [key for d in dep["inputs"] for key in dependency_keys(d, changed)],
+            "state": [self.value(d) for d in dep.get("state", [])],
+        }
+
+    def post(self, label, body):
+        start = time.perf_counter()
+        try:
+            response = self.http.post(f"{self.server.url}/_dash-update-component", json=body, timeout=self.timeout)
+        except requests.RequestException:
+            self.stats.add(label, time.perf_counter() - start, 0, False)
+            return {}
+        self.stats.add(label, time.perf_counter() - start, len(response.content), response.status_code < 400)
+        if response.status_code != 200:
+            return {}
+        return response.json().get("response", {})
+
+    def apply(self, response):
+        changed = set()
+        for component, props in response.items():
+            for prop, value in props.items():
+                key = f"{component}.{prop}"
+                if not (isinstance(value, dict) and "__dash_patch_update" in value):
+                    self.props[key] = value
+                    for nested_key in self.nested.pop(key, ()):
+                        self.props.pop(nested_key, None)
+                    nested = component_props(value, {})
+                    self.props.update(nested)
+                    self.nested[key] = list(nested)
+                changed.add(key)
+        return changed
+
+    def click(self, pattern):
+        """Click the first component on the page whose dict id has the keys and values of ``pattern``."""
+        for key in self.props:
+            component, _, prop = key.rpartition(".")
+            if prop == "n_clicks" and component.startswith("{") and pattern.items() <= json.loads(component).items():
+                self.props[key] = (self.props[key] or 0) + 1
+                self.fire({key})
+                return
+
+    def fire(self, changed):
+        for _ in range(MAX_CHAIN_DEPTH):
+            if not changed:
+                return
+            triggered = [
+                dep for dep in self.server.server_callbacks
+                if any(dependency_keys(d, changed) for d in dep["inputs"])
+            ]
+            next_changed = set()
+            for dep in triggered:
+                response = self.post(callback_label(dep["output"]), self.body(dep, changed))
+                next_changed |= self.apply(response)
+            changed = next_changed
+
+    def load(self):
+        self.props = dict(self.server.layout_props)
+        self.nested = {}
+        changed = set()
+        for dep in self.server.server_callbacks:
+            if dep.get("prevent_initial_call") is True:
+                continue
+            changed |= self.apply(self.post(callback_label(dep["output"]), self.body(dep, set())))
+        self.fire(changed)
+
+    def run(self, steps):
+        for step in steps:
+            if step.get("load"):
+                self.load()
+            elif "set" in step:
+                self.props.update(step["set"])
+                self.fire(set(step["set"]))
+            elif "click" in step:
+                self.click(step["click"])
+            elif "payload" in step:
+                self.post(step.get("callback") or callback_label(step["payload"]["output"]), step["payload"])
+            elif "sleep" in step:
+                time.sleep(step["sleep"])
+
+
+def wait_until_up(url, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(url, timeout=2).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"server at {url} did not come up within {timeout:.0f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("scenario", help="JSONL scenario or recorded session")
+    parser.add_argument("--url", default="http://127.0.0.1:8050")
+    parser.add_argument("--start", help="command that starts the server, e.g. \"gunicorn -w 4 app:server\"")
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--users", type=int, default=10, help="concurrent virtual users")
+    parser.add_argument("--iterations", type=int, default=1, help="scenario repetitions per user")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout in seconds")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    with open(args.scenario) as f:
+        steps = [json.loads(line) for line in f if line.strip()]
+
+    process = subprocess.Popen(shlex.split(args.start)) if args.start else None
+    try:
+        wait_until_up(args.url, args.startup_timeout)
+        server = Server(args.url)
+        stats = Stats()
+
+        def user(_):
+            session = Session(server, stats, args.timeout)
+            for _ in range(args.iterations):
+                session.run(steps)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.users) as pool:
+            list(pool.map(user, range(args.users)))
+        report = stats.report(time.perf_counter() - start)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    total = report["total"]
+    print(f"{args.scenario}: users={args.users} iterations={args.iterations} "
+          f"requests={total['requests']:,} in {total['elapsed_s']:.1f} s ({total['throughput_rps']:.1f} req/s), "
+          f"errors={total['error_rate']:.2%}")
+    print(f"  {'callback':<36} {'requests':>9} {'errors':>7} {'p50':>9} {'p95':>9} {'p99':>9} {'req/s':>8} {'bytes':>10}")
+    for label, row in report["callbacks"].items():
+        print(
+            f"  {label:<36} {row['requests']:>9,} {row['error_rate']:>7.1%} {row['p50_ms']:>6.1f} ms "
+            f"{row['p95_ms']:>6.1f} ms {row['p99_ms']:>6.1f} ms {row['throughput_rps']:>8.1f} {row['mean_bytes']:>10,.0f}"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
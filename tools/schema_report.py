@@ -0,0 +1,54 @@
+"""Per-column memory of the dishes and places tables: default pandas dtypes vs. the typed schema.
+
+Run from the repository root:
+
+    python -m tools.schema_report
+    python -m tools.schema_report --data-dir data/synthetic/scale-100
+"""
+import argparse
+import os
+import time
+
+import pandas as pd
+
+from dataset import build_places_table
+from schema import load_dishes, load_places, memory_report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data-dir", default="data")
+    args = parser.parse_args()
+
+    tables = (
+        ("dishes", os.path.join(args.data_dir, "all_dishes.csv"), pd.read_csv, load_dishes),
+        ("places", os.path.join(args.data_dir, "all_places.csv"),
+         lambda path: build_places_table(pd.read_csv(path)), load_places),
+    )
+    for name, path, load_default, load_typed in tables:
+        start = time.perf_counter()
+        default = memory_report(load_default(path))
+        default_s = time.perf_counter() - start
+        start = time.perf_counter()
+        typed = memory_report(load_typed(path))
+        typed_s = time.perf_counter() - start
+
+        print(f"{path}: {name}")
+        print(f"  {'column':<18} {'default':>26} {'typed':>26}")
+        for column in default.index.union(typed.index, sort=False):
+            cells = []
+            for report in (default, typed):
+                if column in report.index:
+                    row = report.loc[column]
+                    cells.append(f"{row['dtype']:<10} {row['bytes'] / 1e6:>10,.2f} MB")
+                else:
+                    cells.append("-")
+            print(f"  {column:<18} {cells[0]:>26} {cells[1]:>26}")
+        print(
+            f"  {'total':<18} {default['bytes'].sum() / 1e6:>23,.2f} MB {typed['bytes'].sum() / 1e6:>23,.2f} MB"
+            f"   (load {default_s:.2f} s vs {typed_s:.2f} s)"
+        )
+
+
+if __name__ == "__main__":
+    main()